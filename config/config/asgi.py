@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+# Профиль соединений с БД для ASGI (см. config/database.py)
+os.environ["DJANGO_SERVER_INTERFACE"] = "asgi"
 
 application = get_asgi_application()
@@ -0,0 +1,67 @@
+"""Профиль подключения к PostgreSQL.
+
+Без пула Django открывает новое соединение (TCP, TLS, аутентификация) на
+каждый запрос gunicorn и каждую задачу Celery. Поэтому:
+
+- DB_POOL=True (продакшен) - встроенный в Django 5.1 пул psycopg 3:
+  соединения переиспользуются внутри процесса и проверяются перед выдачей;
+- иначе - постоянные соединения: CONN_MAX_AGE с CONN_HEALTH_CHECKS.
+  Кроме ASGI-процесса (сервис events, config/asgi.py): там sync_to_async
+  выполняет запросы в разных потоках, постоянные соединения копились бы
+  по потокам и не закрывались надёжно - без пула CONN_MAX_AGE=0.
+
+Django не позволяет совмещать пул с ненулевым CONN_MAX_AGE.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+def pool_size(workers, threads, max_connections):
+    """
+    Размер пула одного процесса.
+
+    Поток держит не больше одного соединения, поэтому больше threads
+    соединений процессу не нужно. Все workers процессов вместе не должны
+    выйти за max_connections - бюджет соединений сервиса в PostgreSQL.
+    """
+    per_process = max_connections // workers
+    if per_process < 1:
+        raise ImproperlyConfigured(
+            f"DB_MAX_CONNECTIONS={max_connections} не хватает на {workers} процессов"
+        )
+    return min(threads, per_process)
+
+
+def database_options(env):
+    """OPTIONS и параметры соединения для DATABASES["default"] из окружения."""
+    if env.get("DB_POOL", "False") != "True":
+        asgi = env.get("DJANGO_SERVER_INTERFACE") == "asgi"
+        return {
+            "CONN_MAX_AGE": 0 if asgi else int(env.get("DB_CONN_MAX_AGE", 60)),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {},
+        }
+
+    size = pool_size(
+        workers=int(env.get("WEB_CONCURRENCY", 3)),
+        threads=int(env.get("GUNICORN_THREADS", 1)),
+        max_connections=int(env.get("DB_MAX_CONNECTIONS", 90)),
+    )
+    return {
+        "CONN_MAX_AGE": 0,
+        # Django передаёт пулу check=ConnectionPool.check_connection: соединение
+        # проверяется перед выдачей, рвущиеся (рестарт PostgreSQL, pgbouncer)
+        # заменяются новыми
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "pool": {
+                # Пул заполняется при старте и не сжимается: size небольшой
+                "min_size": size,
+                "max_size": size,
+                # Сколько ждать свободного соединения, прежде чем отдать ошибку
+                "timeout": float(env.get("DB_POOL_TIMEOUT", 10)),
+                # Соединение старше часа переоткрывается
+                "max_lifetime": 3600,
+            },
+        },
+    }
@@ -19,6 +19,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 from dotenv import load_dotenv
 
+from .database import database_options
+
 load_dotenv(BASE_DIR.parent / ".env")
 
 # Quick-start development settings - unsuitable for production
@@ -56,6 +58,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.sites",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework_simplejwt",
     "rest_framework_simplejwt.token_blacklist",
@@ -79,6 +82,7 @@ MIDDLEWARE = [
     "allauth.account.middleware.AccountMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "resort.db_routing.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -118,9 +122,24 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST"),  # имя сервиса базы данных в docker-compose.yml
         "PORT": os.getenv("DB_PORT"),
+        # Пул psycopg (DB_POOL=True) или постоянные соединения, см. database.py
+        **database_options(os.environ),
     }
 }
 
+# Реплика для чтения (необязательна): безопасные запросы читают с неё,
+# после записи клиент на несколько секунд закрепляется за default
+if os.getenv("DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.getenv("DB_REPLICA_HOST"),
+        "PORT": os.getenv("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["resort.db_routing.PrimaryReplicaRouter"]
+
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
@@ -180,6 +199,39 @@ MEDIA_URL = "/media/"
 # Путь на файловой системе, где будут храниться загруженные медиафайлы.
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Загрузки хешируются при приёме: одинаковые фотографии хранятся одним
+# файлом (resort/storage.py)
+FILE_UPLOAD_HANDLERS = [
+    "resort.storage.HashingMemoryFileUploadHandler",
+    "resort.storage.HashingTemporaryFileUploadHandler",
+]
+
+# Медиафайлы отдаются после проверки доступа (resort/media.py). Байты
+# передаёт прокси: "nginx" - X-Accel-Redirect на internal-location
+# MEDIA_ACCEL_PREFIX (alias на MEDIA_ROOT), "sendfile" - X-Sendfile
+# (Apache, lighttpd). Пусто - отдаёт сам Django (разработка)
+MEDIA_SENDFILE = os.getenv("MEDIA_SENDFILE", "")
+MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/protected-media/")
+
+# Варианты фотографий поездок (resort/images.py): размер - сторона квадрата,
+# в который вписывается изображение, формат - качество кодирования
+TRIP_MEDIA_VARIANT_SIZES = [300, 1024, 2048]
+TRIP_MEDIA_VARIANT_FORMATS = {"jpeg": 85, "webp": 80}
+# Бюджет декодирования: 40 Мп - около 120 МБ в RGB. JPEG декодируется
+# сразу уменьшенным и почти всегда укладывается, PNG - целиком
+TRIP_MEDIA_MAX_DECODE_PIXELS = 40_000_000
+# Фотографий в одном запросе пакетной загрузки (POST /api/trips/{id}/media/)
+TRIP_MEDIA_UPLOAD_MAX_FILES = 50
+# Возобновляемая загрузка частями (resort/uploads.py): наибольший файл и
+# срок, после которого брошенная загрузка удаляется (purge_media_uploads)
+TRIP_MEDIA_UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+TRIP_MEDIA_UPLOAD_EXPIRES = timedelta(days=1)
+# Поток SSE готовности вариантов (resort/events.py), в секундах:
+# комментарий-keepalive, время жизни соединения и пауза переподключения
+TRIP_MEDIA_EVENTS_KEEPALIVE = 15
+TRIP_MEDIA_EVENTS_TIMEOUT = 5 * 60
+TRIP_MEDIA_EVENTS_RETRY = 3
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -253,7 +305,8 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 10,
     # Аутентификация (пока оставим базовую)
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",  # JWT аутентификация
+        # JWT аутентификация, пользователь кэшируется (без запроса к БД на каждый вызов)
+        "resort.api.authentication.CachedJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",  # Для browsable API
     ],
     # Права доступа по умолчанию
@@ -268,9 +321,10 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     # Список классов для ограничения количества запросов
+    # (скользящее окно в Redis, атомарный Lua-скрипт за один round trip)
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "resort.api.throttles.RedisAnonRateThrottle",
+        "resort.api.throttles.RedisUserRateThrottle",
     ],
     # Глобальные лимиты для каждого класса
     "DEFAULT_THROTTLE_RATES": {
@@ -278,6 +332,7 @@ REST_FRAMEWORK = {
         "user": "100/minute",  # Авторизованные - 100 запросов в минуту
         "auth": "5/minute",  # Лимит для получения JWT токенов
         "trips_create": "10/hour",  # Лимит для создания поездок
+        "media_upload": "30/hour",  # Лимит для пакетной загрузки фотографий
     },
 }
 
@@ -291,8 +346,17 @@ SIMPLE_JWT = {
     "SIGNING_KEY": SECRET_KEY,
     "AUTH_HEADER_TYPES": ("Bearer",),  # Формат: Authorization: Bearer <token>
     "AUTH_HEADER_NAME": "HTTP_AUTHORIZATION",
+    # Отпечаток пароля в claim hash_password: после смены пароля токены недействительны
+    "CHECK_REVOKE_TOKEN": True,
+    # Refresh-токены с чёрным списком в TOKEN_BLACKLIST_STORE (resort/api/tokens.py)
+    "TOKEN_OBTAIN_SERIALIZER": "resort.api.serializers.TokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "resort.api.serializers.TokenRefreshSerializer",
 }
 
+# Хранилище чёрного списка refresh-токенов: jti в Redis с TTL.
+# Прежние таблицы - "resort.api.tokens.DatabaseTokenBlacklist"
+TOKEN_BLACKLIST_STORE = "resort.api.tokens.RedisTokenBlacklist"
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "SkiTrip Journal API",
     "DESCRIPTION": "API для журнала поездок на горнолыжные курорты России",
@@ -326,6 +390,9 @@ SPECTACULAR_SETTINGS = {
     "SCHEMA_PATH_PREFIX": r"/api/",
 }
 
+# OpenAPI-схема, сгенерированная при деплое (см. entrypoint.sh, resort/api/schema.py)
+OPENAPI_SCHEMA_FILE = BASE_DIR / "openapi-schema.json"
+
 # Celery конфигурация
 # Broker (используем используем Redis базу 0 для Celery)
 CELERY_BROKER_URL = "redis://redis:6379/0"
@@ -7,8 +7,14 @@ REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"] = {
     "user": "100000/minute",
     "auth": "100000/minute",
     "trips_create": "100000/hour",
+    "media_upload": "100000/hour",
 }
 
 # Celery в тестах: выполнять задачи синхронно, без реального брокера
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
+
+# Реплика - зеркало тестовой БД. Маршрутизация на неё включается только
+# в тестах роутера (resort/tests/test_db_routing.py)
+DATABASES["replica"] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+DATABASE_REPLICAS = []
@@ -21,12 +21,13 @@ from django.urls import path, include
 from django.contrib.auth import views as auth_views
 from django.views.static import serve
 from drf_spectacular.views import (  # ✨ Импорт
-    SpectacularAPIView,
     SpectacularSwaggerView,
     SpectacularRedocView,
 )
 
 from config import settings
+from resort.api.schema import PrecomputedSpectacularAPIView
+from resort.media import serve_media
 from resort.views import page_not_found
 
 urlpatterns = [
@@ -66,7 +67,8 @@ urlpatterns = [
     # API URLs
     path("api/", include("resort.api.urls")),
     # API Documentation URLs
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    # Схема генерируется при деплое и отдаётся из памяти (живая - только в DEBUG)
+    path("api/schema/", PrecomputedSpectacularAPIView.as_view(), name="schema"),
     path(
         "api/docs/",
         SpectacularSwaggerView.as_view(url_name="schema"),
@@ -82,7 +84,11 @@ if settings.DEBUG:
         path("__debug__/", include(debug_toolbar.urls)),
     ]
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# Медиафайлы - с проверкой доступа к фотографии (в т.ч. в DEBUG)
+urlpatterns += [
+    path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>", serve_media, name="media"),
+]
 
 # Отдача robots.txt
 urlpatterns += [
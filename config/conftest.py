@@ -0,0 +1,36 @@
+import pytest
+from django.core.cache import cache
+
+from resort.cache_keys import CacheKeys
+from resort.snapshot import resort_catalog
+
+
+@pytest.fixture(autouse=True)
+def clear_resort_snapshot():
+    """
+    Снимок курортов живёт в памяти процесса, счётчики поездок - в Redis
+    (сбрасываются после коммита, а тест откатывается): не переносим их
+    между тестами.
+    """
+    resort_catalog.clear()
+    cache.delete(CacheKeys.RESORT_TRIP_COUNTERS)
+    yield
+    resort_catalog.clear()
+    cache.delete(CacheKeys.RESORT_TRIP_COUNTERS)
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    """
+    Файлы любого теста пишутся во временный каталог, а не в config/media/.
+    Тесты, которым нужен сам каталог, получают его этой фикстурой.
+    """
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def single_variant(settings):
+    """Один вариант (JPEG 300px): тестам, не проверяющим набор вариантов."""
+    settings.TRIP_MEDIA_VARIANT_SIZES = [300]
+    settings.TRIP_MEDIA_VARIANT_FORMATS = {"jpeg": 85}
@@ -0,0 +1,86 @@
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from resort.cache_keys import CacheKeys, CacheTimeouts
+
+# Поля пользователя, которые хранятся в кэше. Остальные (date_joined,
+# last_login, ...) при обращении догрузятся из БД как отложенные
+CACHED_USER_FIELDS = (
+    "id",
+    "username",
+    "email",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+)
+
+# Изменение этих полей сбрасывает кэш (см. resort/signals.py)
+AUTH_USER_FIELDS = {*CACHED_USER_FIELDS, "password"}
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication без запроса к таблице пользователей на каждый вызов API.
+
+    Пользователь берётся из кэша по id из токена (CacheKeys.auth_user) на
+    CacheTimeouts.AUTH_USER секунд. Вместо хеша пароля в кэше лежит его
+    md5-отпечаток: с CHECK_REVOKE_TOKEN он же записывается в claim
+    hash_password каждого токена. Если пароль сменился, отпечатки не совпадут
+    и токен будет отклонён. Деактивация, смена пароля и удаление пользователя
+    сбрасывают кэш сигналами.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = CacheKeys.auth_user(user_id)
+        state = cache.get(key)
+        if state is None:
+            user = self.load_user(user_id)
+            state = {
+                "fields": {name: getattr(user, name) for name in CACHED_USER_FIELDS},
+                "password_hash": get_md5_hash_password(user.password),
+            }
+            cache.set(key, state, CacheTimeouts.AUTH_USER)
+        else:
+            user = self.user_model.from_db(
+                router.db_for_read(self.user_model),
+                list(state["fields"]),
+                list(state["fields"].values()),
+            )
+
+        if not state["fields"]["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        # Токены, выданные до включения CHECK_REVOKE_TOKEN, claim не содержат
+        token_hash = validated_token.get(api_settings.REVOKE_TOKEN_CLAIM)
+        if token_hash is not None and token_hash != state["password_hash"]:
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+
+        return user
+
+    def load_user(self, user_id):
+        """
+        Пользователь из БД (при промахе кэша). Читается из основной БД:
+        после смены пароля реплика ещё может отдать старый хеш.
+        """
+        users = self.user_model.objects.using(DEFAULT_DB_ALIAS)
+        try:
+            return users.get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+
+def invalidate_auth_user(user_id):
+    """Сброс закэшированного пользователя (деактивация, смена пароля, удаление)."""
+    cache.delete(CacheKeys.auth_user(user_id))
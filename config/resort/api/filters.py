@@ -1,6 +1,11 @@
 import django_filters
+from django.contrib.postgres.lookups import TrigramSimilar
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import F
+from django.db.models.functions import Upper
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
 
-from resort.models import Resort, Trip
+from resort.models import SEARCH_CONFIG, Resort, Trip
 
 
 class ResortFilter(django_filters.FilterSet):
@@ -20,9 +25,32 @@ class ResortFilter(django_filters.FilterSet):
         label="Название курорта (частичное совпадение)",
     )
 
+    # Нечёткий поиск по названию с опечатками (pg_trgm), сортировка по сходству
+    name__fuzzy = django_filters.CharFilter(
+        method="filter_fuzzy",
+        label="Название курорта (нечёткое совпадение)",
+    )
+
     class Meta:
         model = Resort
-        fields = ["region", "name"]
+        fields = ["region", "name", "name__fuzzy"]
+
+    def filter_fuzzy(self, queryset, name, value):
+        """
+        Триграммное сходство UPPER(поле) % UPPER(значение). Индексы построены
+        по UPPER(), как и icontains, поэтому оператор % использует тот же
+        GIN-индекс resort_*_upper_trgm. Без явного ?ordering= результаты
+        сортируются по убыванию сходства.
+        """
+        field = name.split("__")[0]
+        value = value.upper()
+        queryset = queryset.filter(TrigramSimilar(Upper(field), value)).annotate(
+            similarity=TrigramSimilarity(Upper(field), value)
+        )
+        request = self.request
+        if request and OrderingFilter.ordering_param in request.query_params:
+            return queryset
+        return queryset.order_by("-similarity", field)
 
 
 class TripFilter(django_filters.FilterSet):
@@ -71,3 +99,50 @@ class TripFilter(django_filters.FilterSet):
             "end_date_from",
             "end_date_to",
         ]
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Полнотекстовый поиск PostgreSQL по параметру ?q=.
+
+    Ищет по поддерживаемому сигналами полю search_vector (GIN-индекс,
+    русская морфология) вместо ILIKE '%...%' по JOIN.
+    Результаты сортируются по релевантности (SearchRank), если клиент
+    не передал явный ?ordering=. Старый ?search= продолжает работать.
+    """
+
+    search_param = "q"
+    search_description = "Полнотекстовый поиск (русская морфология, ранжирование)"
+
+    def get_search_query(self, request):
+        """Строка запроса или None."""
+        query = request.query_params.get(self.search_param, "").strip()
+        return query or None
+
+    def filter_queryset(self, request, queryset, view):
+        """Фильтрация по tsvector и ранжирование."""
+        query = self.get_search_query(request)
+        if query is None:
+            return queryset
+
+        # websearch: "кавказ -сочи", "фраза в кавычках", OR
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+        queryset = queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F("search_vector"), search_query)
+        )
+
+        if OrderingFilter.ordering_param in request.query_params:
+            return queryset
+        return queryset.order_by("-search_rank", "-pk")
+
+    def get_schema_operation_parameters(self, view):
+        """Параметр ?q= в OpenAPI схеме."""
+        return [
+            {
+                "name": self.search_param,
+                "required": False,
+                "in": "query",
+                "description": self.search_description,
+                "schema": {"type": "string"},
+            },
+        ]
@@ -0,0 +1,203 @@
+import base64
+from datetime import date
+from urllib import parse
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class TripKeysetPagination(BasePagination):
+    """
+    Keyset (cursor) пагинация поездок по ключу (start_date, id).
+
+    Порядок совпадает с сортировкой модели Trip (-start_date) и индексом
+    по -start_date, а id гарантирует стабильность при одинаковых датах.
+    Вместо OFFSET страница выбирается условием
+    (start_date, id) < (последняя дата, последний id), поэтому глубокие
+    страницы стоят столько же, сколько первая, и COUNT(*) не выполняется.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Неверный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Возвращает одну страницу поездок после/до позиции из курсора."""
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+
+        if self.cursor is None:
+            start_date, trip_id, reverse = None, None, False
+        else:
+            start_date, trip_id, reverse = self.cursor
+
+        if reverse:
+            # Назад: идём по возрастанию ключа и затем разворачиваем страницу
+            queryset = queryset.order_by("start_date", "id")
+            if start_date is not None:
+                queryset = queryset.filter(
+                    Q(start_date__gt=start_date)
+                    | Q(start_date=start_date, id__gt=trip_id)
+                )
+        else:
+            queryset = queryset.order_by("-start_date", "-id")
+            if start_date is not None:
+                queryset = queryset.filter(
+                    Q(start_date__lt=start_date)
+                    | Q(start_date=start_date, id__lt=trip_id)
+                )
+
+        # Берём на один элемент больше, чтобы узнать, есть ли следующая страница
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        """Ответ в формате {next, previous, results}."""
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        """Схема ответа для drf-spectacular."""
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self):
+        """Ссылка на следующую страницу: позиция последней поездки на странице."""
+        if not self.has_next:
+            return None
+        if self.page:
+            last = self.page[-1]
+            return self.encode_cursor(last.start_date, last.id, reverse=False)
+        # Пустая страница при движении назад: продолжаем с исходной позиции
+        start_date, trip_id, _ = self.cursor
+        return self.encode_cursor(start_date, trip_id, reverse=False)
+
+    def get_previous_link(self):
+        """Ссылка на предыдущую страницу: позиция первой поездки на странице."""
+        if not self.has_previous:
+            return None
+        if self.page:
+            first = self.page[0]
+            return self.encode_cursor(first.start_date, first.id, reverse=True)
+        # Пустая страница при движении вперёд: возвращаемся к исходной позиции
+        start_date, trip_id, _ = self.cursor
+        return self.encode_cursor(start_date, trip_id, reverse=True)
+
+    def decode_cursor(self, request):
+        """Разбирает курсор из query-параметра, None - первая страница."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            querystring = base64.urlsafe_b64decode(encoded.encode("ascii")).decode()
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            start_date = date.fromisoformat(tokens["d"][0])
+            trip_id = int(tokens["i"][0])
+            reverse = bool(int(tokens.get("r", ["0"])[0]))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return start_date, trip_id, reverse
+
+    def encode_cursor(self, start_date, trip_id, reverse):
+        """Кодирует позицию (start_date, id) и направление в ссылку."""
+        tokens = {"d": start_date.isoformat(), "i": trip_id}
+        if reverse:
+            tokens["r"] = "1"
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = base64.urlsafe_b64encode(querystring.encode()).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+
+class TripPagination(PageNumberPagination):
+    """
+    Пагинация поездок с opt-in режимом курсора.
+
+    По умолчанию работает как обычная PageNumberPagination (?page=N).
+    Клиент включает keyset-режим параметром ?pagination=cursor
+    (или переходом по ссылке с ?cursor=...), после чего ответы содержат
+    только next/previous курсоры без count.
+    """
+
+    mode_query_param = "pagination"
+    cursor_mode = "cursor"
+
+    def __init__(self):
+        self.keyset = TripKeysetPagination()
+        self.use_cursor = False
+
+    def is_cursor_mode(self, request):
+        """Включён ли keyset-режим для текущего запроса."""
+        params = request.query_params
+        return (
+            params.get(self.mode_query_param) == self.cursor_mode
+            or self.keyset.cursor_query_param in params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Выбор режима пагинации по параметрам запроса."""
+        self.use_cursor = self.is_cursor_mode(request)
+        if self.use_cursor:
+            page = self.keyset.paginate_queryset(queryset, request, view)
+            # Номер страницы в keyset-режиме не используется
+            self.keyset.base_url = remove_query_param(
+                self.keyset.base_url, self.page_query_param
+            )
+            return page
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        """Формат ответа зависит от выбранного режима."""
+        if self.use_cursor:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        """Документируем параметры обоих режимов пагинации."""
+        parameters = super().get_schema_operation_parameters(view)
+        parameters += [
+            {
+                "name": self.mode_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Режим пагинации: 'cursor' включает keyset-пагинацию "
+                "по (start_date, id) без подсчёта общего количества.",
+                "schema": {"type": "string", "enum": [self.cursor_mode]},
+            },
+            {
+                "name": self.keyset.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Курсор из полей next/previous предыдущего ответа.",
+                "schema": {"type": "string"},
+            },
+        ]
+        return parameters
@@ -0,0 +1,127 @@
+"""Отдача заранее сгенерированной OpenAPI-схемы.
+
+drf-spectacular строит схему, обходя все viewset'ы, serializers и
+filterset'ы, - это сотни миллисекунд CPU на каждый запрос /api/schema/
+(его же запрашивают /api/docs/ и /api/redoc/). Схема меняется только
+вместе с кодом, поэтому:
+
+- при деплое она генерируется в файл settings.OPENAPI_SCHEMA_FILE
+  (entrypoint.sh, команда spectacular --format openapi-json);
+- без файла схема строится один раз на процесс;
+- готовые байты для каждого формата (YAML/JSON) и их gzip-версии
+  запоминаются в памяти процесса и отдаются с ETag.
+
+В DEBUG схема, как и раньше, генерируется на каждый запрос.
+"""
+
+import gzip
+import hashlib
+import json
+import re
+import threading
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+# Как в django.middleware.gzip
+accepts_gzip = re.compile(r"\bgzip\b")
+
+
+@dataclass(frozen=True)
+class RenderedSchema:
+    """Схема, отрендеренная в один формат."""
+
+    content_type: str
+    content: bytes
+    gzipped: bytes
+    etag: str  # Хеш содержимого в кавычках, как требует HTTP
+
+    @property
+    def gzip_etag(self):
+        """gzip-версия - другое представление, ей нужен свой ETag."""
+        return f'{self.etag[:-1]}-gzip"'
+
+
+class PrecomputedSpectacularAPIView(SpectacularAPIView):
+    """SpectacularAPIView, отдающий схему из памяти процесса."""
+
+    _lock = threading.Lock()
+    _schema = None  # Словарь схемы
+    _rendered = {}  # Media type рендерера -> RenderedSchema
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        # Живая генерация: в DEBUG и для нестандартных версии/языка схемы
+        if settings.DEBUG or "lang" in request.GET or "version" in request.GET:
+            return super().get(request, *args, **kwargs)
+
+        rendered = self.get_rendered_schema(request)
+        use_gzip = accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        etag = rendered.gzip_etag if use_gzip else rendered.etag
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(
+                rendered.gzipped if use_gzip else rendered.content,
+                content_type=rendered.content_type,
+            )
+            if use_gzip:
+                response["Content-Encoding"] = "gzip"
+            response["Content-Disposition"] = (
+                f'inline; filename="{self._get_filename(request, None)}"'
+            )
+        response["ETag"] = etag
+        patch_vary_headers(response, ["Accept", "Accept-Encoding"])
+        return response
+
+    def get_rendered_schema(self, request):
+        """Схема в формате, выбранном content negotiation, с мемоизацией."""
+        renderer = request.accepted_renderer
+        rendered = self._rendered.get(renderer.media_type)
+        if rendered is not None:
+            return rendered
+
+        with self._lock:
+            rendered = self._rendered.get(renderer.media_type)
+            if rendered is None:
+                content = renderer.render(
+                    self.get_schema(), renderer.media_type, self.get_renderer_context()
+                )
+                content_type = renderer.media_type
+                if renderer.charset:
+                    content_type = f"{content_type}; charset={renderer.charset}"
+                rendered = RenderedSchema(
+                    content_type=content_type,
+                    content=content,
+                    gzipped=gzip.compress(content, compresslevel=9, mtime=0),
+                    etag=f'"{hashlib.sha256(content).hexdigest()[:32]}"',
+                )
+                self._rendered[renderer.media_type] = rendered
+        return rendered
+
+    def get_schema(self):
+        """Схема из файла, собранного при деплое, или сгенерированная один раз."""
+        cls = type(self)
+        if cls._schema is None:
+            schema_file = settings.OPENAPI_SCHEMA_FILE
+            if schema_file and schema_file.exists():
+                cls._schema = json.loads(schema_file.read_bytes())
+            else:
+                generator = self.generator_class(
+                    urlconf=self.urlconf, api_version=self.api_version
+                )
+                cls._schema = generator.get_schema(
+                    request=None, public=self.serve_public
+                )
+        return cls._schema
+
+    @classmethod
+    def clear(cls):
+        """Сброс мемоизированной схемы (тесты, перегенерация файла)."""
+        with cls._lock:
+            cls._schema = None
+            cls._rendered = {}
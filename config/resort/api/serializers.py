@@ -1,6 +1,15 @@
+import os
+
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.validators import get_available_image_extensions
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
-from resort.models import Resort, Trip, TripMedia
+from rest_framework_simplejwt import serializers as jwt_serializers
+from resort.models import MediaUpload, Resort, Trip, TripMedia, TripMediaVariant
+from resort.snapshot import resort_catalog, trip_counters, with_trip_counters
+
+from .tokens import StoreRefreshToken
 
 
 class ResortSerializer(serializers.ModelSerializer):
@@ -8,8 +17,46 @@ class ResortSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Resort
-        fields = ["id", "name", "slug", "region", "description", "created_at"]
-        read_only_fields = ["id", "slug", "created_at"]
+        fields = [
+            "id",
+            "name",
+            "slug",
+            "region",
+            "description",
+            "created_at",
+            "trips_count",  # Денормализованные счётчики, без дополнительных запросов
+            "public_trips_count",
+        ]
+        read_only_fields = [
+            "id",
+            "slug",
+            "created_at",
+            "trips_count",
+            "public_trips_count",
+        ]
+
+
+@extend_schema_field(ResortSerializer)
+class SnapshotResortField(serializers.Field):
+    """
+    Вложенный курорт поездки из снимка справочника: готовый словарь
+    по trip.resort_id, без JOIN и повторной сериализации на каждую поездку.
+    Счётчики поездок читаются из Redis один раз на ответ (в контексте).
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, trip):
+        data = resort_catalog.get().serialized_by_id.get(trip.resort_id)
+        if data is None:
+            return ResortSerializer(trip.resort, context=self.context).data
+        # Контекст общий для всех поездок списка
+        if "trip_counters" not in self.context:
+            self.context["trip_counters"] = trip_counters()
+        return with_trip_counters(data, self.context["trip_counters"])
 
 
 class TripWriteSerializer(serializers.ModelSerializer):
@@ -58,7 +105,7 @@ class TripReadSerializer(serializers.ModelSerializer):
 
     # Отображение пользователя по его строковому представлению
     user = serializers.StringRelatedField()
-    resort = ResortSerializer(read_only=True)
+    resort = SnapshotResortField()
 
     class Meta:
         model = Trip
@@ -75,28 +122,112 @@ class TripReadSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at"]
 
 
+class TripMediaVariantSerializer(serializers.ModelSerializer):
+    """Serializer для одного варианта фотографии."""
+
+    url = serializers.ImageField(source="file", read_only=True)
+
+    class Meta:
+        model = TripMediaVariant
+        fields = ["url", "width", "height"]
+
+
 class TripMediaSerializer(serializers.ModelSerializer):
     """Serializer для отображения медиа из модели TripMedia."""
 
     # Показать только trip_id, а не весь объект
     trip = serializers.PrimaryKeyRelatedField(read_only=True)
+    # {"webp": {"300": {"url": ..., "width": ..., "height": ...}, ...}, "jpeg": ...}
+    variants = serializers.SerializerMethodField()
 
     class Meta:
         model = TripMedia
-        fields = ["id", "trip", "image", "uploaded_at"]
+        fields = ["id", "trip", "image", "variants", "uploaded_at"]
         read_only_fields = ["id", "uploaded_at"]
 
+    @extend_schema_field(
+        serializers.DictField(
+            child=serializers.DictField(child=TripMediaVariantSerializer())
+        )
+    )
+    def get_variants(self, media):
+        """Варианты по формату и размеру; пустой словарь, пока они не готовы."""
+        variants = {}
+        for variant in media.variants.all():
+            variants.setdefault(variant.format, {})[str(variant.size)] = (
+                TripMediaVariantSerializer(variant, context=self.context).data
+            )
+        return variants
+
+
+class TripMediaUploadSerializer(serializers.Serializer):
+    """Serializer пакетной загрузки фотографий (multipart, поле images)."""
+
+    images = serializers.ListField(child=serializers.ImageField(), allow_empty=False)
+
+    def validate_images(self, images):
+        """Не больше TRIP_MEDIA_UPLOAD_MAX_FILES файлов за один запрос."""
+        limit = settings.TRIP_MEDIA_UPLOAD_MAX_FILES
+        if len(images) > limit:
+            raise serializers.ValidationError(
+                f"Не больше {limit} фотографий за один запрос."
+            )
+        return images
+
+
+class MediaUploadSerializer(serializers.ModelSerializer):
+    """Serializer возобновляемой загрузки фотографии (resort/uploads.py)."""
+
+    class Meta:
+        model = MediaUpload
+        fields = ["id", "trip", "filename", "size", "offset", "media", "created_at"]
+        read_only_fields = ["id", "offset", "media", "created_at"]
+
+    def validate_trip(self, trip):
+        """Загружать можно только в свои поездки."""
+        if trip.user_id != self.context["request"].user.id:
+            raise serializers.ValidationError(
+                "Загружать фото можно только в свои поездки."
+            )
+        return trip
+
+    def validate_filename(self, filename):
+        """Имя без каталогов, с расширением изображения."""
+        filename = os.path.basename(filename)
+        extension = os.path.splitext(filename)[1][1:].lower()
+        if extension not in get_available_image_extensions():
+            raise serializers.ValidationError("Файл должен быть изображением.")
+        return filename
+
+    def validate_size(self, size):
+        """Размер файла - от 1 байта до TRIP_MEDIA_UPLOAD_MAX_SIZE."""
+        limit = settings.TRIP_MEDIA_UPLOAD_MAX_SIZE
+        if not 0 < size <= limit:
+            raise serializers.ValidationError(
+                f"Размер файла должен быть от 1 до {limit} байт."
+            )
+        return size
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer для отображения профиля пользователя."""
 
-    trips_count = serializers.SerializerMethodField()
+    # Количество публичных поездок из аннотации queryset (см. UserViewSet)
+    trips_count = serializers.IntegerField(source="public_trips_count", read_only=True)
 
     class Meta:
         model = User
         fields = ["id", "username", "date_joined", "trips_count"]
         read_only_fields = ["id", "username", "date_joined"]
 
-    def get_trips_count(self, obj):
-        """Возвращает количество поездок пользователя."""
-        return obj.trips.filter(is_public=True).count()
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    """Выдача JWT: refresh-токен с чёрным списком в TOKEN_BLACKLIST_STORE."""
+
+    token_class = StoreRefreshToken
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """Обновление JWT: отозванный при ротации токен уходит в TOKEN_BLACKLIST_STORE."""
+
+    token_class = StoreRefreshToken
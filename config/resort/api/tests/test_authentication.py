@@ -0,0 +1,111 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from resort.cache_keys import CacheKeys
+
+
+def user_queries(queries):
+    """Запросы к таблице пользователей."""
+    return [q["sql"] for q in queries.captured_queries if '"auth_user"' in q["sql"]]
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+    """Тесты JWT-аутентификации с кэшированием пользователя."""
+
+    def test_user_not_loaded_from_db_on_every_request(self, authenticated_client, user):
+        """Со второго запроса пользователь берётся из кэша, без auth_user."""
+        url = reverse("trip-list")
+        authenticated_client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert user_queries(queries) == []
+
+    def test_cached_user_is_request_user(self, authenticated_client, user, trip):
+        """Пользователь из кэша видит свои приватные поездки, как из БД."""
+        trip.is_public = False
+        trip.save()
+        authenticated_client.get(reverse("trip-list"))
+
+        response = authenticated_client.get(reverse("trip-list"))
+
+        assert [t["id"] for t in response.data["results"]] == [trip.id]
+
+    def test_deactivated_user_rejected(
+        self, authenticated_client, user, django_capture_on_commit_callbacks
+    ):
+        """Деактивация сбрасывает кэш: токен перестаёт работать сразу."""
+        authenticated_client.get(reverse("trip-list"))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.is_active = False
+            user.save()
+
+        response = authenticated_client.get(reverse("trip-list"))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_password_change_revokes_tokens(
+        self, api_client, authenticated_client, user, django_capture_on_commit_callbacks
+    ):
+        """После смены пароля старые токены отклоняются, новые работают."""
+        authenticated_client.get(reverse("trip-list"))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.set_password("newpass456")
+            user.save()
+
+        response = authenticated_client.get(reverse("trip-list"))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        access = RefreshToken.for_user(user).access_token
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        assert api_client.get(reverse("trip-list")).status_code == status.HTTP_200_OK
+
+    def test_token_without_password_claim_accepted(self, api_client, user):
+        """Токены, выданные до включения CHECK_REVOKE_TOKEN, продолжают работать."""
+        access = RefreshToken.for_user(user).access_token
+        del access["hash_password"]
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+        assert api_client.get(reverse("trip-list")).status_code == status.HTTP_200_OK
+
+    def test_last_login_update_keeps_cache(self, authenticated_client, user):
+        """Обновление last_login при входе не сбрасывает кэш."""
+        authenticated_client.get(reverse("trip-list"))
+
+        user.save(update_fields=["last_login"])
+
+        assert cache.get(CacheKeys.auth_user(user.pk)) is not None
+
+    def test_deleted_user_rejected(
+        self, authenticated_client, user, django_capture_on_commit_callbacks
+    ):
+        """Удалённый пользователь не аутентифицируется из кэша."""
+        authenticated_client.get(reverse("trip-list"))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.delete()
+
+        response = authenticated_client.get(reverse("trip-list"))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_cache_cleared_after_commit(
+        self, authenticated_client, user, django_capture_on_commit_callbacks
+    ):
+        """До коммита кэш не сбрасывается: его не заполнят старой строкой."""
+        authenticated_client.get(reverse("trip-list"))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.is_active = False
+            user.save()
+            assert cache.get(CacheKeys.auth_user(user.pk)) is not None
+
+        assert cache.get(CacheKeys.auth_user(user.pk)) is None
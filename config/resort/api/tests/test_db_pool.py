@@ -0,0 +1,112 @@
+import copy
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.utils import load_backend
+from django.urls import reverse
+from rest_framework import status
+
+from config.database import database_options, pool_size
+from resort.api.views import pool_stats
+
+
+@pytest.fixture
+def pooled_connection():
+    """Соединение с тестовой БД с профилем DB_POOL=True и пулом на 2 соединения."""
+    settings_dict = copy.deepcopy(connection.settings_dict)
+    settings_dict.update(
+        database_options(
+            {"DB_POOL": "True", "WEB_CONCURRENCY": "1", "GUNICORN_THREADS": "2"}
+        )
+    )
+    wrapper = load_backend(settings_dict["ENGINE"]).DatabaseWrapper(
+        settings_dict, "pool_stats_test"
+    )
+    wrapper.pool.open(wait=True)
+    yield wrapper
+    wrapper.close_pool()
+
+
+class TestDatabaseOptions:
+    """Тесты профиля подключения к БД."""
+
+    def test_persistent_connections_without_pool(self):
+        """Без DB_POOL - постоянные соединения с проверкой."""
+        options = database_options({})
+
+        assert options["CONN_MAX_AGE"] == 60
+        assert options["CONN_HEALTH_CHECKS"] is True
+        assert "pool" not in options["OPTIONS"]
+
+    def test_asgi_without_persistent_connections(self):
+        """Под ASGI без пула соединение закрывается после каждого запроса."""
+        options = database_options(
+            {"DJANGO_SERVER_INTERFACE": "asgi", "DB_CONN_MAX_AGE": "60"}
+        )
+
+        assert options["CONN_MAX_AGE"] == 0
+        assert options["CONN_HEALTH_CHECKS"] is True
+
+    def test_pool_profile(self):
+        """DB_POOL=True включает пул, CONN_MAX_AGE с ним несовместим."""
+        options = database_options(
+            {"DB_POOL": "True", "WEB_CONCURRENCY": "4", "GUNICORN_THREADS": "8"}
+        )
+
+        assert options["CONN_MAX_AGE"] == 0
+        assert options["CONN_HEALTH_CHECKS"] is True
+        assert options["OPTIONS"]["pool"]["max_size"] == 8
+
+    @pytest.mark.parametrize(
+        "workers, threads, max_connections, expected",
+        [
+            (3, 1, 90, 1),  # sync-воркеры: одно соединение на процесс
+            (4, 8, 90, 8),  # gthread: по соединению на поток
+            (4, 32, 90, 22),  # потоков больше бюджета - делим бюджет
+        ],
+    )
+    def test_pool_size(self, workers, threads, max_connections, expected):
+        assert pool_size(workers, threads, max_connections) == expected
+
+    def test_pool_size_over_budget(self):
+        """Процессов больше, чем соединений в бюджете, - ошибка конфигурации."""
+        with pytest.raises(ImproperlyConfigured):
+            pool_size(workers=10, threads=1, max_connections=5)
+
+
+@pytest.mark.django_db
+class TestPoolStats:
+    """Тесты метрик пула соединений."""
+
+    def test_no_pool(self):
+        assert pool_stats(connection) is None
+
+    def test_saturation(self, pooled_connection):
+        """Одно соединение из двух выдано - пул заполнен наполовину."""
+        with pooled_connection.pool.connection():
+            stats = pool_stats(pooled_connection)
+
+        assert stats["pool_max"] == 2
+        assert stats["pool_available"] == 1
+        assert stats["saturation"] == 0.5
+
+    def test_endpoint_for_admin(self, api_client, user):
+        user.is_staff = True
+        user.save()
+        api_client.force_authenticate(user)
+
+        response = api_client.get(reverse("db_pool_stats"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["default"] is None
+
+    def test_endpoint_forbidden_for_user(self, authenticated_client):
+        response = authenticated_client.get(reverse("db_pool_stats"))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_endpoint_requires_auth(self, api_client):
+        response = api_client.get(reverse("db_pool_stats"))
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
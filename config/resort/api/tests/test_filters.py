@@ -1,7 +1,11 @@
 import pytest
+from django.db import connection, transaction
 from django.urls import reverse
 from rest_framework import status
 
+from resort.api.filters import ResortFilter, TripFilter
+from resort.models import Resort
+
 
 @pytest.mark.django_db
 class TestResortFilters:
@@ -197,3 +201,75 @@ class TestTripFilters:
         assert response.status_code == status.HTTP_200_OK
         assert response.data["results"][0]["id"] == trip2.id
         assert response.data["results"][1]["id"] == trip1.id
+
+
+@pytest.mark.django_db
+class TestResortFuzzyFilter:
+    """Тесты нечёткого поиска курортов ?name__fuzzy= (pg_trgm)."""
+
+    def test_fuzzy_tolerates_typo(self, api_client, resort, another_resort):
+        """Опечатка в названии всё равно находит курорт."""
+        response = api_client.get(reverse("resort-list"), {"name__fuzzy": "шерегежь"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [r["id"] for r in response.data["results"]] == [another_resort.id]
+
+    def test_fuzzy_ordered_by_similarity(self, api_client, resort):
+        """Более похожее название идёт первым, несмотря на алфавит."""
+        closer = Resort.objects.create(
+            name="Роза Пик", region="Краснодарский край", slug="roza-pik"
+        )
+
+        response = api_client.get(reverse("resort-list"), {"name__fuzzy": "Роза Пик"})
+
+        assert [r["id"] for r in response.data["results"]] == [closer.id, resort.id]
+
+    def test_fuzzy_respects_explicit_ordering(self, api_client, resort):
+        """С ?ordering= сортировка по сходству не применяется."""
+        Resort.objects.create(name="Роза Пик", region="Краснодарский край", slug="rp")
+
+        response = api_client.get(
+            reverse("resort-list"), {"name__fuzzy": "Роза Пик", "ordering": "name"}
+        )
+
+        assert [r["name"] for r in response.data["results"]] == [
+            "Роза Пик",
+            "Роза Хутор",
+        ]
+
+
+@pytest.mark.django_db
+class TestTrigramIndexUsage:
+    """Фильтры по подстроке используют GIN-индексы pg_trgm, а не Seq Scan."""
+
+    @pytest.fixture(autouse=True)
+    def no_seqscan(self):
+        """
+        На крошечной тестовой таблице планировщик выберет Seq Scan или полный
+        обход первичного ключа. Оставляем ему только bitmap-сканирование:
+        оно возможно лишь по индексу, применимому к условию запроса.
+        """
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_indexscan = off")
+            yield
+
+    def test_name_icontains_uses_index(self, resort):
+        plan = ResortFilter({"name": "хутор"}).qs.explain()
+
+        assert "resort_name_upper_trgm" in plan
+
+    def test_region_icontains_uses_index(self, resort):
+        plan = ResortFilter({"region": "краснодар"}).qs.explain()
+
+        assert "resort_region_upper_trgm" in plan
+
+    def test_trip_resort_region_uses_index(self, trip):
+        plan = TripFilter({"resort_region": "краснодар"}).qs.explain()
+
+        assert "resort_region_upper_trgm" in plan
+
+    def test_fuzzy_uses_index(self, resort):
+        plan = ResortFilter({"name__fuzzy": "хутр"}).qs.explain()
+
+        assert "resort_name_upper_trgm" in plan
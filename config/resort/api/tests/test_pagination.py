@@ -0,0 +1,132 @@
+from datetime import date, timedelta
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from resort.models import Trip
+
+
+@pytest.fixture
+def many_trips(user, resort):
+    """15 публичных поездок, по три на каждую дату (проверка равных start_date)."""
+    trips = []
+    for i in range(15):
+        trips.append(
+            Trip.objects.create(
+                user=user,
+                resort=resort,
+                start_date=date(2024, 1, 1) + timedelta(days=i // 3),
+                end_date=date(2024, 2, 1),
+                is_public=True,
+            )
+        )
+    return trips
+
+
+def expected_order(trips):
+    """Ожидаемый порядок keyset-пагинации: (-start_date, -id)."""
+    return [
+        t.id for t in sorted(trips, key=lambda t: (t.start_date, t.id), reverse=True)
+    ]
+
+
+def collect_forward(client, url):
+    """Проходит все страницы по ссылкам next, возвращает id и ответы."""
+    ids, responses = [], []
+    while url:
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        responses.append(response)
+        ids += [t["id"] for t in response.data["results"]]
+        url = response.data["next"]
+    return ids, responses
+
+
+@pytest.mark.django_db
+class TestTripCursorPagination:
+    """Тесты keyset-пагинации GET /api/trips/?pagination=cursor"""
+
+    def test_default_mode_is_page_number(self, api_client, many_trips):
+        """Без opt-in параметра ответ остаётся постраничным с count."""
+        response = api_client.get(reverse("trip-list"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["count"] == 15
+        assert len(response.data["results"]) == 10
+
+    def test_cursor_mode_walks_all_trips_in_order(self, api_client, many_trips):
+        """Проход по next возвращает все поездки ровно один раз в порядке ключа."""
+        url = reverse("trip-list") + "?pagination=cursor"
+
+        ids, responses = collect_forward(api_client, url)
+
+        assert ids == expected_order(many_trips)
+        assert len(responses) == 2
+        assert "count" not in responses[0].data
+        assert responses[0].data["previous"] is None
+
+    def test_previous_link_returns_same_page(self, api_client, many_trips):
+        """Ссылка previous со второй страницы возвращает первую страницу."""
+        url = reverse("trip-list") + "?pagination=cursor"
+        first_page = api_client.get(url)
+        second_page = api_client.get(first_page.data["next"])
+
+        response = api_client.get(second_page.data["previous"])
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [t["id"] for t in response.data["results"]] == [
+            t["id"] for t in first_page.data["results"]
+        ]
+        assert response.data["previous"] is None
+        assert response.data["next"] is not None
+
+    def test_cursor_mode_respects_visibility(
+        self, api_client, trip, private_trip, another_user_trip
+    ):
+        """Гость в keyset-режиме видит только публичные поездки."""
+        response = api_client.get(reverse("trip-list") + "?pagination=cursor")
+
+        ids = {t["id"] for t in response.data["results"]}
+        assert ids == {trip.id, another_user_trip.id}
+
+    def test_invalid_cursor(self, api_client, many_trips):
+        """Повреждённый курсор -> 404, как в стандартной CursorPagination DRF."""
+        response = api_client.get(reverse("trip-list") + "?cursor=garbage")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestNestedTripsCursorPagination:
+    """Тесты keyset-пагинации вложенных эндпоинтов /trips/"""
+
+    def test_resort_trips_cursor_mode(self, api_client, resort, many_trips):
+        """GET /api/resorts/{slug}/trips/?pagination=cursor отдаёт страницы."""
+        url = (
+            reverse("resort-trips", kwargs={"slug": resort.slug}) + "?pagination=cursor"
+        )
+
+        ids, responses = collect_forward(api_client, url)
+
+        assert ids == expected_order(many_trips)
+        assert len(responses[0].data["results"]) == 10
+
+    def test_user_trips_cursor_mode(self, api_client, user, many_trips):
+        """GET /api/users/{id}/trips/?pagination=cursor отдаёт страницы."""
+        url = reverse("user-trips", kwargs={"pk": user.id}) + "?pagination=cursor"
+
+        ids, _ = collect_forward(api_client, url)
+
+        assert ids == expected_order(many_trips)
+
+    def test_resort_trips_without_opt_in_returns_list(
+        self, api_client, resort, many_trips
+    ):
+        """Без opt-in вложенный эндпоинт возвращает список, как раньше."""
+        url = reverse("resort-trips", kwargs={"slug": resort.slug})
+
+        response = api_client.get(url)
+
+        assert isinstance(response.data, list)
+        assert len(response.data) == 15
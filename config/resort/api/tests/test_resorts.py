@@ -24,6 +24,35 @@ class TestResortList:
         assert "region" in resort_data
         assert "description" in resort_data
 
+    def test_list_resorts_with_trip_counters(
+        self,
+        api_client,
+        django_assert_num_queries,
+        resort,
+        another_resort,
+        trip,
+        private_trip,
+        another_user_trip,
+    ):
+        """
+        Счётчики поездок отдаются из полей Resort. Список строится из снимка
+        курортов и кэша счётчиков: по запросу на сборку каждого, дальше без
+        обращений к БД.
+        """
+        url = reverse("resort-list")
+
+        with django_assert_num_queries(2):
+            api_client.get(url)
+        with django_assert_num_queries(0):
+            response = api_client.get(url)
+
+        counters = {
+            r["slug"]: (r["trips_count"], r["public_trips_count"])
+            for r in response.data["results"]
+        }
+        assert counters[resort.slug] == (3, 2)
+        assert counters[another_resort.slug] == (0, 0)
+
     def test_list_resorts_empty(self, api_client):
         """Пустой список курортов."""
         url = reverse("resort-list")
@@ -59,6 +88,18 @@ class TestResortDetail:
 
         assert response.status_code == status.HTTP_404_NOT_FOUND
 
+    def test_get_resort_from_snapshot(
+        self, api_client, resort, django_assert_num_queries
+    ):
+        """Повторные запросы курорта отдаются из снимка без обращения к БД."""
+        url = reverse("resort-detail", kwargs={"slug": resort.slug})
+        api_client.get(url)
+
+        with django_assert_num_queries(0):
+            response = api_client.get(url)
+
+        assert response.data["slug"] == resort.slug
+
 
 @pytest.mark.django_db
 class TestResortTripsEndpoint:
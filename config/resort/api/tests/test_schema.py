@@ -0,0 +1,99 @@
+import gzip
+import json
+
+import pytest
+from django.urls import reverse
+from drf_spectacular.generators import SchemaGenerator
+from rest_framework import status
+from rest_framework.test import APIRequestFactory
+
+from resort.api.schema import PrecomputedSpectacularAPIView
+
+
+@pytest.fixture(autouse=True)
+def schema_view(settings, tmp_path):
+    """Продакшен-режим без файла схемы и без мемоизации из других тестов."""
+    settings.DEBUG = False
+    settings.OPENAPI_SCHEMA_FILE = tmp_path / "openapi-schema.json"
+    PrecomputedSpectacularAPIView.clear()
+    yield
+    PrecomputedSpectacularAPIView.clear()
+
+
+@pytest.fixture
+def generations(monkeypatch):
+    """Счётчик генераций схемы drf-spectacular."""
+    calls = []
+    original = SchemaGenerator.get_schema
+
+    def get_schema(self, *args, **kwargs):
+        calls.append(1)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(SchemaGenerator, "get_schema", get_schema)
+    return calls
+
+
+@pytest.mark.django_db
+class TestPrecomputedSchema:
+    """Тесты GET /api/schema/ с заранее сгенерированной схемой."""
+
+    def test_schema_generated_once_per_process(self, api_client, generations):
+        """Схема строится один раз, дальше отдаётся из памяти."""
+        first = api_client.get(reverse("schema"))
+        second = api_client.get(reverse("schema"))
+
+        assert first.status_code == status.HTTP_200_OK
+        assert first.content == second.content
+        assert b"/api/resorts/" in first.content
+        assert len(generations) == 1
+
+    def test_json_format(self, api_client):
+        """?format=json отдаёт JSON-схему с правильным Content-Type."""
+        response = api_client.get(reverse("schema"), {"format": "json"})
+
+        assert response["Content-Type"].startswith("application/vnd.oai.openapi+json")
+        assert "/api/trips/" in json.loads(response.content)["paths"]
+
+    def test_etag_not_modified(self, api_client):
+        """Повторный запрос с If-None-Match получает 304 без тела."""
+        etag = api_client.get(reverse("schema"))["ETag"]
+
+        response = api_client.get(reverse("schema"), HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b""
+
+    def test_gzip(self, api_client):
+        """С Accept-Encoding: gzip отдаётся заранее сжатая схема со своим ETag."""
+        plain = api_client.get(reverse("schema"))
+
+        response = api_client.get(reverse("schema"), HTTP_ACCEPT_ENCODING="gzip")
+
+        assert response["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response.content) == plain.content
+        assert response["ETag"] != plain["ETag"]
+        assert "Accept-Encoding" in response["Vary"]
+
+    def test_schema_from_file(self, api_client, settings, generations):
+        """Схема из файла, собранного при деплое, без генерации."""
+        settings.OPENAPI_SCHEMA_FILE.write_text(
+            json.dumps({"openapi": "3.0.3", "info": {"title": "Из файла"}})
+        )
+
+        response = api_client.get(reverse("schema"), {"format": "json"})
+
+        assert json.loads(response.content)["info"]["title"] == "Из файла"
+        assert generations == []
+
+
+@pytest.mark.django_db
+def test_live_generation_in_debug(settings, generations):
+    """В DEBUG схема генерируется на каждый запрос, как раньше."""
+    # Вызываем view напрямую: в DEBUG middleware debug_toolbar требует свои URL
+    settings.DEBUG = True
+    view = PrecomputedSpectacularAPIView.as_view()
+    view(APIRequestFactory().get("/api/schema/")).render()
+    view(APIRequestFactory().get("/api/schema/")).render()
+
+    assert len(generations) == 2
@@ -0,0 +1,137 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from resort.models import Resort, Trip
+
+
+@pytest.mark.django_db
+class TestTripFullTextSearch:
+    """Тесты полнотекстового поиска GET /api/trips/?q="""
+
+    def test_search_by_comment_with_morphology(
+        self, api_client, trip, another_user_trip
+    ):
+        """Поиск учитывает русскую морфологию: 'поездкой' находит 'поездка'."""
+        response = api_client.get(reverse("trip-list"), {"q": "отличной поездкой"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [t["id"] for t in response.data["results"]] == [trip.id]
+
+    def test_search_by_resort_fields(
+        self, api_client, trip, another_user_trip, another_resort, another_user
+    ):
+        """Название и регион курорта входят в индекс поездки."""
+        sheregesh_trip = Trip.objects.create(
+            user=another_user,
+            resort=another_resort,
+            start_date="2024-05-01",
+            end_date="2024-05-05",
+            is_public=True,
+        )
+
+        response = api_client.get(reverse("trip-list"), {"q": "Кемеровская"})
+
+        assert [t["id"] for t in response.data["results"]] == [sheregesh_trip.id]
+
+    def test_results_ranked_by_relevance(
+        self, api_client, user, resort, another_resort
+    ):
+        """Совпадение по названию курорта (вес A) выше совпадения в комментарии."""
+        in_comment = Trip.objects.create(
+            user=user,
+            resort=another_resort,
+            start_date="2024-06-01",
+            end_date="2024-06-05",
+            comment="Мечтаю съездить на Розу",
+            is_public=True,
+        )
+        in_resort_name = Trip.objects.create(
+            user=user,
+            resort=resort,
+            start_date="2024-01-01",
+            end_date="2024-01-05",
+            is_public=True,
+        )
+
+        response = api_client.get(reverse("trip-list"), {"q": "роза"})
+
+        ids = [t["id"] for t in response.data["results"]]
+        assert ids == [in_resort_name.id, in_comment.id]
+
+    def test_search_respects_visibility(self, api_client, private_trip):
+        """Полнотекстовый поиск не раскрывает приватные поездки гостю."""
+        response = api_client.get(reverse("trip-list"), {"q": "приватная"})
+
+        assert response.data["results"] == []
+
+    def test_index_follows_resort_rename(self, api_client, trip, resort):
+        """Переименование курорта обновляет индекс его поездок."""
+        resort.name = "Газпром Лаура"
+        resort.save()
+
+        response = api_client.get(reverse("trip-list"), {"q": "лаура"})
+
+        assert [t["id"] for t in response.data["results"]] == [trip.id]
+
+    def test_resort_description_keeps_trip_index(self, trip, resort):
+        """Описание курорта не входит в индекс поездок: они не пересчитываются."""
+        resort = Resort.objects.get(pk=resort.pk)
+        resort.description = "Новое описание"
+
+        with CaptureQueriesContext(connection) as queries:
+            resort.save()
+
+        vectors = [
+            q["sql"] for q in queries.captured_queries if "to_tsvector" in q["sql"]
+        ]
+        assert len(vectors) == 1
+        assert vectors[0].startswith('UPDATE "resort_resort"')
+
+    def test_resort_save_without_changes_keeps_index(self, trip, resort):
+        """Сохранение курорта без изменений не пересчитывает индексы."""
+        resort = Resort.objects.get(pk=resort.pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            resort.save()
+
+        assert not any("to_tsvector" in q["sql"] for q in queries.captured_queries)
+
+    def test_index_follows_comment_update(self, api_client, trip):
+        """Изменение комментария обновляет индекс поездки."""
+        trip.comment = "Снегопад и пухляк"
+        trip.save()
+
+        url = reverse("trip-list")
+        assert api_client.get(url, {"q": "снегопад"}).data["count"] == 1
+        assert api_client.get(url, {"q": "отличная"}).data["count"] == 0
+
+    def test_legacy_search_param_still_works(self, api_client, trip, another_user_trip):
+        """?search= (ILIKE) остаётся совместимым вариантом."""
+        response = api_client.get(reverse("trip-list"), {"search": "Отличная"})
+
+        assert [t["id"] for t in response.data["results"]] == [trip.id]
+
+
+@pytest.mark.django_db
+class TestResortFullTextSearch:
+    """Тесты полнотекстового поиска GET /api/resorts/?q="""
+
+    def test_search_resort_by_description(self, api_client, resort, another_resort):
+        """Поиск по описанию курорта с морфологией."""
+        response = api_client.get(reverse("resort-list"), {"q": "горнолыжные"})
+
+        assert [r["slug"] for r in response.data["results"]] == [another_resort.slug]
+
+    def test_explicit_ordering_overrides_rank(self, api_client, resort, another_resort):
+        """С ?ordering= результаты сортируются по запрошенному полю."""
+        response = api_client.get(
+            reverse("resort-list"), {"q": "роза OR шерегеш", "ordering": "-name"}
+        )
+
+        assert [r["slug"] for r in response.data["results"]] == [
+            another_resort.slug,
+            resort.slug,
+        ]
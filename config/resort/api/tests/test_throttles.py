@@ -0,0 +1,97 @@
+import uuid
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.test import override_settings
+
+from resort.api.throttles import RedisUserRateThrottle
+
+
+def make_throttle_class(rate):
+    """Throttle с уникальным scope, чтобы тесты не делили ключи в Redis."""
+    return type(
+        "TestThrottle",
+        (RedisUserRateThrottle,),
+        {"scope": f"test-{uuid.uuid4().hex}", "rate": rate},
+    )
+
+
+def make_request(pk=1):
+    """Минимальный объект запроса авторизованного пользователя."""
+    return SimpleNamespace(
+        user=SimpleNamespace(is_authenticated=True, pk=pk),
+        META={"REMOTE_ADDR": "127.0.0.1"},
+    )
+
+
+class TestRedisSlidingWindowThrottle:
+    """Тесты throttling на sorted set в Redis."""
+
+    def test_allows_up_to_limit(self):
+        """Разрешает ровно rate запросов, следующий отклоняется."""
+        throttle_class = make_throttle_class("3/minute")
+        request = make_request()
+
+        results = [throttle_class().allow_request(request, None) for _ in range(4)]
+
+        assert results == [True, True, True, False]
+
+    def test_wait_until_oldest_expires(self):
+        """wait() - время до выхода самой старой отметки из окна."""
+        throttle_class = make_throttle_class("1/minute")
+        request = make_request()
+        throttle_class().allow_request(request, None)
+
+        throttle = throttle_class()
+        assert throttle.allow_request(request, None) is False
+        assert 0 < throttle.wait() <= 60
+
+    def test_window_slides(self):
+        """После истечения окна запросы снова разрешаются."""
+        throttle_class = make_throttle_class("2/minute")
+        request = make_request()
+        now = [1000.0]
+        throttle_class.timer = lambda self: now[0]
+
+        assert throttle_class().allow_request(request, None)
+        now[0] += 30
+        assert throttle_class().allow_request(request, None)
+        assert not throttle_class().allow_request(request, None)
+
+        # Первая отметка вышла из окна, вторая ещё нет
+        now[0] += 31
+        assert throttle_class().allow_request(request, None)
+        assert not throttle_class().allow_request(request, None)
+
+    def test_limits_are_per_user(self):
+        """Лимит считается отдельно для каждого пользователя."""
+        throttle_class = make_throttle_class("1/minute")
+
+        assert throttle_class().allow_request(make_request(pk=1), None)
+        assert throttle_class().allow_request(make_request(pk=2), None)
+        assert not throttle_class().allow_request(make_request(pk=1), None)
+
+    def test_stores_sorted_set_in_redis(self):
+        """История хранится в Redis sorted set под ключом кэша DRF."""
+        throttle_class = make_throttle_class("5/minute")
+        request = make_request()
+        throttle = throttle_class()
+        throttle.allow_request(request, None)
+
+        client = throttle.get_redis_client()
+        key = cache.make_key(throttle.get_cache_key(request, None))
+        assert client.type(key) == b"zset"
+        assert client.zcard(key) == 1
+        assert 0 < client.pttl(key) <= 60_000
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_fallback_without_redis(self):
+        """С кэшем не на Redis работает как стандартный SimpleRateThrottle."""
+        throttle_class = make_throttle_class("2/minute")
+        request = make_request()
+
+        assert throttle_class().get_redis_client() is None
+        results = [throttle_class().allow_request(request, None) for _ in range(3)]
+        assert results == [True, True, False]
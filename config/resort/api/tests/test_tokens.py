@@ -0,0 +1,85 @@
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from django_redis import get_redis_connection
+from rest_framework import status
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from resort.api.tokens import RedisTokenBlacklist
+from resort.cache_keys import CacheKeys
+
+
+@pytest.fixture
+def tokens(api_client, user):
+    """Пара токенов, полученная через /api/auth/token/."""
+    response = api_client.post(
+        reverse("token_obtain_pair"),
+        {"username": user.username, "password": "testpass123"},
+    )
+    return response.data
+
+
+def refresh(api_client, token):
+    return api_client.post(reverse("token_refresh"), {"refresh": token})
+
+
+@pytest.mark.django_db
+class TestRedisTokenBlacklist:
+    """Тесты чёрного списка refresh-токенов в Redis."""
+
+    def test_rotated_token_rejected(self, api_client, tokens):
+        """Refresh-токен после ротации повторно не принимается."""
+        assert refresh(api_client, tokens["refresh"]).status_code == status.HTTP_200_OK
+
+        response = refresh(api_client, tokens["refresh"])
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_new_refresh_token_works(self, api_client, tokens):
+        """Новый refresh-токен из ротации действителен."""
+        new_refresh = refresh(api_client, tokens["refresh"]).data["refresh"]
+
+        assert refresh(api_client, new_refresh).status_code == status.HTTP_200_OK
+
+    def test_concurrent_rotation_single_winner(self, api_client, tokens, monkeypatch):
+        """
+        Два запроса прошли проверку чёрного списка одновременно: новую пару
+        получает только тот, кто первым занёс jti.
+        """
+        monkeypatch.setattr(RedisTokenBlacklist, "contains", lambda self, jti: False)
+
+        assert refresh(api_client, tokens["refresh"]).status_code == status.HTTP_200_OK
+        response = refresh(api_client, tokens["refresh"])
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert "refresh" not in response.data
+
+    def test_jti_expires_with_token(self, api_client, tokens):
+        """jti хранится в Redis с TTL до истечения токена."""
+        refresh(api_client, tokens["refresh"])
+
+        token = RefreshToken(tokens["refresh"], verify=False)
+        key = cache.make_key(CacheKeys.blacklisted_token(token["jti"]))
+        ttl = get_redis_connection().ttl(key)
+        assert 0 < ttl <= 7 * 24 * 3600 + 1
+
+    def test_no_database_rows(self, api_client, tokens):
+        """Выдача и ротация не пишут в таблицы token_blacklist."""
+        refresh(api_client, tokens["refresh"])
+
+        assert OutstandingToken.objects.count() == 0
+        assert BlacklistedToken.objects.count() == 0
+
+    def test_database_store(self, api_client, tokens, settings):
+        """С DatabaseTokenBlacklist используются прежние таблицы."""
+        settings.TOKEN_BLACKLIST_STORE = "resort.api.tokens.DatabaseTokenBlacklist"
+
+        assert refresh(api_client, tokens["refresh"]).status_code == status.HTTP_200_OK
+        assert refresh(api_client, tokens["refresh"]).status_code == (
+            status.HTTP_401_UNAUTHORIZED
+        )
+        assert BlacklistedToken.objects.count() == 1
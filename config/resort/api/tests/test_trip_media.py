@@ -1,7 +1,31 @@
+from io import BytesIO
+
 import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from PIL import Image
 from rest_framework import status
 
+from resort.dispatch import QueuedTask
+from resort.models import MediaBlob, TripMedia
+
+
+pytestmark = pytest.mark.usefixtures("single_variant")
+
+
+def photos(count, color=None):
+    """JPEG-файлы с разным содержимым (или одинаковым, если задан color)."""
+    uploads = []
+    for index in range(count):
+        buffer = BytesIO()
+        Image.new("RGB", (40, 30), color=color or (index * 40, 0, 0)).save(
+            buffer, format="JPEG"
+        )
+        uploads.append(SimpleUploadedFile(f"photo{index}.jpg", buffer.getvalue()))
+    return uploads
+
 
 @pytest.mark.django_db
 class TestTripMediaEndpoint:
@@ -24,3 +48,88 @@ class TestTripMediaEndpoint:
         response = api_client.get(url)
 
         assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestTripMediaUpload:
+    """Тесты POST /api/trips/{id}/media/"""
+
+    def upload(self, client, trip, files):
+        url = reverse("trip-media", kwargs={"pk": trip.id})
+        return client.post(url, {"images": files}, format="multipart")
+
+    def test_upload_many(self, authenticated_client, trip, media_root):
+        response = self.upload(authenticated_client, trip, photos(3))
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(response.data) == 3
+        assert {item["trip"] for item in response.data} == {trip.id}
+        names = list(trip.media.values_list("image", flat=True))
+        assert len(names) == 3
+        assert all((media_root / name).exists() for name in names)
+        assert set(
+            MediaBlob.objects.filter(name__in=names).values_list("ref_count", flat=True)
+        ) == {1}
+
+    def test_queries_do_not_grow(self, authenticated_client, trip):
+        """Число запросов не зависит от числа фотографий."""
+
+        def count_queries(files):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.upload(authenticated_client, trip, files)
+            assert response.status_code == status.HTTP_201_CREATED
+            return len(queries)
+
+        count_queries(photos(1))  # Пользователь JWT попадает в кэш
+        assert count_queries(photos(1)) == count_queries(photos(5))
+
+    def test_single_variants_task(
+        self, authenticated_client, trip, django_capture_on_commit_callbacks
+    ):
+        """Одна задача на всю пачку, одинаковые фото - один файл."""
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            response = self.upload(authenticated_client, trip, photos(3, color="blue"))
+
+        assert response.status_code == status.HTTP_201_CREATED
+        # Кроме задачи - только публикация media_ready (resort/events.py)
+        assert len([c for c in callbacks if isinstance(c, QueuedTask)]) == 1
+        media = list(trip.media.prefetch_related("variants"))
+        assert len({photo.image.name for photo in media}) == 1
+        assert MediaBlob.objects.get(name=media[0].image.name).ref_count == 3
+        assert all(len(photo.variants.all()) == 1 for photo in media)
+        variant_name = media[0].variants.all()[0].file.name
+        assert MediaBlob.objects.get(name=variant_name).ref_count == 3
+
+    def test_not_owner(self, authenticated_client, another_user_trip):
+        response = self.upload(authenticated_client, another_user_trip, photos(1))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert not TripMedia.objects.exists()
+
+    def test_anonymous(self, api_client, trip):
+        response = self.upload(api_client, trip, photos(1))
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_not_an_image(self, authenticated_client, trip):
+        text = SimpleUploadedFile("notes.jpg", b"not an image")
+
+        response = self.upload(authenticated_client, trip, [*photos(1), text])
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not TripMedia.objects.exists()
+
+    def test_too_many_files(self, authenticated_client, trip, settings):
+        settings.TRIP_MEDIA_UPLOAD_MAX_FILES = 2
+
+        response = self.upload(authenticated_client, trip, photos(3))
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "images" in response.data
+
+    def test_no_files(self, authenticated_client, trip):
+        url = reverse("trip-media", kwargs={"pk": trip.id})
+
+        response = authenticated_client.post(url, {}, format="multipart")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,325 @@
+import base64
+import fcntl
+import hashlib
+import os
+from datetime import timedelta
+from io import BytesIO
+
+import pytest
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+
+from resort import uploads
+from resort.models import FileTombstone, MediaBlob, MediaUpload, TripMedia
+from resort.uploads import partial_path
+
+
+pytestmark = pytest.mark.usefixtures("single_variant")
+
+
+@pytest.fixture
+def photo():
+    buffer = BytesIO()
+    Image.new("RGB", (200, 150), color="green").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def checksum(data):
+    return "sha256 " + base64.b64encode(hashlib.sha256(data).digest()).decode()
+
+
+def start(client, trip, photo, filename="photo.png"):
+    return client.post(
+        reverse("mediaupload-list"),
+        {"trip": trip.id, "filename": filename, "size": len(photo)},
+        format="json",
+    )
+
+
+def send(client, upload_id, offset, data, **headers):
+    return client.patch(
+        reverse("mediaupload-detail", kwargs={"pk": upload_id}),
+        data,
+        content_type="application/offset+octet-stream",
+        HTTP_UPLOAD_OFFSET=str(offset),
+        **headers,
+    )
+
+
+@pytest.mark.django_db
+class TestResumableUpload:
+    """Тесты загрузки фотографии частями /api/uploads/"""
+
+    def test_chunks_become_trip_media(
+        self, authenticated_client, trip, photo, django_capture_on_commit_callbacks
+    ):
+        response = start(authenticated_client, trip, photo)
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response["Upload-Offset"] == "0"
+        upload_id = response.data["id"]
+        assert response["Location"].endswith(f"/api/uploads/{upload_id}/")
+
+        half = len(photo) // 2
+        response = send(authenticated_client, upload_id, 0, photo[:half])
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Upload-Offset"] == str(half)
+        assert response.data["media"] is None
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = send(
+                authenticated_client,
+                upload_id,
+                half,
+                photo[half:],
+                HTTP_UPLOAD_CHECKSUM=checksum(photo[half:]),
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        media = TripMedia.objects.get(pk=response.data["media"])
+        assert media.trip == trip
+        assert media.image.read() == photo
+        assert media.image.name.endswith(
+            hashlib.sha256(photo).hexdigest()[:32] + ".png"
+        )
+        assert MediaBlob.objects.get(name=media.image.name).ref_count == 1
+        assert media.variants.count() == 1
+        # Временный файл перемещён в хранилище
+        upload = MediaUpload.objects.get(pk=upload_id)
+        assert not os.path.exists(partial_path(upload))
+
+    def test_failed_completion_can_be_retried(
+        self, authenticated_client, trip, photo, monkeypatch
+    ):
+        upload_id = start(authenticated_client, trip, photo).data["id"]
+        upload = MediaUpload.objects.get(pk=upload_id)
+        save = MediaUpload.save
+
+        def failing_save(self, *args, **kwargs):
+            raise DatabaseError("connection lost")
+
+        monkeypatch.setattr(MediaUpload, "save", failing_save)
+        with pytest.raises(DatabaseError):
+            send(authenticated_client, upload_id, 0, photo)
+
+        # Фотография откатилась, файл в хранилище - под надгробием,
+        # принятые байты остались
+        assert not TripMedia.objects.exists()
+        name = FileTombstone.objects.get().name
+        assert name.endswith(hashlib.sha256(photo).hexdigest()[:32] + ".png")
+        with open(partial_path(upload), "rb") as file:
+            assert file.read() == photo
+
+        monkeypatch.setattr(MediaUpload, "save", save)
+        response = send(
+            authenticated_client, upload_id, len(photo), b"", CONTENT_LENGTH="0"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert TripMedia.objects.get(pk=response.data["media"]).image.name == name
+        assert MediaBlob.objects.get(name=name).ref_count == 1
+
+    def test_head_reports_offset(self, authenticated_client, trip, photo):
+        upload_id = start(authenticated_client, trip, photo).data["id"]
+        send(authenticated_client, upload_id, 0, photo[:100])
+
+        response = authenticated_client.head(
+            reverse("mediaupload-detail", kwargs={"pk": upload_id})
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Upload-Offset"] == "100"
+        assert response["Upload-Length"] == str(len(photo))
+        assert response["Cache-Control"] == "no-store"
+
+    def test_wrong_offset_conflict(self, authenticated_client, trip, photo):
+        upload_id = start(authenticated_client, trip, photo).data["id"]
+        send(authenticated_client, upload_id, 0, photo[:100])
+
+        # Повтор уже принятой части (ответ на неё потерялся)
+        response = send(authenticated_client, upload_id, 0, photo[:100])
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response["Upload-Offset"] == "100"
+
+    def test_chunk_in_progress_conflict(self, authenticated_client, trip, photo):
+        upload_id = start(authenticated_client, trip, photo).data["id"]
+        path = partial_path(MediaUpload.objects.get(pk=upload_id))
+
+        # Предыдущая часть ещё принимается другим воркером
+        with open(path, "r+b") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            response = send(authenticated_client, upload_id, 0, photo[:100])
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response["Upload-Offset"] == "0"
+        assert os.path.getsize(path) == 0
+
+    def test_offset_moved_conflict(
+        self, authenticated_client, trip, photo, monkeypatch
+    ):
+        upload_id = start(authenticated_client, trip, photo).data["id"]
+        append_chunk = uploads.append_chunk
+
+        def racing_append(file, offset, *args, **kwargs):
+            # Смещение в БД сдвинули, пока читалось тело части
+            MediaUpload.objects.filter(pk=upload_id).update(offset=offset + 10)
+            return append_chunk(file, offset, *args, **kwargs)
+
+        monkeypatch.setattr(uploads, "append_chunk", racing_append)
+        response = send(authenticated_client, upload_id, 0, photo[:100])
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response["Upload-Offset"] == "10"
+        assert MediaUpload.objects.get(pk=upload_id).offset == 10
+
+    def test_checksum_mismatch_discards_chunk(self, authenticated_client, trip, photo):
+        upload_id = start(authenticated_client, trip, photo).data["id"]
+        send(authenticated_client, upload_id, 0, photo[:100])
+
+        response = send(
+            authenticated_client,
+            upload_id,
+            100,
+            photo[100:200],
+            HTTP_UPLOAD_CHECKSUM=checksum(b"other bytes"),
+        )
+
+        assert response.status_code == 460
+        assert response["Upload-Offset"] == "100"
+        upload = MediaUpload.objects.get(pk=upload_id)
+        with open(partial_path(upload), "rb") as file:
+            assert file.read() == photo[:100]
+
+        # Повтор той же части с верной суммой принимается
+        response = send(
+            authenticated_client,
+            upload_id,
+            100,
+            photo[100:200],
+            HTTP_UPLOAD_CHECKSUM=checksum(photo[100:200]),
+        )
+        assert response["Upload-Offset"] == "200"
+
+    def test_chunk_past_size(self, authenticated_client, trip, photo):
+        upload_id = start(authenticated_client, trip, photo).data["id"]
+
+        response = send(authenticated_client, upload_id, 0, photo + b"extra")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response["Upload-Offset"] == "0"
+
+    def test_not_an_image(self, authenticated_client, trip):
+        data = b"definitely not a png"
+        upload_id = start(authenticated_client, trip, data).data["id"]
+
+        response = send(authenticated_client, upload_id, 0, data)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not MediaUpload.objects.exists()
+        assert not TripMedia.objects.exists()
+
+    @pytest.mark.parametrize(
+        "length, expected",
+        [("", status.HTTP_411_LENGTH_REQUIRED), ("ten", status.HTTP_400_BAD_REQUEST)],
+    )
+    def test_content_length_required(
+        self, authenticated_client, trip, photo, length, expected
+    ):
+        upload_id = start(authenticated_client, trip, photo).data["id"]
+
+        response = send(
+            authenticated_client, upload_id, 0, photo, CONTENT_LENGTH=length
+        )
+
+        assert response.status_code == expected
+        assert MediaUpload.objects.get(pk=upload_id).offset == 0
+
+    def test_wrong_content_type(self, authenticated_client, trip, photo):
+        upload_id = start(authenticated_client, trip, photo).data["id"]
+
+        response = authenticated_client.patch(
+            reverse("mediaupload-detail", kwargs={"pk": upload_id}),
+            {"offset": 10},
+            format="json",
+            HTTP_UPLOAD_OFFSET="0",
+        )
+
+        assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+    def test_cancel(self, authenticated_client, trip, photo):
+        upload_id = start(authenticated_client, trip, photo).data["id"]
+        path = partial_path(MediaUpload.objects.get(pk=upload_id))
+
+        response = authenticated_client.delete(
+            reverse("mediaupload-detail", kwargs={"pk": upload_id})
+        )
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert not MediaUpload.objects.exists()
+        assert not os.path.exists(path)
+
+
+@pytest.mark.django_db
+class TestUploadAccess:
+    """Права доступа к загрузкам."""
+
+    def test_anonymous(self, api_client, trip, photo):
+        assert start(api_client, trip, photo).status_code == (
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_foreign_trip(self, authenticated_client, another_user_trip, photo):
+        response = start(authenticated_client, another_user_trip, photo)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "trip" in response.data
+
+    def test_foreign_upload_hidden(
+        self, authenticated_client, another_user, another_user_trip, photo
+    ):
+        upload = MediaUpload.objects.create(
+            user=another_user, trip=another_user_trip, filename="a.png", size=10
+        )
+
+        response = send(authenticated_client, upload.id, 0, photo[:10])
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.parametrize("filename", ["notes.txt", "video.mp4"])
+    def test_not_image_extension(self, authenticated_client, trip, photo, filename):
+        response = start(authenticated_client, trip, photo, filename=filename)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "filename" in response.data
+
+    def test_too_large(self, authenticated_client, trip, photo, settings):
+        settings.TRIP_MEDIA_UPLOAD_MAX_SIZE = 100
+
+        response = start(authenticated_client, trip, photo)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "size" in response.data
+
+
+@pytest.mark.django_db
+class TestPurgeMediaUploads:
+    """Тесты команды purge_media_uploads."""
+
+    def test_stale_removed(self, authenticated_client, trip, photo):
+        fresh_id = start(authenticated_client, trip, photo).data["id"]
+        stale_id = start(authenticated_client, trip, photo).data["id"]
+        MediaUpload.objects.filter(pk=stale_id).update(
+            updated_at=MediaUpload.objects.get(pk=stale_id).updated_at
+            - timedelta(days=2)
+        )
+        stale_path = partial_path(MediaUpload.objects.get(pk=stale_id))
+
+        call_command("purge_media_uploads")
+
+        assert [str(pk) for pk in MediaUpload.objects.values_list("pk", flat=True)] == [
+            fresh_id
+        ]
+        assert not os.path.exists(stale_path)
@@ -1,7 +1,48 @@
 import pytest
+from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework import status
 
+from resort.models import Trip
+
+
+@pytest.mark.django_db
+class TestUserList:
+    """Тесты GET /api/users/"""
+
+    def test_trips_count_only_public(
+        self, api_client, user, trip, private_trip, another_user_trip
+    ):
+        """trips_count - количество публичных поездок пользователя."""
+        response = api_client.get(reverse("user-list"))
+
+        assert response.status_code == status.HTTP_200_OK
+        counts = {u["id"]: u["trips_count"] for u in response.data["results"]}
+        assert counts[user.id] == 1
+        assert counts[another_user_trip.user_id] == 1
+
+    @pytest.mark.parametrize("users_count", [1, 3, 10])
+    def test_list_constant_number_of_queries(
+        self, api_client, django_assert_num_queries, resort, users_count
+    ):
+        """Количество запросов не зависит от числа пользователей на странице."""
+        for i in range(users_count):
+            member = User.objects.create_user(username=f"member{i}")
+            Trip.objects.create(
+                user=member,
+                resort=resort,
+                start_date="2024-01-10",
+                end_date="2024-01-17",
+                is_public=True,
+            )
+
+        # COUNT для пагинации + одна выборка пользователей с аннотацией
+        with django_assert_num_queries(2):
+            response = api_client.get(reverse("user-list"))
+
+        assert len(response.data["results"]) == users_count
+        assert all(u["trips_count"] == 1 for u in response.data["results"])
+
 
 @pytest.mark.django_db
 class TestUserTripEndpoint:
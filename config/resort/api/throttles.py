@@ -1,7 +1,104 @@
+import uuid
+
+from django_redis import get_redis_connection
 from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 
+# Скользящее окно на sorted set: score и member - время запроса.
+# Скрипт выполняется в Redis атомарно и за один round trip:
+# удаляет устаревшие отметки, считает оставшиеся и добавляет новую,
+# только если лимит не исчерпан.
+# Возвращает {разрешено (1/0), число запросов в окне, score самой старой отметки}.
+SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local duration = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+redis.call("ZREMRANGEBYSCORE", key, "-inf", now - duration)
+local count = redis.call("ZCARD", key)
+
+if count < limit then
+    redis.call("ZADD", key, now, ARGV[4])
+    redis.call("PEXPIRE", key, math.ceil(duration * 1000))
+    return {1, count + 1, false}
+end
+
+local oldest = redis.call("ZRANGE", key, 0, 0, "WITHSCORES")
+return {0, count, oldest[2]}
+"""
+
+
+class RedisSlidingWindowMixin:
+    """
+    Drop-in замена хранения истории запросов SimpleRateThrottle.
+
+    Вместо чтения pickled-списка отметок из кэша, обрезки в Python и записи
+    обратно (два round trip и гонка при параллельных запросах) выполняет
+    один атомарный Lua-скрипт над sorted set в Redis.
+    Scope, ключи и DEFAULT_THROTTLE_RATES используются те же, что у DRF.
+    Если кэш не django-redis (например, LocMemCache), работает как обычный
+    SimpleRateThrottle.
+    """
+
+    cache_alias = "default"
+    script = None  # Зарегистрированный Lua-скрипт, общий для процесса
+
+    def get_redis_client(self):
+        """Redis-клиент кэша или None, если кэш не на Redis."""
+        try:
+            return get_redis_connection(self.cache_alias)
+        except NotImplementedError:
+            return None
+
+    def allow_request(self, request, view):
+        """Проверка лимита одним вызовом скрипта в Redis."""
+        if self.rate is None:
+            return True
+
+        client = self.get_redis_client()
+        if client is None:
+            return super().allow_request(request, view)
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
 
-class AuthThrottle(AnonRateThrottle):
+        if RedisSlidingWindowMixin.script is None:
+            RedisSlidingWindowMixin.script = client.register_script(
+                SLIDING_WINDOW_SCRIPT
+            )
+
+        self.now = self.timer()
+        # Уникальный member, чтобы одновременные запросы не схлопывались
+        member = f"{self.now:.6f}:{uuid.uuid4().hex[:8]}"
+        allowed, _, oldest = RedisSlidingWindowMixin.script(
+            keys=[self.cache.make_key(self.key)],
+            args=[self.now, self.duration, self.num_requests, member],
+            client=client,
+        )
+        if allowed:
+            # Отметка уже добавлена скриптом, сохранять историю не нужно
+            return True
+
+        self.oldest = float(oldest)
+        return self.throttle_failure()
+
+    def wait(self):
+        """Секунды до истечения самой старой отметки в окне."""
+        if getattr(self, "oldest", None) is None:
+            return super().wait()
+        return max(self.duration - (self.now - self.oldest), 0)
+
+
+class RedisAnonRateThrottle(RedisSlidingWindowMixin, AnonRateThrottle):
+    """Глобальный лимит для гостей (scope "anon") на Redis."""
+
+
+class RedisUserRateThrottle(RedisSlidingWindowMixin, UserRateThrottle):
+    """Глобальный лимит для авторизованных (scope "user") на Redis."""
+
+
+class AuthThrottle(RedisSlidingWindowMixin, AnonRateThrottle):
     """
     Ограничение попыток получения JWT токена
     Защита от bruteforce атак
@@ -10,10 +107,19 @@ class AuthThrottle(AnonRateThrottle):
     scope = "auth"  # Имя кастомного лимита
 
 
-class TripCreateThrottle(UserRateThrottle):
+class TripCreateThrottle(RedisSlidingWindowMixin, UserRateThrottle):
     """
     Ограничение создания поездок
     Защита от спама
     """
 
     scope = "trips_create"  # Имя кастомного лимита
+
+
+class MediaUploadThrottle(RedisSlidingWindowMixin, UserRateThrottle):
+    """
+    Ограничение пакетной загрузки фотографий
+    Один запрос - до TRIP_MEDIA_UPLOAD_MAX_FILES файлов
+    """
+
+    scope = "media_upload"  # Имя кастомного лимита
@@ -0,0 +1,111 @@
+"""Refresh-токены с подключаемым хранилищем чёрного списка.
+
+Стандартный BlacklistMixin simplejwt пишет каждый выданный refresh-токен
+в token_blacklist_outstandingtoken, а каждый отозванный при ротации -
+в token_blacklist_blacklistedtoken. Таблицы только растут, и проверка
+токена на каждом /api/auth/token/refresh/ становится всё дороже.
+
+Хранилище задаётся настройкой TOKEN_BLACKLIST_STORE:
+
+- RedisTokenBlacklist (по умолчанию) - jti в Redis с TTL, равным
+  оставшемуся сроку жизни токена: проверка за O(1), очистка не нужна;
+- DatabaseTokenBlacklist - прежние таблицы token_blacklist.
+
+Перенос существующих записей из БД - команда migrate_token_blacklist.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from resort.cache_keys import CacheKeys
+
+
+class RedisTokenBlacklist:
+    """Чёрный список в Redis: ключ на jti, истекает вместе с токеном."""
+
+    def contains(self, jti):
+        return cache.has_key(CacheKeys.blacklisted_token(jti))
+
+    def claim(self, token):
+        """
+        Атомарно заносит jti в список (SET NX). False - jti уже там: тот же
+        токен параллельно ротирует другой запрос, выдавать пару нельзя.
+        """
+        ttl = max(int(token["exp"] - time.time()) + 1, 1)
+        key = CacheKeys.blacklisted_token(token[api_settings.JTI_CLAIM])
+        return cache.add(key, 1, ttl)
+
+    def add_jti(self, jti, exp):
+        """Занести jti в список до момента exp (unix time)."""
+        ttl = int(exp - time.time()) + 1
+        if ttl > 0:  # Истёкший токен и так не пройдёт проверку
+            cache.set(CacheKeys.blacklisted_token(jti), 1, ttl)
+
+    def outstand(self, token, user):
+        """Выданные токены не учитываются: для отзыва хватает jti."""
+
+
+class DatabaseTokenBlacklist:
+    """Стандартные таблицы token_blacklist simplejwt."""
+
+    def contains(self, jti):
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def claim(self, token):
+        """False, если токен уже в списке (уникальность token_id в БД)."""
+        outstanding, _ = OutstandingToken.objects.get_or_create(
+            jti=token[api_settings.JTI_CLAIM],
+            defaults={
+                "token": str(token),
+                "expires_at": datetime_from_epoch(token["exp"]),
+            },
+        )
+        _, created = BlacklistedToken.objects.get_or_create(token=outstanding)
+        return created
+
+    def outstand(self, token, user):
+        OutstandingToken.objects.create(
+            user=user,
+            jti=token[api_settings.JTI_CLAIM],
+            token=str(token),
+            created_at=token.current_time,
+            expires_at=datetime_from_epoch(token["exp"]),
+        )
+
+
+def get_token_blacklist():
+    """Хранилище чёрного списка из настройки TOKEN_BLACKLIST_STORE."""
+    return import_string(settings.TOKEN_BLACKLIST_STORE)()
+
+
+class StoreRefreshToken(RefreshToken):
+    """RefreshToken, проверяющий и пополняющий чёрный список через хранилище."""
+
+    def check_blacklist(self):
+        if get_token_blacklist().contains(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        # check_blacklist при разборе токена не защищает от гонки двух
+        # ротаций: пару выдаёт только запрос, первым занёсший jti в список
+        if not get_token_blacklist().claim(self):
+            raise TokenError(_("Token is blacklisted"))
+
+    @classmethod
+    def for_user(cls, user):
+        # Минуя BlacklistMixin.for_user: учёт выданных токенов решает хранилище
+        token = super(BlacklistMixin, cls).for_user(user)
+        get_token_blacklist().outstand(token, user)
+        return token
@@ -2,7 +2,11 @@ from django.urls import path
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 
+from resort.events import trip_media_events
+
 from .views import (
+    DatabasePoolStatsView,
+    MediaUploadViewSet,
     ResortViewSet,
     TripViewSet,
     TripMediaViewSet,
@@ -14,6 +18,7 @@ router = DefaultRouter()
 router.register(r"resorts", ResortViewSet, basename="resort")
 router.register(r"trips", TripViewSet, basename="trip")
 router.register(r"media", TripMediaViewSet, basename="tripmedia")
+router.register(r"uploads", MediaUploadViewSet, basename="mediaupload")
 router.register(r"users", UserViewSet, basename="user")
 
 urlpatterns = [
@@ -22,4 +27,11 @@ urlpatterns = [
         "auth/token/", ThrottledTokenObtainPairView.as_view(), name="token_obtain_pair"
     ),
     path("auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("metrics/db-pool/", DatabasePoolStatsView.as_view(), name="db_pool_stats"),
+    # Поток SSE готовности вариантов (асинхронное представление)
+    path(
+        "trips/<int:trip_id>/media/events/",
+        trip_media_events,
+        name="trip-media-events",
+    ),
 ] + router.urls
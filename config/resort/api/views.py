@@ -1,27 +1,86 @@
 from django.contrib.auth.models import User
-from django.db.models import Q
+from django.db import connections
+from django.db.models import Count, Q, prefetch_related_objects
+from django.http import Http404
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import status
+from rest_framework import mixins, status
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.exceptions import (
+    APIException,
+    UnsupportedMediaType,
+    ValidationError,
+)
+from rest_framework.permissions import (
+    IsAdminUser,
+    IsAuthenticated,
+    IsAuthenticatedOrReadOnly,
+)
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework_simplejwt.views import TokenObtainPairView
-from .throttles import AuthThrottle, TripCreateThrottle
+from .throttles import AuthThrottle, MediaUploadThrottle, TripCreateThrottle
 
-from resort.models import Resort, Trip, TripMedia
-from rest_framework.viewsets import ReadOnlyModelViewSet, ModelViewSet
+from resort import uploads
+from resort.models import MediaUpload, Resort, Trip, TripMedia
+from resort.snapshot import resort_catalog, trip_counters, with_trip_counters
+from rest_framework.views import APIView
+from rest_framework.viewsets import GenericViewSet, ReadOnlyModelViewSet, ModelViewSet
 
-from .filters import ResortFilter, TripFilter
+from .filters import FullTextSearchFilter, ResortFilter, TripFilter
+from .pagination import TripPagination
 from .permissions import IsOwnerReadOnly
 from .serializers import (
+    MediaUploadSerializer,
     ResortSerializer,
     TripReadSerializer,
     TripWriteSerializer,
     TripMediaSerializer,
+    TripMediaUploadSerializer,
     UserSerializer,
 )
 from rest_framework.filters import OrderingFilter, SearchFilter
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
+
+# Параметры opt-in keyset-пагинации для вложенных эндпоинтов /trips/
+TRIPS_PAGINATION_PARAMETERS = [
+    OpenApiParameter(
+        name="pagination",
+        description="'cursor' - вернуть страницу keyset-пагинации вместо полного "
+        "списка.",
+        required=False,
+        type=str,
+        enum=["cursor"],
+    ),
+    OpenApiParameter(
+        name="cursor",
+        description="Курсор из полей next/previous предыдущего ответа.",
+        required=False,
+        type=str,
+    ),
+]
+
+
+class NestedTripsMixin:
+    """Ответ для вложенных эндпоинтов со списком поездок (/{id}/trips/)."""
+
+    def trips_response(self, request, trips):
+        """
+        Сериализует поездки вложенного эндпоинта.
+        С ?pagination=cursor отдаёт страницу keyset-пагинации по (start_date, id),
+        иначе - полный список, как раньше.
+        """
+        paginator = TripPagination()
+        if paginator.is_cursor_mode(request):
+            page = paginator.paginate_queryset(trips, request, view=self)
+            serializer = TripReadSerializer(
+                page, many=True, context={"request": request}
+            )
+            return paginator.get_paginated_response(serializer.data)
+
+        serializer = TripReadSerializer(trips, many=True, context={"request": request})
+        return Response(serializer.data)
 
 
 @extend_schema_view(
@@ -42,21 +101,67 @@ from drf_spectacular.utils import extend_schema, extend_schema_view
         "публичные поездки, авторизованные пользователи видят публичные +"
         " свои приватные.",
         tags=["resorts"],
+        parameters=TRIPS_PAGINATION_PARAMETERS,
     ),
 )
-class ResortViewSet(ReadOnlyModelViewSet):
+class ResortViewSet(NestedTripsMixin, ReadOnlyModelViewSet):
     """ViewSet для модели Resort."""
 
     queryset = Resort.objects.all()
     serializer_class = ResortSerializer
     lookup_field = "slug"
 
-    filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
+    # OrderingFilter раньше DjangoFilterBackend: ?name__fuzzy= сортирует
+    # по сходству поверх сортировки по умолчанию
+    filter_backends = [
+        OrderingFilter,
+        DjangoFilterBackend,
+        SearchFilter,
+        FullTextSearchFilter,  # ?q= - полнотекстовый поиск, ?search= - ILIKE
+    ]
     filterset_class = ResortFilter  # Кастомный фильтр для курортов
     ordering_fields = ["name", "region"]  # Разрешенные поля для сортировки
     ordering = ["name"]  # Сортировка по умолчанию
     search_fields = ["name", "region", "description"]  # Поля для поиска
 
+    # Параметры, с которыми список отдаётся из снимка курортов без запроса к БД.
+    # Фильтры и поиск (?region=, ?q=, ?name__fuzzy= ...) идут в PostgreSQL
+    snapshot_params = {"page", "ordering", "format"}
+    snapshot_orderings = {None, "name", "-name"}
+
+    def get_object(self):
+        """Курорт по slug из снимка справочника (см. resort/snapshot.py)."""
+        resort = resort_catalog.get().by_slug.get(self.kwargs[self.lookup_field])
+        if resort is None:
+            raise Http404
+        self.check_object_permissions(self.request, resort)
+        return resort
+
+    def list(self, request, *args, **kwargs):
+        """Без фильтров список берётся из уже сериализованного снимка."""
+        params = request.query_params
+        if not set(params) <= self.snapshot_params or (
+            params.get(OrderingFilter.ordering_param) not in self.snapshot_orderings
+        ):
+            return super().list(request, *args, **kwargs)
+
+        resorts = list(resort_catalog.get().serialized)
+        if params.get(OrderingFilter.ordering_param) == "-name":
+            resorts.reverse()
+        page = self.paginate_queryset(resorts)
+        counters = trip_counters()
+        page = [with_trip_counters(data, counters) for data in page]
+        return self.get_paginated_response(page)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Детали курорта - готовый словарь из снимка и счётчики поездок."""
+        snapshot = resort_catalog.get()
+        resort = self.get_object()
+        data = snapshot.serialized_by_id.get(resort.pk)
+        if data is None:
+            data = self.get_serializer(resort).data
+        return Response(with_trip_counters(data, trip_counters()))
+
     @action(detail=True, methods=["get"])
     def trips(self, request, slug=None):
         """
@@ -73,18 +178,10 @@ class ResortViewSet(ReadOnlyModelViewSet):
         # Получаем все поездки, связанные с курортом
         trips = resort.trips.all()
 
-        user = self.request.user
-        if user.is_authenticated:
-            # Авторизованный: показываем публичные + свои приватные поездки
-            trips = trips.filter(Q(is_public=True) | Q(user=user)).select_related(
-                "user"
-            )
-        else:
-            # Гость: показываем только публичные поездки
-            trips = trips.filter(is_public=True).select_related("user")
+        # Авторизованный: публичные + свои приватные, гость: только публичные
+        trips = trips.visible_to(self.request.user).select_related("user")
 
-        serializer = TripReadSerializer(trips, many=True, context={"request": request})
-        return Response(serializer.data)
+        return self.trips_response(request, trips)
 
 
 @extend_schema_view(
@@ -122,11 +219,24 @@ class ResortViewSet(ReadOnlyModelViewSet):
         description="Удалить поездку. Только владелец может удалить свою поездку.",
         tags=["trips"],
     ),
-    media=extend_schema(
-        summary="Фото поездки",
-        description="Получить список фотографий конкретной поездки.",
-        tags=["trips"],
-    ),
+    media=[
+        extend_schema(
+            methods=["GET"],
+            summary="Фото поездки",
+            description="Получить список фотографий конкретной поездки.",
+            tags=["trips"],
+        ),
+        extend_schema(
+            methods=["POST"],
+            summary="Загрузить фото поездки",
+            description="Несколько фотографий одним multipart-запросом (поле "
+            "images повторяется). Варианты строятся в фоне одной задачей, до "
+            "этого variants - пустой словарь. Только владелец поездки.",
+            request={"multipart/form-data": TripMediaUploadSerializer},
+            responses={201: TripMediaSerializer(many=True)},
+            tags=["trips"],
+        ),
+    ],
 )
 class TripViewSet(ModelViewSet):
     """
@@ -142,7 +252,15 @@ class TripViewSet(ModelViewSet):
     # Не авторизованные - только GET, авторизованные - CRUD
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerReadOnly]
 
-    filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
+    # Номера страниц по умолчанию, keyset-курсор по ?pagination=cursor
+    pagination_class = TripPagination
+
+    filter_backends = [
+        DjangoFilterBackend,
+        OrderingFilter,
+        SearchFilter,
+        FullTextSearchFilter,  # ?q= - полнотекстовый поиск, ?search= - ILIKE
+    ]
     filterset_class = TripFilter  # Кастомный фильтр для поездок
     ordering_fields = ["start_date", "end_date"]  # Разрешенные поля для сортировки
     ordering = ["-start_date"]  # Сортировка по умолчанию
@@ -150,21 +268,12 @@ class TripViewSet(ModelViewSet):
 
     def get_queryset(self):
         """Фильтрация поездок в зависимости от авторизации пользователя."""
-        user = self.request.user
-        if user.is_authenticated:
-            # Авторизованный: публичные + свои приватные
-            return (
-                Trip.objects.filter(Q(is_public=True) | Q(user=user))
-                .select_related("user", "resort")
-                .prefetch_related("media")
-            )
-        else:
-            # Не авторизованный: только публичные
-            return (
-                Trip.objects.filter(is_public=True)
-                .select_related("user", "resort")
-                .prefetch_related("media")
-            )
+        # Авторизованный: публичные + свои приватные, гость: только публичные
+        return (
+            Trip.objects.visible_to(self.request.user)
+            .select_related("user")  # Курорт сериализуется из снимка
+            .prefetch_related("media")
+        )
 
     def get_serializer_class(self):
         """Используем разные serializers для чтения (GET) и записи (POST/PUT/PATCH)."""
@@ -224,14 +333,17 @@ class TripViewSet(ModelViewSet):
         kwargs["partial"] = True  # PATCH
         return self.update(request, *args, **kwargs)
 
-    @action(detail=True, methods=["get"])
+    @action(detail=True, methods=["get", "post"])
     def media(self, request, pk=None):
         """
         Вложенный эндпоинт: GET /api/trips/{id}/media/
         Возвращает медиафайлы, связанные с конкретной поездкой.
+        POST загружает в поездку несколько фотографий.
         """
         trip = self.get_object()
-        media_files = trip.media.all()
+        if request.method == "POST":
+            return self.upload_media(request, trip)
+        media_files = trip.media.prefetch_related("variants")
 
         # context нужен для правильного формирования абсолютных URL изображений
         serializer = TripMediaSerializer(
@@ -239,11 +351,26 @@ class TripViewSet(ModelViewSet):
         )
         return Response(serializer.data)
 
+    def upload_media(self, request, trip):
+        """Пакетная загрузка: POST /api/trips/{id}/media/ (поле images)."""
+        upload = TripMediaUploadSerializer(data=request.data)
+        upload.is_valid(raise_exception=True)
+        photos = TripMedia.objects.bulk_upload(trip, upload.validated_data["images"])
+        # Варианты новых фотографий - одним запросом (пока их нет)
+        prefetch_related_objects(photos, "variants")
+
+        serializer = TripMediaSerializer(
+            photos, many=True, context={"request": request}
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     def get_throttles(self):
         """Применяем разные throttles для разных действий."""
         if self.action == "create":
             # Для создания поездок - строгий лимит
             return [TripCreateThrottle()]
+        if self.action == "media" and self.request.method == "POST":
+            return [MediaUploadThrottle()]
         # Для остальных действий - стандартные throttles из настроек
         return super().get_throttles()
 
@@ -262,15 +389,236 @@ class TripMediaViewSet(ReadOnlyModelViewSet):
 
     def get_queryset(self):
         """Фильтрация медиафайлов в зависимости от авторизации пользователя."""
-        user = self.request.user
-        if user.is_authenticated:
-            # Авторизованный: медиа публичных поездок + своих приватных поездок
-            return TripMedia.objects.filter(
-                Q(trip__is_public=True) | Q(trip__user=user)
-            ).select_related("trip")
-        else:
-            # Гость: только медиа публичных поездок
-            return TripMedia.objects.filter(trip__is_public=True).select_related("trip")
+        # Авторизованный: медиа публичных поездок + своих приватных поездок
+        # Гость: только медиа публичных поездок
+        return (
+            TripMedia.objects.visible_to(self.request.user)
+            .select_related("trip")
+            .prefetch_related("variants")
+        )
+
+
+# Заголовки протокола загрузки частями (resort/uploads.py)
+UPLOAD_OFFSET_PARAMETER = OpenApiParameter(
+    name="Upload-Offset",
+    location=OpenApiParameter.HEADER,
+    description="Смещение части: сколько байт уже принято сервером.",
+    required=True,
+    type=int,
+)
+UPLOAD_CHECKSUM_PARAMETER = OpenApiParameter(
+    name="Upload-Checksum",
+    location=OpenApiParameter.HEADER,
+    description="'sha256 <base64>' - контрольная сумма части. С ней часть "
+    "принимается только целиком.",
+    required=False,
+    type=str,
+)
+
+
+class LengthRequired(APIException):
+    """411: часть загрузки без Content-Length."""
+
+    status_code = status.HTTP_411_LENGTH_REQUIRED
+    default_detail = "Нужен заголовок Content-Length."
+    default_code = "length_required"
+
+
+@extend_schema_view(
+    create=extend_schema(
+        summary="Начать загрузку фото",
+        description="Создать возобновляемую загрузку фотографии в свою поездку. "
+        "Байты файла отправляются частями через PATCH.",
+        tags=["uploads"],
+    ),
+    retrieve=extend_schema(
+        summary="Состояние загрузки",
+        description="Сколько байт принято (offset, заголовок Upload-Offset). "
+        "HEAD - только заголовки.",
+        tags=["uploads"],
+    ),
+    partial_update=extend_schema(
+        summary="Отправить часть файла",
+        description="Тело - байты файла со смещения Upload-Offset "
+        "(application/offset+octet-stream). Без Content-Length - 411, "
+        "неверное смещение - 409, несовпадение контрольной суммы - 460. "
+        "После последней части фотография добавляется в поездку (поле media).",
+        request={"application/offset+octet-stream": OpenApiTypes.BINARY},
+        parameters=[UPLOAD_OFFSET_PARAMETER, UPLOAD_CHECKSUM_PARAMETER],
+        tags=["uploads"],
+    ),
+    destroy=extend_schema(
+        summary="Отменить загрузку",
+        description="Удалить загрузку и принятые байты.",
+        tags=["uploads"],
+    ),
+)
+class MediaUploadViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    GenericViewSet,
+):
+    """
+    ViewSet возобновляемых загрузок фотографий (протокол в resort/uploads.py).
+
+    - POST /api/uploads/ - создать загрузку (trip, filename, size)
+    - HEAD/GET /api/uploads/{id}/ - сколько байт принято
+    - PATCH /api/uploads/{id}/ - следующая часть файла
+    - DELETE /api/uploads/{id}/ - отменить загрузку
+    """
+
+    serializer_class = MediaUploadSerializer
+    permission_classes = [IsAuthenticated]
+    http_method_names = ["get", "post", "patch", "delete", "head", "options"]
+
+    def get_queryset(self):
+        """Только свои загрузки."""
+        if getattr(self, "swagger_fake_view", False):
+            # Генерация схемы drf-spectacular: пользователя нет
+            return MediaUpload.objects.none()
+        return MediaUpload.objects.filter(user=self.request.user)
+
+    def offset_headers(self, upload):
+        """Смещение и размер загрузки в заголовках (их читает и HEAD)."""
+        return {
+            "Upload-Offset": str(upload.offset),
+            "Upload-Length": str(upload.size),
+            "Cache-Control": "no-store",
+        }
+
+    def perform_create(self, serializer):
+        """Загрузка текущего пользователя с пустым временным файлом."""
+        uploads.create_partial(serializer.save(user=self.request.user))
+
+    def get_success_headers(self, data):
+        """Location новой загрузки - адрес для PATCH и HEAD."""
+        return {
+            "Location": reverse(
+                "mediaupload-detail", kwargs={"pk": data["id"]}, request=self.request
+            ),
+            "Upload-Offset": str(data["offset"]),
+            "Upload-Length": str(data["size"]),
+        }
+
+    def retrieve(self, request, *args, **kwargs):
+        upload = self.get_object()
+        serializer = self.get_serializer(upload)
+        return Response(serializer.data, headers=self.offset_headers(upload))
+
+    def chunk_headers(self, request):
+        """(смещение, контрольная сумма, длина) части из заголовков запроса."""
+        if request.content_type != "application/offset+octet-stream":
+            raise UnsupportedMediaType(request.content_type)
+        offset = request.headers.get("Upload-Offset", "")
+        if not offset.isdigit():
+            raise ValidationError({"Upload-Offset": "Нужно неотрицательное число."})
+        try:
+            checksum = uploads.parse_checksum(request.headers.get("Upload-Checksum"))
+        except ValueError as exc:
+            raise ValidationError({"Upload-Checksum": str(exc)})
+        # Без длины часть считалась бы пустой: 200 без продвижения
+        length = request.META.get("CONTENT_LENGTH")
+        if not length:
+            raise LengthRequired
+        if not length.isdigit():
+            raise ValidationError({"Content-Length": "Нужно неотрицательное число."})
+        return int(offset), checksum, int(length)
+
+    def partial_update(self, request, *args, **kwargs):
+        """Дописывает часть файла со смещения из заголовка Upload-Offset."""
+        offset, checksum, length = self.chunk_headers(request)
+
+        # Без транзакции: тело части может идти долго, соединение с БД
+        # и блокировки на это время не держатся
+        upload = self.get_object()
+        error = self.check_chunk(upload, offset, length)
+        if error is not None:
+            return error
+        try:
+            with uploads.locked_partial(upload) as file:
+                # Между проверкой и flock могла закончиться другая часть
+                upload.refresh_from_db(fields=["offset", "media"])
+                error = self.check_chunk(upload, offset, length)
+                if error is None:
+                    error = self.receive_chunk(
+                        upload, file, request.stream, length, checksum
+                    )
+        except uploads.UploadBusy as exc:
+            return self.conflict(upload, str(exc))
+        except FileNotFoundError:
+            # Загрузку успели завершить (или отменить - тогда 404)
+            upload = self.get_object()
+            return self.conflict(upload, "Загрузка уже завершена.")
+        if error is not None:
+            return error
+        serializer = self.get_serializer(upload)
+        return Response(serializer.data, headers=self.offset_headers(upload))
+
+    def conflict(self, upload, detail):
+        """409: клиент продолжит с верного смещения, не отправляя байты зря."""
+        return Response(
+            {"detail": detail},
+            status=status.HTTP_409_CONFLICT,
+            headers=self.offset_headers(upload),
+        )
+
+    def check_chunk(self, upload, offset, length):
+        """Ответ с ошибкой, если часть не подходит; тело запроса не читается."""
+        # Принятая целиком загрузка без фотографии (завершение откатилось)
+        # завершается повторно пустой частью со смещением = размеру
+        if upload.media_id is not None or offset != upload.offset:
+            return self.conflict(upload, "Смещение не совпадает с принятым.")
+        if offset + length > upload.size:
+            return Response(
+                {"detail": "Часть выходит за размер файла."},
+                status=status.HTTP_400_BAD_REQUEST,
+                headers=self.offset_headers(upload),
+            )
+        return None
+
+    def receive_chunk(self, upload, file, stream, length, checksum):
+        """
+        Принимает часть в заблокированный файл; после последней собирает
+        фотографию поездки. Возвращает ответ с ошибкой или None.
+        """
+        offset = upload.offset
+        try:
+            new_offset = uploads.append_chunk(file, offset, stream, length, checksum)
+        except uploads.ChecksumMismatch as exc:
+            return Response(
+                {"detail": str(exc)},
+                status=uploads.HTTP_460_CHECKSUM_MISMATCH,
+                headers=self.offset_headers(upload),
+            )
+        # Смещение сохраняется, только если его никто не сдвинул
+        updated = MediaUpload.objects.filter(pk=upload.pk, offset=offset).update(
+            offset=new_offset, updated_at=timezone.now()
+        )
+        if not updated:
+            upload.refresh_from_db(fields=["offset"])
+            return self.conflict(upload, "Смещение изменилось во время приёма.")
+        upload.offset = new_offset
+        if not upload.is_complete:
+            return None
+        try:
+            uploads.complete_upload(upload)
+        except uploads.InvalidImage as exc:
+            uploads.discard_partial(upload)
+            upload.delete()
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return None
+
+    def perform_destroy(self, instance):
+        """Удаляет загрузку вместе с принятыми байтами."""
+        uploads.discard_partial(instance)
+        instance.delete()
+
+    def get_throttles(self):
+        """Новые загрузки - по лимиту пакетной загрузки фото."""
+        if self.action == "create":
+            return [MediaUploadThrottle()]
+        return super().get_throttles()
 
 
 @extend_schema_view(
@@ -288,14 +636,23 @@ class TripMediaViewSet(ReadOnlyModelViewSet):
         summary="Поездки пользователя",
         description="Получить публичные поездки конкретного пользователя.",
         tags=["users"],
+        parameters=TRIPS_PAGINATION_PARAMETERS,
     ),
 )
-class UserViewSet(ReadOnlyModelViewSet):
+class UserViewSet(NestedTripsMixin, ReadOnlyModelViewSet):
     """ViewSet для профиля пользователя."""
 
-    queryset = User.objects.all()
     serializer_class = UserSerializer
 
+    def get_queryset(self):
+        """
+        Количество публичных поездок считается одним запросом через annotate,
+        а не отдельным COUNT на каждого пользователя в сериализаторе.
+        """
+        return User.objects.annotate(
+            public_trips_count=Count("trips", filter=Q(trips__is_public=True))
+        ).order_by("id")
+
     @action(detail=True, methods=["get"])
     def trips(self, request, pk=None):
         """
@@ -303,10 +660,9 @@ class UserViewSet(ReadOnlyModelViewSet):
         Возвращает публичные поездки пользователя.
         """
         user = self.get_object()
-        trips = user.trips.filter(is_public=True).select_related("resort")
+        trips = user.trips.filter(is_public=True)  # Курорты - из снимка
 
-        serializer = TripReadSerializer(trips, many=True, context={"request": request})
-        return Response(serializer.data)
+        return self.trips_response(request, trips)
 
 
 class ThrottledTokenObtainPairView(TokenObtainPairView):
@@ -316,3 +672,41 @@ class ThrottledTokenObtainPairView(TokenObtainPairView):
     """
 
     throttle_classes = [AuthThrottle]
+
+
+def pool_stats(connection):
+    """
+    Статистика пула psycopg соединения БД или None, если пул выключен.
+
+    saturation - доля соединений пула, выданных потокам: около 1.0 вместе
+    с ненулевым requests_waiting означает, что пула не хватает.
+    """
+    pool = getattr(connection, "pool", None)
+    if pool is None:
+        return None
+    stats = pool.get_stats()
+    stats["saturation"] = round(
+        (stats["pool_size"] - stats["pool_available"]) / stats["pool_max"], 3
+    )
+    return stats
+
+
+class DatabasePoolStatsView(APIView):
+    """
+    Метрики пула соединений с БД (только для администраторов).
+
+    Пул у каждого процесса gunicorn свой: ответ описывает процесс,
+    обработавший запрос.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        summary="Метрики пула соединений с БД",
+        responses={200: OpenApiTypes.OBJECT},
+        tags=["metrics"],
+    )
+    def get(self, request):
+        return Response(
+            {alias: pool_stats(connections[alias]) for alias in connections}
+        )
@@ -2,6 +2,19 @@
 Все ключи кэша проекта хранятся здесь.
 """
 
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Параметры защиты от стампеда для семейства ключей (см. cache_utils.py)."""
+
+    ttl: int  # Сколько секунд значение считается свежим
+    stale_ttl: int  # Сколько ещё его можно отдавать, пока идёт пересчёт
+    lock_timeout: int = 10  # Время жизни блокировки пересчёта
+    beta: float = 1.0  # Агрессивность раннего обновления (XFetch), 0 - выключено
+    poll_interval: float = 0.05  # Период опроса при ожидании чужого пересчёта
+
 
 class CacheKeys:
     """Класс для генерации ключей кэша."""
@@ -9,17 +22,54 @@ class CacheKeys:
     # Префиксы для разных типов данных
     PREFIX_RESORT = "resort"
     PREFIX_TRIP = "trip"
+    PREFIX_AUTH = "auth"
+    PREFIX_DB = "db"
+    PREFIX_TASK = "task"
 
-    RESORT_LIST = f"{PREFIX_RESORT}:list"
+    # Версия снимка курортов в памяти процессов (см. resort/snapshot.py)
+    RESORT_SNAPSHOT_VERSION = f"{PREFIX_RESORT}:snapshot:version"
+
+    # Счётчики поездок всех курортов (вне снимка, см. resort/snapshot.py)
+    RESORT_TRIP_COUNTERS = f"{PREFIX_RESORT}:trip_counters"
+
+    @staticmethod
+    def resort_snapshot(version):
+        """Общие для всех процессов данные снимка курортов заданной версии."""
+        return f"{CacheKeys.PREFIX_RESORT}:snapshot:{version}"
+
+    @staticmethod
+    def auth_user(user_id):
+        """Пользователь для JWT-аутентификации (см. resort/api/authentication.py)."""
+        return f"{CacheKeys.PREFIX_AUTH}:user:{user_id}"
+
+    @staticmethod
+    def blacklisted_token(jti):
+        """Отозванный refresh-токен (см. resort/api/tokens.py)."""
+        return f"{CacheKeys.PREFIX_AUTH}:blacklist:{jti}"
+
+    @staticmethod
+    def primary_pin(user_id):
+        """Пользователь недавно писал в БД и читает из default (см. db_routing.py)."""
+        return f"{CacheKeys.PREFIX_DB}:primary_pin:{user_id}"
 
     @staticmethod
-    def resort_trips_counts(resort_id):
-        """Генерирует ключ кэша для счетчиков поездок курорта по его ID."""
-        return f"{CacheKeys.PREFIX_RESORT}:{resort_id}:trips_counts"
+    def queued_task(task_name, args):
+        """Задача Celery с аргументами стоит в очереди (см. resort/dispatch.py)."""
+        return f"{CacheKeys.PREFIX_TASK}:queued:{task_name}:" + ":".join(map(str, args))
 
 
 class CacheTimeouts:
     """Класс для хранения таймаутов кэша в секундах."""
 
-    RESORT_LIST = 60 * 10  # 10 минут
-    RESORT_TRIPS_COUNTS = 60 * 10  # 10 минут
+    RESORT_SNAPSHOT_CHECK = 5  # Как часто процесс сверяет версию снимка курортов
+    # Данные снимка в Redis: после смены версии или истечения срока курорты
+    # из БД загружает один процесс, остальные ждут или работают со старым снимком
+    RESORT_SNAPSHOT = CachePolicy(ttl=60 * 10, stale_ttl=60)
+    # Сбрасываются сигналами Trip после коммита; TTL - на случай UPDATE
+    # в обход сигналов и отката транзакции, прочитавшей свои изменения
+    RESORT_TRIP_COUNTERS = CachePolicy(ttl=60, stale_ttl=10)
+    AUTH_USER = 60 * 5  # 5 минут, сбрасывается сигналами при изменении пользователя
+    PRIMARY_PIN = 5  # Чтение из default после записи, с запасом на отставание реплик
+    # Защита от повторной постановки задачи; снимается при её старте, TTL -
+    # на случай потерянной задачи
+    QUEUED_TASK = 60 * 5
@@ -0,0 +1,90 @@
+"""Защита кэша от «стампеда» (cache stampede).
+
+Когда значение в кэше истекает или удаляется, все одновременные запросы
+пересчитывают его разом. get_or_compute устраняет это тремя приёмами:
+
+- single-flight: пересчитывает только владелец короткой блокировки в Redis,
+  остальные ждут результат;
+- вероятностное раннее обновление (XFetch): значение пересчитывается чуть
+  раньше срока, тем вероятнее, чем ближе срок и чем дольше расчёт;
+- stale-while-revalidate: пока владелец блокировки пересчитывает значение,
+  остальным отдаётся устаревшее.
+
+Параметры задаются для каждого семейства ключей через CachePolicy
+в CacheTimeouts (см. cache_keys.py).
+"""
+
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """Значение в кэше вместе с метаданными для раннего обновления."""
+
+    value: object
+    expires_at: float  # Время (time.time()), после которого значение устарело
+    delta: float  # Сколько секунд занял расчёт
+
+    def should_refresh(self, now, beta):
+        """XFetch: now - delta * beta * ln(rand) >= expires_at."""
+        return now + self.delta * beta * -math.log(1.0 - random.random()) >= (
+            self.expires_at
+        )
+
+
+def get_or_compute(key, compute, policy, wait=True):
+    """
+    Значение по ключу или результат compute() с защитой от стампеда.
+
+    Возвращает CacheEntry: по expires_at вызывающий код может понять,
+    получил ли он свежее значение или устаревшее (пока его пересчитывают).
+    С wait=False вместо ожидания чужого пересчёта возвращает None -
+    для вызывающих, у которых есть своё устаревшее значение.
+    """
+    entry = cache.get(key)
+    now = time.time()
+    if entry is not None and not entry.should_refresh(now, policy.beta):
+        return entry
+
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, policy.lock_timeout):
+        try:
+            return _compute_and_store(key, compute, policy)
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    # Пересчитывает другой процесс: отдаём устаревшее значение, если оно есть
+    if entry is not None:
+        return entry
+
+    if not wait:
+        return None
+
+    # Значения нет совсем - ждём, пока владелец блокировки его запишет
+    deadline = time.monotonic() + policy.lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(policy.poll_interval)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+
+    # Владелец блокировки не успел (упал или завис) - считаем сами
+    return _compute_and_store(key, compute, policy)
+
+
+def _compute_and_store(key, compute, policy):
+    started = time.time()
+    value = compute()
+    now = time.time()
+    entry = CacheEntry(value=value, expires_at=now + policy.ttl, delta=now - started)
+    # Ключ живёт дольше срока свежести: устаревшее значение отдаётся при пересчёте
+    cache.set(key, entry, policy.ttl + policy.stale_ttl)
+    return entry
@@ -0,0 +1,107 @@
+"""Чтение с реплик PostgreSQL.
+
+Почти весь трафик - чтение, поэтому при настроенных репликах
+(settings.DATABASE_REPLICAS) чтения безопасных запросов (GET, HEAD, OPTIONS)
+уходят на случайную реплику, а всё остальное - на основную БД:
+
+- запись всегда идёт в default;
+- небезопасные запросы (формы, POST/PUT/PATCH/DELETE в API) и запросы,
+  уже что-то записавшие, читают из default;
+- read-your-writes: после записи клиент на CacheTimeouts.PRIMARY_PIN секунд
+  закрепляется за default (cookie, а для API - ещё и ключ в Redis по
+  пользователю), чтобы не увидеть данные реплики, отстающей от основной БД;
+- вне HTTP-запросов (Celery, команды) всё читается из default.
+"""
+
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import SimpleLazyObject
+
+from resort.cache_keys import CacheKeys, CacheTimeouts
+
+PRIMARY = DEFAULT_DB_ALIAS
+PIN_COOKIE = "db_primary_pin"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Текущий HTTP-запрос; выставляется ReplicaRoutingMiddleware
+_current_request = ContextVar("current_request", default=None)
+
+
+def use_primary(request):
+    """Должен ли запрос читать из основной БД."""
+    if request.method not in SAFE_METHODS or getattr(request, "_db_written", False):
+        return True
+    if PIN_COOKIE in request.COOKIES:
+        return True
+    # Пользователь API известен после аутентификации DRF (она подменяет
+    # request.user). Ленивого пользователя сессии не вычисляем: это запрос
+    # к таблице сессий, а браузер и так закреплён cookie
+    user = request.__dict__.get("user")
+    if isinstance(user, SimpleLazyObject) or not getattr(
+        user, "is_authenticated", False
+    ):
+        return False
+    pins = request.__dict__.setdefault("_db_primary_pins", {})
+    if user.pk not in pins:
+        pins[user.pk] = cache.get(CacheKeys.primary_pin(user.pk)) is not None
+    return pins[user.pk]
+
+
+class PrimaryReplicaRouter:
+    """Роутер: чтения безопасных запросов - на реплики, остальное - в default."""
+
+    def db_for_read(self, model, **hints):
+        request = _current_request.get()
+        if not settings.DATABASE_REPLICAS or request is None or use_primary(request):
+            return PRIMARY
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        request = _current_request.get()
+        if request is not None:
+            # Дальнейшие чтения этого запроса должны видеть запись
+            request._db_written = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и default
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False  # Схема приходит на реплику репликацией
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Делает текущий запрос доступным роутеру и после записи закрепляет
+    клиента за основной БД.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current_request.set(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+
+        if settings.DATABASE_REPLICAS and getattr(request, "_db_written", False):
+            self.pin_to_primary(request, response)
+        return response
+
+    def pin_to_primary(self, request, response):
+        timeout = CacheTimeouts.PRIMARY_PIN
+        response.set_cookie(
+            PIN_COOKIE, "1", max_age=timeout, httponly=True, samesite="Lax"
+        )
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            cache.set(CacheKeys.primary_pin(user.pk), 1, timeout)
@@ -0,0 +1,61 @@
+"""Постановка задач Celery после коммита транзакции.
+
+Задача, отправленная прямо из post_save, может выполниться раньше, чем
+транзакция с объектом закоммитится: воркер не найдёт объект или увидит
+старые данные. enqueue_on_commit откладывает отправку до коммита
+(transaction.on_commit) и отбрасывает повторы:
+
+- в рамках одной транзакции одна и та же задача с теми же аргументами
+  отправляется один раз;
+- пока задача стоит в очереди (ключ в Redis до её старта), повторная
+  отправка из других транзакций и процессов пропускается.
+"""
+
+from celery.signals import task_prerun
+from django.core.cache import cache
+from django.db import transaction
+
+from resort.cache_keys import CacheKeys, CacheTimeouts
+
+
+class QueuedTask:
+    """Отложенная до коммита отправка задачи; сравнивается по ключу."""
+
+    def __init__(self, task, args):
+        self.task = task
+        self.args = args
+        self.key = CacheKeys.queued_task(task.name, args)
+        # on_commit(robust=True) пишет имя колбэка в лог при ошибке
+        self.__qualname__ = f"{type(self).__name__}({task.name})"
+
+    def __call__(self):
+        if not cache.add(self.key, 1, CacheTimeouts.QUEUED_TASK):
+            return  # Такая же задача ещё в очереди
+        try:
+            self.task.delay(*self.args)
+        except Exception:
+            cache.delete(self.key)
+            raise
+
+
+def enqueue_on_commit(task, *args, using=None):
+    """
+    Отправить task.delay(*args) после коммита текущей транзакции
+    (вне транзакции - сразу). При откате задача не отправляется.
+    """
+    queued = QueuedTask(task, args)
+    connection = transaction.get_connection(using)
+    # Ожидающие коммита колбэки: (savepoint ids, func, robust)
+    if any(
+        getattr(func, "key", None) == queued.key
+        for _, func, _ in connection.run_on_commit
+    ):
+        return
+    # robust: ошибка брокера не должна ломать уже закоммиченный запрос
+    transaction.on_commit(queued, using=using, robust=True)
+
+
+@task_prerun.connect
+def release_queued_task(sender=None, args=None, **kwargs):
+    """Задача стартовала - её снова можно ставить в очередь."""
+    cache.delete(CacheKeys.queued_task(sender.name, tuple(args or ())))
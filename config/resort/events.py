@@ -0,0 +1,182 @@
+"""События готовности вариантов фотографий (Server-Sent Events).
+
+Задачи построения вариантов (resort/tasks.py) после коммита публикуют
+событие media_ready в канал Redis pub/sub поездки. Страница поездки и
+клиенты API подписываются на /api/trips/{id}/media/events/ (EventSource)
+и получают URL вариантов, как только они готовы, - без опроса
+/api/trips/{id}/media/ и перезагрузки trip_detail.html.
+
+Поток отдаёт асинхронное представление: под ASGI-сервером (uvicorn)
+открытое соединение - ожидающая корутина, а не занятый воркер gunicorn.
+К БД поток обращается только при подключении: доступ к поездке и уже
+готовые фотографии из ?pending= (варианты могли появиться до подписки).
+"""
+
+import asyncio
+import json
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from django_redis import get_redis_connection
+from redis import RedisError
+from redis.asyncio import Redis
+
+from resort.api.serializers import TripMediaSerializer
+from resort.media import media_user
+from resort.models import Trip, TripMedia
+
+EVENT_MEDIA_READY = "media_ready"
+
+# Фотографий в ?pending= (ID через запятую)
+MAX_PENDING = 100
+
+
+def trip_channel(trip_id):
+    """Канал Redis pub/sub с событиями фотографий поездки."""
+    return f"trip:{trip_id}:media"
+
+
+def media_payload(media):
+    """Данные события: фотография с вариантами, как в API (относительные URL)."""
+    return TripMediaSerializer(media).data
+
+
+def format_event(data):
+    """Сообщение SSE media_ready; data - JSON в одну строку."""
+    return f"event: {EVENT_MEDIA_READY}\ndata: {data}\n\n"
+
+
+def publish_media_ready(media_by_trip):
+    """
+    Публикует media_ready для фотографий {trip_id: [media_id, ...]}.
+    Фотографии читаются из БД, только если на канал поездки кто-то подписан.
+    """
+    try:
+        client = get_redis_connection("default")
+    except NotImplementedError:
+        return  # Кэш не на Redis - событий нет
+
+    try:
+        channels = {trip_channel(trip_id): trip_id for trip_id in media_by_trip}
+        subscribers = dict(client.pubsub_numsub(*channels))
+        listened = [
+            media_id
+            for channel, trip_id in channels.items()
+            if subscribers.get(channel.encode())
+            for media_id in media_by_trip[trip_id]
+        ]
+        if not listened:
+            return
+        photos = (
+            TripMedia.objects.using(DEFAULT_DB_ALIAS)
+            .filter(pk__in=listened)
+            .prefetch_related("variants")
+        )
+        pipeline = client.pipeline(transaction=False)
+        for media in photos:
+            pipeline.publish(
+                trip_channel(media.trip_id), json.dumps(media_payload(media))
+            )
+        pipeline.execute()
+    except RedisError as exc:
+        # Без события клиент увидит варианты при следующей загрузке страницы
+        print(f"⚠️ Событие media_ready не отправлено: {exc}")
+
+
+def publish_on_commit(photos):
+    """publish_media_ready для фотографий TripMedia после коммита."""
+    media_by_trip = defaultdict(list)
+    for media in photos:
+        media_by_trip[media.trip_id].append(media.pk)
+    if media_by_trip:
+        transaction.on_commit(lambda: publish_media_ready(dict(media_by_trip)))
+
+
+def ready_payloads(trip_id, media_ids):
+    """Данные событий для фотографий поездки, варианты которых уже готовы."""
+    photos = (
+        TripMedia.objects.using(DEFAULT_DB_ALIAS)
+        .filter(trip_id=trip_id, pk__in=media_ids)
+        .exclude(variants_version="")
+        .prefetch_related("variants")
+    )
+    return [json.dumps(media_payload(media)) for media in photos]
+
+
+def parse_pending(value):
+    """ID фотографий из ?pending=1,2,3 (не больше MAX_PENDING)."""
+    ids = [part for part in value.split(",") if part.strip().isdigit()]
+    return [int(part) for part in ids[:MAX_PENDING]]
+
+
+async def event_stream(trip_id, pending):
+    """
+    Поток SSE поездки: media_ready из Redis, комментарий-keepalive раз в
+    TRIP_MEDIA_EVENTS_KEEPALIVE секунд (прокси не закрывают соединение).
+    Через TRIP_MEDIA_EVENTS_TIMEOUT поток закрывается - EventSource
+    переподключится сам.
+    """
+    client = Redis.from_url(settings.CACHES["default"]["LOCATION"])
+    pubsub = client.pubsub()
+    try:
+        await pubsub.subscribe(trip_channel(trip_id))
+        # Подтверждение подписки: события после него не потеряются
+        await pubsub.get_message(timeout=settings.TRIP_MEDIA_EVENTS_KEEPALIVE)
+        yield f"retry: {settings.TRIP_MEDIA_EVENTS_RETRY * 1000}\n\n"
+        if pending:
+            for data in await sync_to_async(ready_payloads)(trip_id, pending):
+                yield format_event(data)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.TRIP_MEDIA_EVENTS_TIMEOUT
+        while loop.time() < deadline:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=settings.TRIP_MEDIA_EVENTS_KEEPALIVE,
+            )
+            if message is None:
+                yield ": keepalive\n\n"
+            else:
+                yield format_event(message["data"].decode())
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
+
+
+def visible_trip_exists(request, trip_id):
+    """Видит ли пользователь запроса (сессия или JWT) поездку trip_id."""
+    user = media_user(request)
+    return Trip.objects.visible_to(user).filter(pk=trip_id).exists()
+
+
+@require_GET
+async def trip_media_events(request, trip_id):
+    """
+    GET /api/trips/{id}/media/events/ - поток SSE с событиями media_ready.
+    ?pending=1,2 - фотографии без вариантов: уже готовые придут сразу.
+
+    Только под ASGI (сервис events): под WSGI каждое открытое соединение
+    заняло бы воркер gunicorn на TRIP_MEDIA_EVENTS_TIMEOUT, поэтому запрос,
+    по ошибке направленный в web, получает 503.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(
+            "Поток событий обслуживается только ASGI-сервером (сервис events).",
+            status=503,
+            content_type="text/plain; charset=utf-8",
+        )
+    if not await sync_to_async(visible_trip_exists)(request, trip_id):
+        raise Http404
+
+    pending = parse_pending(request.GET.get("pending", ""))
+    response = StreamingHttpResponse(
+        event_stream(trip_id, pending), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx не буферизует поток
+    return response
@@ -0,0 +1,251 @@
+"""Варианты фотографий поездок разных размеров и форматов.
+
+Оригинал декодируется один раз и сразу в уменьшенном виде: JPEG - средствами
+декодера (draft, масштабирование DCT в 1/2-1/8), остальные форматы -
+reduce() после декодирования. Число декодируемых пикселей ограничено
+settings.TRIP_MEDIA_MAX_DECODE_PIXELS, поэтому память на задачу ограничена
+даже для снимков в десятки мегапикселей. Ориентация из EXIF применяется.
+
+Дальше изображение уменьшается последовательно от большего размера к
+меньшему: каждый вариант получается из предыдущего. Каждый размер кодируется
+во все форматы из settings.TRIP_MEDIA_VARIANT_FORMATS (JPEG для всех
+браузеров, WebP - меньше по весу). Изображения не увеличиваются: размеры
+больше оригинала заменяются одним вариантом в натуральную величину.
+"""
+
+import hashlib
+import json
+import math
+from dataclasses import dataclass
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from resort.storage import sharded_name
+
+# Формат варианта -> (формат Pillow, расширение файла)
+FORMATS = {
+    "jpeg": ("JPEG", ".jpg"),
+    "webp": ("WEBP", ".webp"),
+}
+
+
+# Увеличивается при изменении алгоритма: все варианты будут перестроены
+ENGINE_VERSION = 1
+
+# Во сколько раз изображение после reduce() должно быть больше крупнейшего
+# варианта: запас для качественного LANCZOS (как reducing_gap в thumbnail).
+# DCT-масштабирование JPEG в draft() само по себе качественное, запас не нужен
+REDUCING_GAP = 2.0
+
+
+class ImageTooLarge(ValueError):
+    """Изображение не укладывается в бюджет пикселей при декодировании."""
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """Закодированный вариант изображения."""
+
+    size: int
+    format: str
+    width: int
+    height: int
+    content: bytes
+
+
+def variant_sizes(source_size, sizes):
+    """
+    Размеры вариантов для изображения source_size (ширина, высота):
+    все меньшие оригинала и первый не меньший - он будет в натуральную величину.
+    """
+    longest = max(source_size)
+    result = []
+    for size in sorted(sizes):
+        result.append(size)
+        if size >= longest:
+            break
+    return result
+
+
+def decode(image, box):
+    """
+    Декодирует открытое изображение, уменьшив его при декодировании, но не
+    меньше box по длинной стороне. Возвращает RGB-изображение с учётом
+    EXIF-ориентации.
+    """
+    scale = box / max(image.size)
+    if scale < 1:
+        # Для JPEG меняет image.size до фактического размера декодирования
+        image.draft(
+            None, (math.ceil(image.width * scale), math.ceil(image.height * scale))
+        )
+
+    pixels = image.width * image.height
+    if pixels > settings.TRIP_MEDIA_MAX_DECODE_PIXELS:
+        raise ImageTooLarge(
+            f"{image.width}x{image.height}: больше "
+            f"{settings.TRIP_MEDIA_MAX_DECODE_PIXELS} пикселей при декодировании"
+        )
+
+    # Форматы без draft (PNG, WebP, ...) - усреднение блоков factor x factor
+    factor = int(max(image.size) // (box * REDUCING_GAP))
+    decoded = image.reduce(factor) if factor >= 2 else image
+    ImageOps.exif_transpose(decoded, in_place=True)
+    # JPEG не поддерживает прозрачность и палитру, WebP - CMYK
+    return decoded.convert("RGB") if decoded.mode != "RGB" else decoded
+
+
+def render_variants(source, sizes=None, formats=None):
+    """
+    Список Rendition для файла source (путь или файловый объект).
+    По умолчанию размеры и форматы берутся из настроек.
+    """
+    if sizes is None:
+        sizes = settings.TRIP_MEDIA_VARIANT_SIZES
+    if formats is None:
+        formats = settings.TRIP_MEDIA_VARIANT_FORMATS
+
+    renditions = []
+    with Image.open(source) as image:
+        sizes = sorted(variant_sizes(image.size, sizes), reverse=True)
+        current = decode(image, sizes[0])
+        for size in sizes:
+            current.thumbnail((size, size), Image.Resampling.LANCZOS)
+            for fmt, quality in formats.items():
+                buffer = BytesIO()
+                current.save(buffer, format=FORMATS[fmt][0], quality=quality)
+                renditions.append(
+                    Rendition(
+                        size=size,
+                        format=fmt,
+                        width=current.width,
+                        height=current.height,
+                        content=buffer.getvalue(),
+                    )
+                )
+    return renditions
+
+
+def variants_version():
+    """
+    Версия набора вариантов: меняется вместе с размерами, форматами или
+    ENGINE_VERSION. Фотографии с другой версией в TripMedia.variants_version
+    перестраиваются командой backfill_media_variants.
+    """
+    config = [
+        ENGINE_VERSION,
+        sorted(settings.TRIP_MEDIA_VARIANT_SIZES),
+        sorted(settings.TRIP_MEDIA_VARIANT_FORMATS.items()),
+    ]
+    return hashlib.sha1(json.dumps(config).encode()).hexdigest()[:12]
+
+
+def render_media_variants(image_name):
+    """
+    Строит варианты файла image_name. Возвращает поля TripMediaVariant
+    без media, закодированный файл - в content; в хранилище он попадает в
+    replace_variants. К БД и хранилищу вариантов не обращается, поэтому
+    годится для процессов пула (backfill_media_variants).
+    """
+    from resort.models import TripMedia, TripMediaVariant
+
+    storage = TripMedia._meta.get_field("image").storage
+    with storage.open(image_name, "rb") as source:
+        renditions = render_variants(source)
+
+    file_field = TripMediaVariant._meta.get_field("file")
+    variants = []
+    for rendition in renditions:
+        # Как и оригиналы, варианты раскладываются по хешу (resort/storage.py)
+        extension = FORMATS[rendition.format][1]
+        relative = sharded_name(
+            ContentFile(rendition.content), f"{rendition.size}{extension}"
+        )
+        variants.append(
+            {
+                "size": rendition.size,
+                "format": rendition.format,
+                "width": rendition.width,
+                "height": rendition.height,
+                "file": file_field.generate_filename(None, relative),
+                "content": rendition.content,
+            }
+        )
+    return variants
+
+
+def replace_variants(variants_by_media):
+    """
+    Заменяет варианты фотографий: {TripMedia: [поля вариантов]}.
+    Файлы с content записываются в хранилище, без content - уже
+    хранятся (берутся у другой фотографии); ссылки на файлы добавляются
+    в MediaBlob одной пачкой. Старые варианты удаляются (ссылки на их
+    файлы убирает TripMediaVariantQuerySet.delete), новые создаются одним
+    INSERT, версия фотографий - одним UPDATE.
+    """
+    from resort.models import MediaBlob, TripMedia, TripMediaVariant
+
+    storage = TripMediaVariant._meta.get_field("file").storage
+    version = variants_version()
+    with transaction.atomic():
+        TripMediaVariant.objects.filter(media__in=list(variants_by_media)).delete()
+        variants, files = [], []
+        for media, fields_list in variants_by_media.items():
+            media.variants_version = version
+            for fields in fields_list:
+                fields = dict(fields)
+                content = fields.pop("content", None)
+                files.append((fields["file"], content and ContentFile(content)))
+                variants.append(TripMediaVariant(media=media, **fields))
+        MediaBlob.objects.acquire_many(storage, files)
+        created = TripMediaVariant.objects.bulk_create(variants)
+        TripMedia.objects.bulk_update(list(variants_by_media), ["variants_version"])
+    return created
+
+
+def shared_variants(media):
+    """
+    Поля вариантов другой фотографии с тем же файлом (та же фотография,
+    загруженная в другую поездку) или None, если таких нет.
+    """
+    from resort.models import TripMedia
+
+    donor = (
+        TripMedia.objects.filter(
+            image=media.image.name, variants_version=variants_version()
+        )
+        .exclude(pk=media.pk)
+        .prefetch_related("variants")
+        .first()
+    )
+    if donor is None:
+        return None
+    return [
+        {
+            "size": variant.size,
+            "format": variant.format,
+            "width": variant.width,
+            "height": variant.height,
+            "file": variant.file.name,
+        }
+        for variant in donor.variants.all()
+    ]
+
+
+def generate_variants(media):
+    """
+    Строит варианты фотографии media и заменяет ими прежние. Если та же
+    фотография уже загружена в другую поездку, её варианты переиспользуются
+    без декодирования.
+    """
+    variants = shared_variants(media)
+    if variants is not None:
+        try:
+            return replace_variants({media: variants})
+        except FileNotFoundError:
+            pass  # Варианты другой фотографии удалили - строим заново
+    return replace_variants({media: render_media_variants(media.image.name)})
@@ -0,0 +1,21 @@
+import math
+import statistics
+
+
+def percentile(values, percent):
+    """Процентиль методом ближайшего ранга по отсортированным значениям."""
+    rank = math.ceil(len(values) * percent / 100)
+    return values[max(rank, 1) - 1]
+
+
+def report_timings(command, name, timings, extra=""):
+    """
+    Печатает от имени команды среднее, медиану и p99 замеров в микросекундах.
+    timings — длительности в секундах, extra дописывается в конец строки.
+    """
+    timings_us = sorted(t * 1_000_000 for t in timings)
+    command.stdout.write(
+        command.style.SUCCESS(name) + f": mean {statistics.mean(timings_us):.1f} µs, "
+        f"p50 {statistics.median(timings_us):.1f} µs, "
+        f"p99 {percentile(timings_us, 99):.1f} µs" + extra
+    )
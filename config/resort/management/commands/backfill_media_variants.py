@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from resort.images import render_media_variants, replace_variants, variants_version
+from resort.models import TripMedia
+from resort.tasks import generate_media_variants_batch
+
+
+def batched(iterable, size):
+    """Разбивает итерируемое на списки по size элементов."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def render_job(job):
+    """Выполняется в процессе пула: (media_id, поля вариантов или None, ошибка)."""
+    media_id, image_name = job
+    try:
+        return media_id, render_media_variants(image_name), None
+    except Exception as exc:
+        return media_id, None, f"{type(exc).__name__}: {exc}"
+
+
+class Command(BaseCommand):
+    """
+    Построение вариантов для фотографий без вариантов текущей версии
+    (после загрузки фикстур, импорта или смены TRIP_MEDIA_VARIANT_SIZES).
+
+    Фотографии читаются потоком (iterator), изображения обрабатываются пулом
+    процессов на всех ядрах, результаты сохраняются пачками: bulk_create
+    вариантов и bulk_update версии. Каждая пачка коммитится сразу, поэтому
+    прерванную команду достаточно запустить снова - она продолжит с
+    необработанных фотографий. С --celery фотографии раздаются пачками
+    задачам Celery.
+
+    Пример: python manage.py backfill_media_variants --workers 8
+    """
+
+    help = "Построение вариантов фотографий для TripMedia без актуальной версии"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Процессов пула (по умолчанию - по числу ядер)",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=50, help="Фотографий в пачке"
+        )
+        parser.add_argument(
+            "--celery",
+            action="store_true",
+            help="Не обрабатывать локально, а поставить пачки в очередь Celery",
+        )
+
+    def handle(self, *args, **options):
+        pending = (
+            TripMedia.objects.exclude(variants_version=variants_version())
+            .exclude(image="")
+            .order_by("id")
+        )
+        total = pending.count()
+        if not total:
+            self.stdout.write(self.style.SUCCESS("Все варианты актуальны"))
+            return
+
+        if options["celery"]:
+            self.enqueue(pending, total, options["batch_size"])
+        else:
+            self.process(pending, total, options["workers"], options["batch_size"])
+
+    def enqueue(self, pending, total, batch_size):
+        ids = pending.values_list("id", flat=True).iterator(chunk_size=batch_size)
+        batches = 0
+        for batch in batched(ids, batch_size):
+            generate_media_variants_batch.delay(batch)
+            batches += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"В очередь Celery: {total} фотографий, {batches} задач")
+        )
+
+    def process(self, pending, total, workers, batch_size):
+        # Процессы пула наследуют соединения с БД при fork - закрываем заранее
+        connections.close_all()
+        started = time.perf_counter()
+        done = failed = 0
+        context = multiprocessing.get_context("fork")
+        with context.Pool(workers) as pool:
+            media_stream = pending.only("id", "image").iterator(chunk_size=batch_size)
+            for batch in batched(media_stream, batch_size):
+                media_by_id = {media.pk: media for media in batch}
+                jobs = [(media.pk, media.image.name) for media in batch]
+                variants_by_media = {}
+                for media_id, variants, error in pool.imap_unordered(render_job, jobs):
+                    if error is None:
+                        variants_by_media[media_by_id[media_id]] = variants
+                    else:
+                        failed += 1
+                        self.stderr.write(f"media_id={media_id}: {error}")
+                replace_variants(variants_by_media)
+                done += len(variants_by_media)
+
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{done + failed}/{total}: {done / elapsed:.1f} изобр./с"
+                )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"Готово: {done} фотографий")
+            + f" за {elapsed:.1f} с ({done / elapsed:.1f} изобр./с), ошибок: {failed}"
+        )
@@ -0,0 +1,59 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from resort.api.authentication import CachedJWTAuthentication, invalidate_auth_user
+from resort.management.bench import report_timings
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк JWT-аутентификации одного запроса.
+
+    Сравнивает стандартный JWTAuthentication (SELECT из auth_user на каждый
+    запрос) и CachedJWTAuthentication (пользователь из Redis). Пользователь
+    создаётся во временной транзакции, которая в конце откатывается.
+
+    Пример: python manage.py bench_auth --requests 5000
+    """
+
+    help = "Бенчмарк JWT-аутентификации: стандартная против кэширующей"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=5000, help="Запросов на вариант"
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create_user(username=f"bench_auth_{time.time_ns()}")
+            access = RefreshToken.for_user(user).access_token
+            request = APIRequestFactory().get(
+                "/api/trips/", HTTP_AUTHORIZATION=f"Bearer {access}"
+            )
+
+            for name, auth_class in (
+                ("JWTAuthentication", JWTAuthentication),
+                ("CachedJWTAuthentication", CachedJWTAuthentication),
+            ):
+                timings, queries = self.run(auth_class(), request, options["requests"])
+                report_timings(self, name, timings, f", запросов к БД {queries}")
+
+            invalidate_auth_user(user.pk)
+            transaction.set_rollback(True)
+
+    def run(self, authentication, request, total):
+        """Замеряет authenticate() и считает запросы к БД."""
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(total):
+                started = time.perf_counter()
+                authentication.authenticate(request)
+                timings.append(time.perf_counter() - started)
+        return timings, len(queries.captured_queries)
@@ -0,0 +1,81 @@
+import copy
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from config.database import database_options
+from resort.management.bench import report_timings
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк подключения к БД на один запрос.
+
+    Повторяет цикл запроса Django: close_old_connections() в начале и в конце
+    (сигналы request_started/request_finished) и один SELECT между ними.
+    Сравнивает три профиля DATABASES["default"]:
+
+    - новое соединение на запрос (CONN_MAX_AGE=0, как было);
+    - постоянное соединение (CONN_MAX_AGE с CONN_HEALTH_CHECKS);
+    - пул psycopg (DB_POOL=True).
+
+    Пример: python manage.py bench_db_connections --requests 500
+    """
+
+    help = "Бенчмарк соединений с БД: без пула, CONN_MAX_AGE и пул psycopg"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=500, help="Запросов на вариант"
+        )
+
+    def handle(self, *args, **options):
+        profiles = (
+            ("Новое соединение", {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False}),
+            ("CONN_MAX_AGE", database_options({})),
+            (
+                "Пул psycopg",
+                database_options(
+                    {"DB_POOL": "True", "WEB_CONCURRENCY": "1", "GUNICORN_THREADS": "1"}
+                ),
+            ),
+        )
+        for index, (name, profile) in enumerate(profiles):
+            connection = self.make_connection(f"bench_{index}", profile)
+            try:
+                timings = self.run(connection, options["requests"])
+            finally:
+                connection.close()
+                if hasattr(connection, "close_pool"):
+                    connection.close_pool()
+                del connections[connection.alias]
+                del connections.settings[connection.alias]
+            report_timings(self, name, timings)
+
+    def make_connection(self, alias, profile):
+        """
+        Отдельное соединение с настройками default, изменёнными профилем.
+        Регистрируется в connections: contrib.postgres ищет его по alias.
+        """
+        settings_dict = copy.deepcopy(connections.settings["default"])
+        settings_dict.update(copy.deepcopy(profile))
+        settings_dict["OPTIONS"] = {
+            **connections.settings["default"]["OPTIONS"],
+            **profile.get("OPTIONS", {}),
+        }
+        connections.settings[alias] = settings_dict
+        return connections[alias]
+
+    def run(self, connection, total):
+        """Замеряет полный цикл запроса с одним SELECT."""
+        timings = []
+        for _ in range(total):
+            started = time.perf_counter()
+            connection.close_if_unusable_or_obsolete()  # request_started
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            connection.close_if_unusable_or_obsolete()  # request_finished
+            timings.append(time.perf_counter() - started)
+        return timings
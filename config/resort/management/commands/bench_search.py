@@ -0,0 +1,145 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from resort.models import SEARCH_CONFIG, Resort, Trip
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк поиска поездок: ILIKE по JOIN (?search=) против
+    полнотекстового поиска по search_vector (?q=).
+
+    Генерирует --trips поездок (по умолчанию миллион) одним
+    INSERT ... SELECT generate_series, считает tsvector, делает ANALYZE
+    и замеряет COUNT и первую страницу для каждого запроса.
+    Всё выполняется в транзакции, которая в конце откатывается
+    (если не указан --keep).
+
+    Пример: python manage.py bench_search --trips 1000000 --repeat 5
+    """
+
+    help = "Бенчмарк поиска поездок: ILIKE против полнотекстового поиска"
+
+    words = [
+        "снег",
+        "пухляк",
+        "трасса",
+        "подъёмник",
+        "лавина",
+        "солнце",
+        "туман",
+        "метель",
+        "очередь",
+        "инструктор",
+        "фрирайд",
+        "сноуборд",
+        "склон",
+        "ратрак",
+        "гондола",
+        "глинтвейн",
+    ]
+    queries = ["пухляк", "лавины", "Шерегеш", "Краснодарский"]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--trips", type=int, default=1_000_000, help="Сколько поездок сгенерировать"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Повторов каждого запроса"
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Не откатывать сгенерированные данные",
+        )
+
+    def handle(self, *args, **options):
+        if not Resort.objects.exists():
+            raise CommandError("Нет курортов: загрузите fixtures resorts.json")
+
+        with transaction.atomic():
+            self.generate(options["trips"])
+            for query in self.queries:
+                self.compare(query, options["repeat"])
+
+            if not options["keep"]:
+                transaction.set_rollback(True)
+                self.stdout.write("Сгенерированные данные откачены")
+            else:
+                self.stdout.write(
+                    "Данные сохранены, счётчики курортов сверьте командой "
+                    "reconcile_trip_counters"
+                )
+
+    def generate(self, count):
+        """Генерация поездок и их tsvector в обход сигналов."""
+        started = time.perf_counter()
+        user = User.objects.create(username=f"bench_search_{time.time_ns()}")
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO resort_trip (user_id, resort_id, start_date, end_date,
+                                         comment, is_public, created_at)
+                SELECT %s,
+                       r.ids[1 + g %% array_length(r.ids, 1)],
+                       DATE '2015-01-01' + g %% 3650,
+                       DATE '2015-01-08' + g %% 3650,
+                       w.words[1 + (g * 7) %% w.n] || ' ' ||
+                       w.words[1 + (g * 13) %% w.n] || ' ' ||
+                       w.words[1 + (g * 31) %% w.n],
+                       g %% 10 <> 0,
+                       now()
+                FROM generate_series(1, %s) AS g,
+                     (SELECT array_agg(id) AS ids FROM resort_resort) AS r,
+                     (SELECT %s::text[] AS words, %s AS n) AS w
+                """,
+                [user.id, count, self.words, len(self.words)],
+            )
+        Trip.objects.filter(user=user).update_search_vector()
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE resort_trip")
+
+        self.stdout.write(
+            f"Сгенерировано {count} поездок за {time.perf_counter() - started:.1f} с"
+        )
+
+    def compare(self, query, repeat):
+        """Сравнение ILIKE и полнотекстового поиска для одного запроса."""
+        ilike = Trip.objects.filter(
+            Q(resort__name__icontains=query)
+            | Q(resort__region__icontains=query)
+            | Q(comment__icontains=query)
+        )
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+        fulltext = (
+            Trip.objects.filter(search_vector=search_query)
+            .annotate(search_rank=SearchRank(F("search_vector"), search_query))
+            .order_by("-search_rank", "-pk")
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"Запрос {query!r}"))
+        for name, queryset in (("ILIKE (?search=)", ilike), ("FTS (?q=)", fulltext)):
+            count_ms, found = self.measure(queryset.count, repeat)
+            page_ms, _ = self.measure(
+                lambda: list(queryset.select_related("user", "resort")[:10]), repeat
+            )
+            self.stdout.write(
+                f"  {name}: найдено {found}, COUNT {count_ms:.1f} мс, "
+                f"первая страница {page_ms:.1f} мс"
+            )
+
+    def measure(self, func, repeat):
+        """Медиана времени выполнения в миллисекундах и результат."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), result
@@ -0,0 +1,75 @@
+import time
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from rest_framework.throttling import UserRateThrottle
+
+from resort.api.throttles import RedisUserRateThrottle
+from resort.management.bench import report_timings
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк накладных расходов throttling на один запрос.
+
+    Сравнивает стандартный UserRateThrottle DRF (pickled-история в кэше)
+    и RedisUserRateThrottle (Lua-скрипт над sorted set) при лимите
+    100/minute. Работает с настроенным кэшем (Redis), БД не использует.
+
+    Пример: python manage.py bench_throttle --requests 20000 --users 50
+    """
+
+    help = "Бенчмарк throttling: DRF SimpleRateThrottle против Redis sliding window"
+
+    rate = "100/minute"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=10000, help="Всего запросов"
+        )
+        parser.add_argument(
+            "--users", type=int, default=100, help="Число разных пользователей"
+        )
+
+    def handle(self, *args, **options):
+        total = options["requests"]
+        users = options["users"]
+
+        self.stdout.write(
+            f"Лимит {self.rate}, {total} запросов от {users} пользователей "
+            f"(~{total // users} на пользователя)"
+        )
+        for name, base in (
+            ("DRF UserRateThrottle", UserRateThrottle),
+            ("RedisUserRateThrottle", RedisUserRateThrottle),
+        ):
+            throttle_class = type(
+                f"Bench{base.__name__}", (base,), {"scope": "bench", "rate": self.rate}
+            )
+            timings, allowed = self.run(throttle_class, total, users)
+            report_timings(self, name, timings, f", разрешено {allowed}/{len(timings)}")
+
+    def run(self, throttle_class, total, users):
+        """Прогоняет запросы через throttle и замеряет allow_request."""
+        requests = [
+            SimpleNamespace(
+                user=SimpleNamespace(is_authenticated=True, pk=f"bench-{i}"),
+                META={"REMOTE_ADDR": "127.0.0.1"},
+            )
+            for i in range(users)
+        ]
+        keys = [throttle_class().get_cache_key(request, None) for request in requests]
+        cache.delete_many(keys)
+
+        timings = []
+        allowed = 0
+        try:
+            for i in range(total):
+                throttle = throttle_class()
+                started = time.perf_counter()
+                allowed += throttle.allow_request(requests[i % users], None)
+                timings.append(time.perf_counter() - started)
+        finally:
+            cache.delete_many(keys)
+        return timings, allowed
@@ -0,0 +1,123 @@
+import multiprocessing
+import resource
+import statistics
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from resort.images import FORMATS, render_variants, variant_sizes
+
+# Корпус: имя файла -> (ширина, высота, формат Pillow, EXIF-ориентация)
+CORPUS = {
+    "photo_24mp.jpg": (6000, 4000, "JPEG", 1),
+    "portrait_12mp.jpg": (4000, 3000, "JPEG", 6),  # Телефон, повёрнутый на 90°
+    "screenshot_12mp.png": (4000, 3000, "PNG", 1),
+}
+
+
+def full_decode_variants(path, sizes):
+    """Прежний подход: полное декодирование оригинала, затем уменьшение."""
+    with Image.open(path) as image:
+        current = image.convert("RGB")
+        sizes = variant_sizes(image.size, sizes)
+        for size in sorted(sizes, reverse=True):
+            current.thumbnail((size, size), Image.Resampling.LANCZOS, None)
+            for fmt, quality in settings.TRIP_MEDIA_VARIANT_FORMATS.items():
+                current.save(BytesIO(), format=FORMATS[fmt][0], quality=quality)
+
+
+ENGINES = {
+    "Полное декодирование": full_decode_variants,
+    "render_variants": render_variants,
+}
+
+
+def rss_kb():
+    """Текущий RSS процесса в КБ (Linux)."""
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1])
+    return 0
+
+
+def measure(engine, path, sizes):
+    """
+    Выполняется в отдельном процессе: время и прирост пикового RSS (МБ)
+    над памятью, унаследованной от родителя.
+    """
+    baseline = rss_kb()
+    started = time.perf_counter()
+    ENGINES[engine](path, sizes)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # КБ на Linux
+    return elapsed, (peak - baseline) / 1024
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк построения вариантов фотографий на больших изображениях.
+
+    Корпус (JPEG 24 Мп, JPEG 12 Мп с EXIF-поворотом, PNG 12 Мп) генерируется
+    во временном каталоге. Каждый прогон выполняется в новом процессе, чтобы
+    пиковый RSS относился только к нему. Сравнивает полное декодирование
+    оригинала с render_variants (draft/reduce при декодировании).
+
+    Пример: python manage.py bench_thumbnails --repeat 3
+    Только миниатюры: python manage.py bench_thumbnails --sizes 300
+    """
+
+    help = "Бенчмарк вариантов фотографий: время и пиковая память на изображение"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat", type=int, default=3, help="Прогонов на изображение"
+        )
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            help="Размеры вариантов (по умолчанию TRIP_MEDIA_VARIANT_SIZES)",
+        )
+
+    def handle(self, *args, **options):
+        sizes = options["sizes"] or settings.TRIP_MEDIA_VARIANT_SIZES
+        with tempfile.TemporaryDirectory() as corpus_dir:
+            paths = self.make_corpus(Path(corpus_dir))
+            # Новый процесс на каждый прогон; fork - без повторной загрузки Django
+            context = multiprocessing.get_context("fork")
+            with context.Pool(1, maxtasksperchild=1) as pool:
+                for path in paths:
+                    for engine in ENGINES:
+                        results = [
+                            pool.apply(measure, (engine, path, sizes))
+                            for _ in range(options["repeat"])
+                        ]
+                        self.report(f"{path.name} / {engine}", results)
+
+    def make_corpus(self, directory):
+        """Генерирует изображения с шумом (плохо сжимаются, как фотографии)."""
+        paths = []
+        for name, (width, height, fmt, orientation) in CORPUS.items():
+            channels = [Image.effect_noise((width, height), 48) for _ in range(2)]
+            gradient = Image.linear_gradient("L").resize((width, height))
+            image = Image.merge("RGB", [channels[0], gradient, channels[1]])
+            exif = Image.Exif()
+            exif[0x0112] = orientation  # Orientation
+            path = directory / name
+            image.save(path, format=fmt, exif=exif.tobytes())
+            paths.append(path)
+        return paths
+
+    def report(self, name, results):
+        """Печатает среднее и медиану времени в мс и максимальный пиковый RSS."""
+        timings_ms = [elapsed * 1000 for elapsed, _ in results]
+        peak_mb = max(peak for _, peak in results)
+        self.stdout.write(
+            self.style.SUCCESS(name) + f": mean {statistics.mean(timings_ms):.0f} ms, "
+            f"p50 {statistics.median(timings_ms):.0f} ms, peak RSS +{peak_mb:.0f} MB"
+        )
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+from resort.api.tokens import RedisTokenBlacklist, get_token_blacklist
+
+
+class Command(BaseCommand):
+    """
+    Перенос чёрного списка refresh-токенов из таблиц token_blacklist в Redis.
+
+    Переносятся только ещё не истёкшие токены, каждый с TTL до своего exp.
+    С --purge после переноса таблицы очищаются: при хранилище в Redis
+    они больше не используются. Команду безопасно запускать повторно.
+
+    Пример: python manage.py migrate_token_blacklist --purge
+    """
+
+    help = "Переносит отозванные refresh-токены из БД в Redis"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--purge",
+            action="store_true",
+            help="Удалить записи token_blacklist из БД после переноса",
+        )
+
+    def handle(self, *args, **options):
+        store = get_token_blacklist()
+        if not isinstance(store, RedisTokenBlacklist):
+            raise CommandError(
+                "TOKEN_BLACKLIST_STORE должен указывать на RedisTokenBlacklist"
+            )
+
+        rows = BlacklistedToken.objects.filter(
+            token__expires_at__gt=timezone.now()
+        ).values_list("token__jti", "token__expires_at")
+
+        migrated = 0
+        for jti, expires_at in rows.iterator(chunk_size=2000):
+            store.add_jti(jti, expires_at.timestamp())
+            migrated += 1
+        self.stdout.write(f"Перенесено отозванных токенов: {migrated}")
+
+        if options["purge"]:
+            # BlacklistedToken удаляются каскадом
+            deleted, _ = OutstandingToken.objects.all().delete()
+            self.stdout.write(f"Удалено записей из БД: {deleted}")
+
+        self.stdout.write(self.style.SUCCESS("Готово"))
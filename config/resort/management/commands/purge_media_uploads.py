@@ -0,0 +1,49 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from resort.models import MediaUpload
+from resort.uploads import PARTIAL_DIR, discard_partial
+
+
+class Command(BaseCommand):
+    """
+    Удаление брошенных возобновляемых загрузок (resort/uploads.py):
+    загрузок, не получавших данных дольше TRIP_MEDIA_UPLOAD_EXPIRES,
+    вместе с принятыми байтами, и временных файлов без загрузки
+    (загрузка удалена вместе с поездкой).
+
+    Запускается по расписанию (cron).
+    Пример: python manage.py purge_media_uploads
+    """
+
+    help = "Удаляет брошенные загрузки фотографий частями и их временные файлы"
+
+    def handle(self, *args, **options):
+        expires = settings.TRIP_MEDIA_UPLOAD_EXPIRES
+        stale = list(MediaUpload.objects.stale(expires))
+        for upload in stale:
+            discard_partial(upload)
+        MediaUpload.objects.filter(pk__in=[upload.pk for upload in stale]).delete()
+
+        orphaned = 0
+        directory = default_storage.path(PARTIAL_DIR)
+        if os.path.isdir(directory):
+            known = {
+                f"{pk}.part" for pk in MediaUpload.objects.values_list("pk", flat=True)
+            }
+            cutoff = time.time() - expires.total_seconds()
+            for entry in os.scandir(directory):
+                if entry.name not in known and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    orphaned += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Удалено загрузок: {len(stale)}, временных файлов без загрузки: "
+                f"{orphaned}"
+            )
+        )
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from resort.models import Resort, Trip
+from resort.snapshot import invalidate_trip_counters
+
+
+class Command(BaseCommand):
+    """
+    Сверка денормализованных счётчиков Resort.trips_count / public_trips_count
+    с фактическим количеством поездок.
+
+    Расхождения возможны после операций в обход сигналов
+    (QuerySet.update, bulk_create, ручные правки в БД).
+
+    Пример: python manage.py reconcile_trip_counters --dry-run
+    """
+
+    help = "Пересчитывает счётчики поездок курортов и исправляет расхождения"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать расхождения, ничего не изменять",
+        )
+
+    def handle(self, *args, **options):
+        resorts = Resort.objects.annotate(
+            actual_total=Count("trips"),
+            actual_public=Count("trips", filter=Q(trips__is_public=True)),
+        ).order_by("id")
+
+        drifted_ids = []
+        for resort in resorts:
+            if (resort.trips_count, resort.public_trips_count) == (
+                resort.actual_total,
+                resort.actual_public,
+            ):
+                continue
+            drifted_ids.append(resort.id)
+            self.stdout.write(
+                f"{resort.name}: trips_count {resort.trips_count} -> "
+                f"{resort.actual_total}, public_trips_count "
+                f"{resort.public_trips_count} -> {resort.actual_public}"
+            )
+
+        if not drifted_ids:
+            self.stdout.write(self.style.SUCCESS("Расхождений нет"))
+            return
+
+        if options["dry_run"]:
+            self.stdout.write(f"Найдено расхождений: {len(drifted_ids)} (dry run)")
+            return
+
+        # Один UPDATE с подзапросами: значения считаются в момент записи,
+        # поэтому параллельные F()-инкременты не теряются между чтением и записью
+        trips = Trip.objects.filter(resort=OuterRef("pk")).order_by().values("resort")
+        Resort.objects.filter(pk__in=drifted_ids).update(
+            trips_count=Coalesce(
+                Subquery(trips.annotate(c=Count("id")).values("c")), Value(0)
+            ),
+            public_trips_count=Coalesce(
+                Subquery(
+                    trips.filter(is_public=True).annotate(c=Count("id")).values("c")
+                ),
+                Value(0),
+            ),
+        )
+        # UPDATE в обход сигналов: кэш счётчиков сбрасываем сами
+        invalidate_trip_counters()
+        self.stdout.write(
+            self.style.SUCCESS(f"Исправлено курортов: {len(drifted_ids)}")
+        )
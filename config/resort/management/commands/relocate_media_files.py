@@ -0,0 +1,145 @@
+import os
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q
+
+from resort.models import MediaBlob, TripMedia, TripMediaVariant
+from resort.storage import sharded_regex
+
+# Модель -> поля с файлами, раскладываемыми по хешу
+TARGETS = {
+    TripMedia: ["image", "thumbnail"],
+    TripMediaVariant: ["file"],
+}
+
+
+def unsharded(model, fields):
+    """Условие: хотя бы один файл записи ещё лежит по старому пути."""
+    condition = Q()
+    for name in fields:
+        upload_to = model._meta.get_field(name).upload_to
+        condition |= (
+            Q(**{f"{name}__isnull": False})
+            & ~Q(**{name: ""})
+            & ~Q(**{f"{name}__regex": sharded_regex(upload_to)})
+        )
+    return condition
+
+
+class Command(BaseCommand):
+    """
+    Перенос медиафайлов, загруженных до шардирования, в раскладку по хешу
+    содержимого (trip_photos/ab/cd/<хеш>.jpg, см. resort/storage.py).
+
+    Работает без остановки сайта. Записи обрабатываются пачками по
+    возрастанию id: файлы пачки копируются в новые пути, затем в одной
+    транзакции строки блокируются (SELECT ... FOR UPDATE) и пути
+    обновляются одним bulk_update - но только если файл за это время не
+    заменили и запись не удалили, иначе копия удаляется. Ссылки на старые
+    файлы убираются, и файлы удаляются после коммита (если на них больше
+    никто не ссылается): до этого момента их отдают прежние URL.
+    Прерванную команду достаточно запустить снова.
+
+    Пример: python manage.py relocate_media_files --batch-size 500
+    """
+
+    help = "Перенос файлов TripMedia и вариантов в раскладку по хешу содержимого"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=100, help="Записей в пачке"
+        )
+        parser.add_argument(
+            "--keep-old",
+            action="store_true",
+            help="Не удалять файлы по старым путям (например, для отката)",
+        )
+
+    def handle(self, *args, **options):
+        for model, fields in TARGETS.items():
+            moved = self.relocate(model, fields, options)
+            self.stdout.write(
+                self.style.SUCCESS(f"{model.__name__}: перенесено файлов: {moved}")
+            )
+
+    def relocate(self, model, fields, options):
+        pending = (
+            model.objects.using(DEFAULT_DB_ALIAS)
+            .filter(unsharded(model, fields))
+            .only("pk", *fields)
+            .order_by("pk")
+        )
+        moved = last_pk = 0
+        while batch := list(pending.filter(pk__gt=last_pk)[: options["batch_size"]]):
+            last_pk = batch[-1].pk
+            moved += self.relocate_batch(model, fields, batch, options["keep_old"])
+        return moved
+
+    def relocate_batch(self, model, fields, batch, keep_old):
+        """Переносит файлы пачки. Возвращает число перенесённых файлов."""
+        moves = self.copy_files(model, fields, batch)
+        if not moves:
+            return 0
+
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            stale, discarded = self.apply_moves(model, fields, batch, moves)
+            # Файлы без ссылок удаляются после коммита (MediaBlob.release)
+            MediaBlob.objects.release(discarded + ([] if keep_old else stale))
+        return len(stale)
+
+    def copy_files(self, model, fields, batch):
+        """
+        Копирует файлы по старым путям в пути по хешу.
+        Возвращает {pk: {поле: (старое имя, новое имя)}}.
+        """
+        moves = {}
+        for obj in batch:
+            for name in fields:
+                file = getattr(obj, name)
+                if not file or re.match(sharded_regex(file.field.upload_to), file.name):
+                    continue
+                old_name = file.name
+                try:
+                    with file.storage.open(old_name, "rb") as content:
+                        # ShardedImageFieldFile.save сам выбирает путь по хешу
+                        file.save(os.path.basename(old_name), content, save=False)
+                except FileNotFoundError:
+                    self.stderr.write(f"{model.__name__} id={obj.pk}: нет {old_name}")
+                    continue
+                moves.setdefault(obj.pk, {})[name] = (old_name, file.name)
+        return moves
+
+    def apply_moves(self, model, fields, batch, moves):
+        """
+        Записывает новые пути в заблокированные строки. Возвращает старые
+        файлы (больше не нужны) и копии, которые не понадобились.
+        """
+        queryset = model.objects.using(DEFAULT_DB_ALIAS)
+        current = {
+            row[0]: dict(zip(fields, row[1:]))
+            for row in queryset.select_for_update()
+            .filter(pk__in=moves)
+            .values_list("pk", *fields)
+        }
+        stale, discarded, updated = [], [], []
+        for obj in batch:
+            if obj.pk not in moves:
+                continue
+            if obj.pk not in current:
+                # Запись удалили, пока шло копирование
+                discarded.extend(new for _, new in moves[obj.pk].values())
+                continue
+            for name in fields:
+                old_name, new_name = moves[obj.pk].get(name, (None, None))
+                if new_name and current[obj.pk][name] == old_name:
+                    stale.append(old_name)
+                    continue
+                if new_name:
+                    discarded.append(new_name)  # Файл заменили
+                # Остальные поля - как в заблокированной строке
+                setattr(obj, name, current[obj.pk][name])
+            updated.append(obj)
+        queryset.bulk_update(updated, fields)
+        return stale, discarded
@@ -0,0 +1,176 @@
+"""Отдача медиафайлов с проверкой доступа.
+
+Файл отдаётся, только если на него ссылается фотография, которую видит
+пользователь - по тем же правилам, что и TripMediaViewSet
+(TripMedia.objects.visible_to). Сами байты Django не передаёт: после
+проверки передача отдаётся фронтовому прокси заголовком X-Accel-Redirect
+(nginx) или X-Sendfile (Apache, lighttpd), и воркер gunicorn сразу
+освобождается. Прокси сам обрабатывает Range. Без прокси (разработка)
+файл отдаётся FileResponse, с поддержкой Range.
+
+Имена файлов, разложенных по хешу (resort/storage.py), определяются
+содержимым и никогда не меняют его: ETag - хеш из имени, кэшировать такой
+файл можно бессрочно (immutable). Всё, что отдаётся через проверку
+доступа, кэшируется только в браузере (private), в том числе фото
+публичных поездок: поездку могут сделать приватной, а общий кэш (CDN,
+прокси) продолжил бы отдавать её фото до истечения max-age.
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse,
+)
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework.exceptions import AuthenticationFailed
+
+from resort.api.authentication import CachedJWTAuthentication
+from resort.models import TripMedia
+from resort.storage import HASH_LENGTH
+
+# Неизменяемые файлы (имя - хеш содержимого) - на год, прочие - на час
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+MUTABLE_MAX_AGE = 60 * 60
+
+HASHED_NAME_RE = re.compile(rf"/(?P<digest>[0-9a-f]{{{HASH_LENGTH}}})\.\w+$")
+RANGE_RE = re.compile(r"^bytes=(?P<start>\d*)-(?P<end>\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """Запрошенный диапазон за пределами файла."""
+
+
+def media_user(request):
+    """
+    Пользователь запроса: по сессии (страницы сайта) или по JWT (клиенты
+    API загружают картинки с тем же заголовком Authorization).
+    """
+    if request.user.is_authenticated or "HTTP_AUTHORIZATION" not in request.META:
+        return request.user
+    try:
+        authenticated = CachedJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        authenticated = None
+    return authenticated[0] if authenticated else request.user
+
+
+def visible_media(user, name):
+    """Фотографии, которые видит user и которые ссылаются на файл name."""
+    return TripMedia.objects.visible_to(user).filter(
+        Q(image=name) | Q(thumbnail=name) | Q(variants__file=name)
+    )
+
+
+def parse_range(header, size):
+    """
+    (start, end) включительно для заголовка Range или None, если его нужно
+    игнорировать (нет заголовка, несколько диапазонов, другие единицы).
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None or not (match["start"] or match["end"]):
+        return None
+    if match["start"]:
+        start = int(match["start"])
+        end = min(int(match["end"]), size - 1) if match["end"] else size - 1
+    else:
+        # bytes=-N - последние N байт
+        start, end = max(size - int(match["end"]), 0), size - 1
+    if start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def read_range(file, start, length, chunk_size=FileResponse.block_size):
+    """Читает length байт файла с позиции start чанками."""
+    with file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(request, name, etag, content_type):
+    """Ответ без прокси: файл целиком или запрошенный диапазон."""
+    size = default_storage.size(name)
+    # If-Range: диапазон только для той же версии файла
+    if_range = request.META.get("HTTP_IF_RANGE")
+    header = request.META.get("HTTP_RANGE") if if_range in (None, etag) else None
+    try:
+        byte_range = parse_range(header, size)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        response = FileResponse(
+            default_storage.open(name, "rb"), content_type=content_type
+        )
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(default_storage.open(name, "rb"), start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def accel_response(name, content_type):
+    """Ответ без тела: файл отдаёт прокси (settings.MEDIA_SENDFILE)."""
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE == "nginx":
+        # internal-location nginx, отображённый на MEDIA_ROOT
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+    else:
+        response["X-Sendfile"] = default_storage.path(name)
+    return response
+
+
+def serve_media(request, path):
+    """Медиафайл path, если пользователь видит ссылающуюся на него фотографию."""
+    name = os.path.normpath(path)
+    if name.startswith(("..", "/")):
+        raise Http404
+    visible = visible_media(media_user(request), name).exists()
+    if not visible or not default_storage.exists(name):
+        raise Http404
+
+    hashed = HASHED_NAME_RE.search(name)
+    if hashed:
+        etag = f'"{hashed["digest"]}"'
+    else:
+        modified = default_storage.get_modified_time(name)
+        etag = f'"{int(modified.timestamp())}-{default_storage.size(name)}"'
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if settings.MEDIA_SENDFILE:
+            response = accel_response(name, content_type)
+        else:
+            response = file_response(request, name, etag, content_type)
+    response["ETag"] = etag
+
+    if hashed:
+        patch_cache_control(
+            response, private=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    else:
+        patch_cache_control(response, private=True, max_age=MUTABLE_MAX_AGE)
+    return response
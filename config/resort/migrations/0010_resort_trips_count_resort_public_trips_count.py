@@ -0,0 +1,42 @@
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_trip_counters(apps, schema_editor):
+    """Начальное заполнение счётчиков поездок для существующих курортов."""
+    Resort = apps.get_model("resort", "Resort")
+    resorts = list(
+        Resort.objects.annotate(
+            total=Count("trips"),
+            public=Count("trips", filter=Q(trips__is_public=True)),
+        )
+    )
+    for resort in resorts:
+        resort.trips_count = resort.total
+        resort.public_trips_count = resort.public
+    Resort.objects.bulk_update(resorts, ["trips_count", "public_trips_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resort", "0009_tripmedia_thumbnail"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="resort",
+            name="trips_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество поездок"
+            ),
+        ),
+        migrations.AddField(
+            model_name="resort",
+            name="public_trips_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество публичных поездок"
+            ),
+        ),
+        migrations.RunPython(fill_trip_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def fill_search_vectors(apps, schema_editor):
+    """Начальное заполнение tsvector для существующих курортов и поездок."""
+    Resort = apps.get_model("resort", "Resort")
+    Trip = apps.get_model("resort", "Trip")
+
+    Resort.objects.update(
+        search_vector=SearchVector("name", weight="A", config="russian")
+        + SearchVector("region", weight="B", config="russian")
+        + SearchVector("description", weight="C", config="russian")
+    )
+
+    resort = Resort.objects.filter(pk=OuterRef("resort_id"))
+    Trip.objects.update(
+        search_vector=SearchVector(
+            Subquery(resort.values("name")[:1]), weight="A", config="russian"
+        )
+        + SearchVector(
+            Subquery(resort.values("region")[:1]), weight="B", config="russian"
+        )
+        + SearchVector("comment", weight="C", config="russian")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resort", "0010_resort_trips_count_resort_public_trips_count"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="resort",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="trip",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="resort",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="resort_search_vector_gin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="trip",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="trip_search_vector_gin"
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.4 on 2026-10-17 23:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resort", "0012_resort_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TripMediaVariant",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("size", models.PositiveIntegerField(verbose_name="Размер")),
+                ("format", models.CharField(max_length=10, verbose_name="Формат")),
+                (
+                    "file",
+                    models.ImageField(
+                        upload_to="trip_photos/variants/", verbose_name="Файл"
+                    ),
+                ),
+                ("width", models.PositiveIntegerField(verbose_name="Ширина")),
+                ("height", models.PositiveIntegerField(verbose_name="Высота")),
+                (
+                    "media",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="variants",
+                        to="resort.tripmedia",
+                        verbose_name="Фотография",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Вариант фотографии",
+                "verbose_name_plural": "Варианты фотографий",
+                "ordering": ["media", "size", "format"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("media", "size", "format"), name="unique_media_variant"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.4 on 2026-10-18 00:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resort", "0013_tripmediavariant"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tripmedia",
+            name="variants_version",
+            field=models.CharField(
+                blank=True, default="", max_length=12, verbose_name="Версия вариантов"
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.4 on 2026-10-18 00:13
+
+import resort.storage
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resort", "0014_tripmedia_variants_version"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="tripmedia",
+            name="image",
+            field=resort.storage.ShardedImageField(
+                upload_to="trip_photos/", verbose_name="Фотография"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="tripmedia",
+            name="thumbnail",
+            field=resort.storage.ShardedImageField(
+                blank=True,
+                null=True,
+                upload_to="trip_photos/thumbnails/",
+                verbose_name="Миниатюра",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="tripmediavariant",
+            name="file",
+            field=resort.storage.ShardedImageField(
+                upload_to="trip_photos/variants/", verbose_name="Файл"
+            ),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.1.4 on 2026-10-18 00:19
+
+from collections import Counter
+
+from django.db import migrations, models
+
+# Модель -> поля с файлами, на которые считаются ссылки
+FILE_FIELDS = {
+    "TripMedia": ["image", "thumbnail"],
+    "TripMediaVariant": ["file"],
+}
+
+
+def fill_media_blobs(apps, schema_editor):
+    """Начальный подсчёт ссылок на уже загруженные файлы."""
+    MediaBlob = apps.get_model("resort", "MediaBlob")
+    references = Counter()
+    for model_name, fields in FILE_FIELDS.items():
+        model = apps.get_model("resort", model_name)
+        for name in fields:
+            names = model.objects.exclude(**{f"{name}__isnull": True}).exclude(
+                **{name: ""}
+            )
+            references.update(names.values_list(name, flat=True).iterator())
+    MediaBlob.objects.bulk_create(
+        (MediaBlob(name=name, ref_count=count) for name, count in references.items()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resort", "0015_sharded_media_paths"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MediaBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=100, unique=True, verbose_name="Путь"),
+                ),
+                (
+                    "ref_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Ссылок"),
+                ),
+            ],
+            options={
+                "verbose_name": "Файл фотографии",
+                "verbose_name_plural": "Файлы фотографий",
+            },
+        ),
+        migrations.RunPython(fill_media_blobs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-18 00:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resort", "0016_mediablob"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="tripmedia",
+            index=models.Index(fields=["image"], name="tripmedia_image_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="tripmedia",
+            index=models.Index(fields=["thumbnail"], name="tripmedia_thumbnail_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="tripmediavariant",
+            index=models.Index(fields=["file"], name="tripmediavariant_file_idx"),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.4 on 2026-10-18 00:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resort", "0017_media_file_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FileTombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, verbose_name="Путь")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Создано"),
+                ),
+            ],
+            options={
+                "verbose_name": "Удаляемый файл",
+                "verbose_name_plural": "Удаляемые файлы",
+            },
+        ),
+    ]
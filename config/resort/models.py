@@ -1,9 +1,39 @@
+import uuid
+from collections import Counter, defaultdict
+
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Upper
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
 from slugify import slugify as py_slugify
 
+from .dispatch import enqueue_on_commit
+from .storage import ShardedImageField, sharded_name
+
+# Конфигурация полнотекстового поиска PostgreSQL (стемминг для русского языка)
+SEARCH_CONFIG = "russian"
+
+
+class ResortQuerySet(models.QuerySet):
+    """QuerySet курортов."""
+
+    def update_search_vector(self):
+        """
+        Пересчитывает tsvector курортов одним UPDATE.
+        Вес: название (A) > регион (B) > описание (C).
+        """
+        return self.update(
+            search_vector=SearchVector("name", weight="A", config=SEARCH_CONFIG)
+            + SearchVector("region", weight="B", config=SEARCH_CONFIG)
+            + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+        )
+
 
 class Resort(models.Model):
     """Модель справочник, к которому привязаны поездки."""
@@ -13,6 +43,21 @@ class Resort(models.Model):
     description = models.TextField(blank=True, verbose_name="Описание")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
     slug = models.SlugField(max_length=150, unique=True, blank=True)
+    # Денормализованные счётчики, поддерживаются сигналами Trip
+    # (сверка: manage.py reconcile_trip_counters)
+    trips_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Количество поездок"
+    )
+    public_trips_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Количество публичных поездок"
+    )
+    # Полнотекстовый индекс, поддерживается сигналами (см. resort/signals.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ResortQuerySet.as_manager()
+
+    # Поля tsvector курорта; название и регион входят и в tsvector поездок
+    SEARCH_FIELDS = ("name", "region", "description")
 
     def __str__(self):
         return self.name
@@ -27,11 +72,90 @@ class Resort(models.Model):
             self.slug = py_slugify(self.name)
         super().save(*args, **kwargs)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает значения из БД, от которых зависят tsvector курорта и поездок."""
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if set(cls.SEARCH_FIELDS) <= loaded.keys():
+            instance._search_state = tuple(loaded[f] for f in cls.SEARCH_FIELDS)
+        return instance
+
+    @classmethod
+    def update_trip_counters(cls, resort_id, total=0, public=0):
+        """Атомарно изменяет счётчики поездок курорта через F()-выражения."""
+        if not total and not public:
+            return
+        cls.objects.filter(pk=resort_id).update(
+            trips_count=F("trips_count") + total,
+            public_trips_count=F("public_trips_count") + public,
+        )
+
     class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="resort_search_vector_gin"),
+            # Триграммные индексы (pg_trgm) по UPPER(...): именно это выражение
+            # Django строит для icontains, им же пользуется нечёткий поиск
+            GinIndex(
+                OpClass(Upper("name"), name="gin_trgm_ops"),
+                name="resort_name_upper_trgm",
+            ),
+            GinIndex(
+                OpClass(Upper("region"), name="gin_trgm_ops"),
+                name="resort_region_upper_trgm",
+            ),
+        ]
         verbose_name = "Курорт"
         verbose_name_plural = "Курорты"
 
 
+class TripQuerySet(models.QuerySet):
+    """QuerySet поездок с правилами видимости."""
+
+    def visible_ids(self, user):
+        """
+        ID поездок, которые видит пользователь: публичные + свои.
+
+        Вместо Q(is_public=True) | Q(user=user) строится UNION ALL двух
+        выборок, каждая из которых обслуживается своим индексом
+        (is_public и (user, is_public)), поэтому на большой таблице
+        PostgreSQL не уходит в последовательное сканирование.
+        """
+        base = self.order_by()
+        public_ids = base.filter(is_public=True).values("id")
+        if not user.is_authenticated:
+            return public_ids
+        own_ids = base.filter(user=user).values("id")
+        return public_ids.union(own_ids, all=True)
+
+    def visible_to(self, user):
+        """Поездки, которые видит пользователь (гость - только публичные)."""
+        if not user.is_authenticated:
+            return self.filter(is_public=True)
+        return self.filter(id__in=self.visible_ids(user))
+
+    def update_search_vector(self):
+        """
+        Пересчитывает tsvector поездок одним UPDATE.
+
+        Название и регион курорта денормализуются в вектор поездки
+        через подзапросы, чтобы поиск не требовал JOIN и ILIKE.
+        Вес: название курорта (A) > регион (B) > комментарий (C).
+        """
+        resort = Resort.objects.filter(pk=OuterRef("resort_id"))
+        return self.update(
+            search_vector=SearchVector(
+                Subquery(resort.values("name")[:1]), weight="A", config=SEARCH_CONFIG
+            )
+            + SearchVector(
+                Subquery(resort.values("region")[:1]),
+                weight="B",
+                config=SEARCH_CONFIG,
+            )
+            + SearchVector("comment", weight="C", config=SEARCH_CONFIG)
+        )
+
+
 class Trip(models.Model):
     """Модель поездка пользователя."""
 
@@ -51,10 +175,23 @@ class Trip(models.Model):
         default=False, verbose_name="Публичная поездка", db_index=True
     )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    # Полнотекстовый индекс, поддерживается сигналами (см. resort/signals.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = TripQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.user.username} - {self.resort.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает значения из БД, от которых зависят счётчики Resort."""
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if "resort_id" in loaded and "is_public" in loaded:
+            instance._counter_state = (loaded["resort_id"], loaded["is_public"])
+        return instance
+
     def clean(self):
         """Валидация: дата начала не может быть позже даты окончания."""
         if self.start_date > self.end_date:
@@ -67,6 +204,7 @@ class Trip(models.Model):
         indexes = [
             models.Index(fields=["user", "is_public"]),
             models.Index(fields=["-start_date"]),
+            GinIndex(fields=["search_vector"], name="trip_search_vector_gin"),
         ]
         verbose_name = "Поездку"
         verbose_name_plural = "Поездки"
@@ -76,22 +214,85 @@ class Trip(models.Model):
         return reverse("trip_detail", kwargs={"trip_id": self.id})
 
 
+class TripMediaQuerySet(models.QuerySet):
+    """QuerySet медиафайлов с правилами видимости поездок."""
+
+    def visible_to(self, user):
+        """Медиафайлы поездок, которые видит пользователь (см. TripQuerySet)."""
+        if not user.is_authenticated:
+            return self.filter(trip__is_public=True)
+        return self.filter(trip_id__in=Trip.objects.visible_ids(user))
+
+    def file_names(self):
+        """Файлы фотографий и их вариантов (повторяются, если общие)."""
+        media = self.using(DEFAULT_DB_ALIAS)
+        names = [
+            name
+            for pair in media.values_list("image", "thumbnail")
+            for name in pair
+            if name
+        ]
+        names += TripMediaVariant.objects.filter(media__in=media).file_names()
+        return names
+
+    def delete(self):
+        """
+        Удаление без сигналов на каждый объект: ссылки на файлы убираются
+        одним проходом, файлы удалит задача после коммита (FileTombstone).
+        """
+        with transaction.atomic():
+            MediaBlob.objects.release(self.file_names())
+            return super().delete()
+
+    def bulk_upload(self, trip, uploads):
+        """
+        Фотографии поездки из нескольких загруженных файлов. Ссылки на файлы
+        (MediaBlob) и строки TripMedia добавляются пачками, без post_save на
+        каждую фотографию: варианты всех фотографий строит одна задача
+        generate_media_variants_batch после коммита.
+        """
+        from resort.tasks import generate_media_variants_batch
+
+        field = self.model._meta.get_field("image")
+        photos, files = [], []
+        for upload in uploads:
+            photo = self.model(trip=trip)
+            name = field.generate_filename(photo, sharded_name(upload, upload.name))
+            photo.image = name
+            photos.append(photo)
+            files.append((name, upload))
+        with transaction.atomic():
+            MediaBlob.objects.acquire_many(field.storage, files)
+            photos = self.bulk_create(photos)
+            enqueue_on_commit(
+                generate_media_variants_batch, [photo.pk for photo in photos]
+            )
+        return photos
+
+
 class TripMedia(models.Model):
     """Модель для хранения медиафайлов, связанных с поездкой."""
 
     trip = models.ForeignKey(
         Trip, on_delete=models.CASCADE, related_name="media", verbose_name="Поездка"
     )
-    image = models.ImageField(
+    # Файлы раскладываются по хешу содержимого: trip_photos/ab/cd/<хеш>.jpg
+    image = ShardedImageField(
         upload_to="trip_photos/", verbose_name="Фотография"
     )  # Для работы с ImageField требуется Pillow
-    thumbnail = models.ImageField(
+    thumbnail = ShardedImageField(
         upload_to="trip_photos/thumbnails/",
         verbose_name="Миниатюра",
         blank=True,
         null=True,
     )
     uploaded_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата загрузки")
+    # Версия набора вариантов (resort.images.variants_version); пустая - не строились
+    variants_version = models.CharField(
+        max_length=12, blank=True, default="", verbose_name="Версия вариантов"
+    )
+
+    objects = TripMediaQuerySet.as_manager()
 
     def __str__(self):
         return f"Media for trip {self.trip.id}"
@@ -100,6 +301,314 @@ class TripMedia(models.Model):
         """Динамический URL для медиафайла."""
         return self.trip.get_absolute_url()
 
+    def delete(self, *args, **kwargs):
+        """Ссылки на файлы убираются так же, как в TripMediaQuerySet.delete."""
+        with transaction.atomic():
+            MediaBlob.objects.release(TripMedia.objects.filter(pk=self.pk).file_names())
+            return super().delete(*args, **kwargs)
+
+    @cached_property
+    def srcsets(self):
+        """
+        Атрибуты srcset по форматам: {"webp": "url 300w, url 1024w", ...}.
+        Варианты берутся из variants.all() - для списков их нужно prefetch'ить.
+        """
+        srcsets = {}
+        for variant in sorted(self.variants.all(), key=lambda v: v.width):
+            srcsets.setdefault(variant.format, []).append(
+                f"{variant.file.url} {variant.width}w"
+            )
+        return {fmt: ", ".join(candidates) for fmt, candidates in srcsets.items()}
+
+    @cached_property
+    def preview_url(self):
+        """Наименьший JPEG-вариант, старая миниатюра или оригинал."""
+        jpegs = [v for v in self.variants.all() if v.format == "jpeg"]
+        if jpegs:
+            return min(jpegs, key=lambda v: v.width).file.url
+        if self.thumbnail:
+            return self.thumbnail.url
+        return self.image.url
+
     class Meta:
+        # Поиск фотографии по файлу при отдаче медиа (resort/media.py)
+        indexes = [
+            models.Index(fields=["image"], name="tripmedia_image_idx"),
+            models.Index(fields=["thumbnail"], name="tripmedia_thumbnail_idx"),
+        ]
         verbose_name = "Фотографию поездки"
         verbose_name_plural = "Фотографии поездок"
+
+
+class TripMediaVariantQuerySet(models.QuerySet):
+    """QuerySet вариантов фотографий."""
+
+    def file_names(self):
+        return list(self.using(DEFAULT_DB_ALIAS).values_list("file", flat=True))
+
+    def delete(self):
+        """Удаление без сигналов на каждый объект (см. TripMediaQuerySet)."""
+        with transaction.atomic():
+            MediaBlob.objects.release(self.file_names())
+            return super().delete()
+
+
+class TripMediaVariant(models.Model):
+    """Уменьшенная копия фотографии в одном формате (см. resort/images.py)."""
+
+    media = models.ForeignKey(
+        TripMedia,
+        on_delete=models.CASCADE,
+        related_name="variants",
+        verbose_name="Фотография",
+    )
+    # Размер из settings.TRIP_MEDIA_VARIANT_SIZES: изображение вписано
+    # в квадрат size x size
+    size = models.PositiveIntegerField(verbose_name="Размер")
+    format = models.CharField(max_length=10, verbose_name="Формат")
+    file = ShardedImageField(upload_to="trip_photos/variants/", verbose_name="Файл")
+    width = models.PositiveIntegerField(verbose_name="Ширина")
+    height = models.PositiveIntegerField(verbose_name="Высота")
+
+    objects = TripMediaVariantQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.media} ({self.size}px, {self.format})"
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            MediaBlob.objects.release([self.file.name])
+            return super().delete(*args, **kwargs)
+
+    class Meta:
+        verbose_name = "Вариант фотографии"
+        verbose_name_plural = "Варианты фотографий"
+        ordering = ["media", "size", "format"]
+        indexes = [models.Index(fields=["file"], name="tripmediavariant_file_idx")]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["media", "size", "format"], name="unique_media_variant"
+            )
+        ]
+
+
+class MediaBlobManager(models.Manager):
+    """Подсчёт ссылок на файлы ShardedImageField (resort/storage.py)."""
+
+    def acquire(self, storage, name, content=None):
+        """
+        Добавляет ссылку на файл name. Файл записывается из content, только
+        если его ещё нет в хранилище: одинаковое содержимое хранится один раз.
+        Без content отсутствующий файл - FileNotFoundError.
+        """
+        return self.acquire_many(storage, [(name, content)])[0]
+
+    def acquire_many(self, storage, files):
+        """
+        acquire для нескольких файлов сразу: files - пары (имя, content или
+        None), повторы имени - несколько ссылок. Число запросов не зависит
+        от числа файлов. Возвращает имена в порядке files.
+        """
+        files = list(files)
+        references = Counter(name for name, _ in files)
+        contents = {
+            name: content for name, content in reversed(files) if content is not None
+        }
+        with transaction.atomic():
+            self.bulk_create(
+                [MediaBlob(name=name) for name in references], ignore_conflicts=True
+            )
+            # Блокировка строк: параллельная очистка (FileTombstone.purge)
+            # не удалит файлы, пока ссылки не добавлены
+            locked = set(
+                self.select_for_update()
+                .filter(name__in=references)
+                .values_list("name", flat=True)
+            )
+            # Строки, удалённые очисткой, пока ждали блокировку
+            self.bulk_create(
+                MediaBlob(name=name) for name in references if name not in locked
+            )
+            for name in references:
+                if not storage.exists(name):
+                    if name not in contents:
+                        raise FileNotFoundError(name)
+                    storage.save(name, contents[name])
+            by_count = defaultdict(list)
+            for name, count in references.items():
+                by_count[count].append(name)
+            for count, batch in by_count.items():
+                self.filter(name__in=batch).update(ref_count=F("ref_count") + count)
+        return [name for name, _ in files]
+
+    def release(self, names):
+        """
+        Убирает по ссылке на каждый файл из names (повторы - несколько
+        ссылок). Файлы без ссылок записываются в FileTombstone: их удалит
+        задача purge_file_tombstones после коммита, пачками.
+        """
+        references = Counter(name for name in names if name)
+        if not references:
+            return
+        # Сразу после записи: читаем с основной БД, не с реплики
+        blobs = self.using(DEFAULT_DB_ALIAS)
+        by_count = defaultdict(list)
+        for name, count in references.items():
+            by_count[count].append(name)
+        for count, batch in by_count.items():
+            blobs.filter(name__in=batch, ref_count__gte=count).update(
+                ref_count=F("ref_count") - count
+            )
+
+        tracked = dict(
+            blobs.filter(name__in=references).values_list("name", "ref_count")
+        )
+        # Файлы без MediaBlob (записаны в обход ShardedImageField, например
+        # фикстурами) ссылок не считают и удаляются так же
+        orphaned = [name for name in references if tracked.get(name, 0) == 0]
+        FileTombstone.objects.bury(orphaned)
+
+
+class MediaBlob(models.Model):
+    """
+    Файл в хранилище по хешу содержимого и число ссылок на него из
+    TripMedia.image/thumbnail и TripMediaVariant.file. Одна и та же
+    фотография, загруженная в несколько поездок, хранится одним файлом.
+    """
+
+    name = models.CharField(max_length=100, unique=True, verbose_name="Путь")
+    ref_count = models.PositiveIntegerField(default=0, verbose_name="Ссылок")
+
+    objects = MediaBlobManager()
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+    class Meta:
+        verbose_name = "Файл фотографии"
+        verbose_name_plural = "Файлы фотографий"
+
+
+class FileTombstoneManager(models.Manager):
+    """Отложенное удаление файлов (см. MediaBlobManager.release)."""
+
+    def bury(self, names):
+        """
+        Надгробия для файлов names; файлы удалит purge_file_tombstones после
+        коммита, если на них так и не появится ссылок в MediaBlob.
+        """
+        from resort.tasks import purge_file_tombstones
+
+        if names:
+            self.bulk_create(FileTombstone(name=name) for name in names)
+            enqueue_on_commit(purge_file_tombstones)
+
+    def purge(self, storage, batch_size=500):
+        """
+        Удаляет файлы из надгробий пачками по batch_size. Файлы, на которые
+        снова сослались (та же фотография загружена повторно), остаются.
+        Возвращает число удалённых файлов.
+        """
+        deleted = 0
+        while True:
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                # skip_locked: параллельные задачи разбирают разные пачки
+                tombstones = list(
+                    self.using(DEFAULT_DB_ALIAS)
+                    .select_for_update(skip_locked=True)
+                    .order_by("pk")[:batch_size]
+                )
+                if not tombstones:
+                    return deleted
+                names = {tombstone.name for tombstone in tombstones}
+                # Блокировка строк MediaBlob: acquire() ждёт конца очистки
+                blobs = dict(
+                    MediaBlob.objects.using(DEFAULT_DB_ALIAS)
+                    .select_for_update()
+                    .filter(name__in=names)
+                    .values_list("name", "ref_count")
+                )
+                unused = [name for name in names if blobs.get(name, 0) == 0]
+                for name in unused:
+                    storage.delete(name)
+                MediaBlob.objects.using(DEFAULT_DB_ALIAS).filter(
+                    name__in=unused, ref_count=0
+                ).delete()
+                self.using(DEFAULT_DB_ALIAS).filter(
+                    pk__in=[tombstone.pk for tombstone in tombstones]
+                ).delete()
+                deleted += len(unused)
+
+
+class FileTombstone(models.Model):
+    """
+    Файл, на который не осталось ссылок. Удаление записей в запросе
+    только добавляет надгробия в той же транзакции, сами файлы удаляет
+    задача Celery после коммита (purge_file_tombstones).
+    """
+
+    name = models.CharField(max_length=100, verbose_name="Путь")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создано")
+
+    objects = FileTombstoneManager()
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "Удаляемый файл"
+        verbose_name_plural = "Удаляемые файлы"
+
+
+class MediaUploadQuerySet(models.QuerySet):
+    """QuerySet возобновляемых загрузок."""
+
+    def stale(self, age):
+        """Загрузки, не получавшие данных дольше age (timedelta)."""
+        return self.filter(updated_at__lt=timezone.now() - age)
+
+
+class MediaUpload(models.Model):
+    """
+    Возобновляемая загрузка фотографии частями (resort/uploads.py).
+    Принятые байты дописываются во временный файл, offset - сколько
+    принято. Когда приняты все size байт, файл становится TripMedia.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="media_uploads",
+        verbose_name="Пользователь",
+    )
+    trip = models.ForeignKey(
+        Trip, on_delete=models.CASCADE, related_name="uploads", verbose_name="Поездка"
+    )
+    filename = models.CharField(max_length=255, verbose_name="Имя файла")
+    size = models.PositiveBigIntegerField(verbose_name="Размер")
+    offset = models.PositiveBigIntegerField(default=0, verbose_name="Принято байт")
+    # Фотография, собранная из загрузки; пусто - загрузка не завершена
+    media = models.ForeignKey(
+        TripMedia,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Фотография",
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создано")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
+
+    objects = MediaUploadQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+    @property
+    def is_complete(self):
+        return self.offset == self.size
+
+    class Meta:
+        verbose_name = "Загрузка фотографии"
+        verbose_name_plural = "Загрузки фотографий"
@@ -1,16 +1,20 @@
-from django.core.cache import cache
-from django.db.models.signals import post_delete, post_save
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_migrate
 from django.dispatch import receiver
 
-from .cache_keys import CacheKeys
-from .models import TripMedia, Resort, Trip
-from .tasks import generate_thumbnail
+from .api.authentication import AUTH_USER_FIELDS, invalidate_auth_user
+from .dispatch import enqueue_on_commit
+from .models import MediaBlob, TripMedia, Resort, Trip
+from .snapshot import invalidate_trip_counters, resort_catalog
+from .tasks import generate_media_variants
 
 
 @receiver(post_save, sender=TripMedia)
 def create_thumbnail_on_upload(sender, instance, created, **kwargs):
     """
-    Автоматически создаёт миниатюру при загрузке нового изображения.
+    Автоматически создаёт варианты (миниатюры разных размеров и форматов)
+    при загрузке нового изображения.
 
     Args:
         sender: модель TripMedia
@@ -20,31 +24,159 @@ def create_thumbnail_on_upload(sender, instance, created, **kwargs):
     """
     # Запускаем задачу только для новых объектов и если у них есть изображение
     if created and instance.image:
-        # Запускаем задачу асинхронно через Celery
-        generate_thumbnail.delay(instance.id)
+        # Отправляем задачу в Celery после коммита: иначе воркер может
+        # не найти ещё не закоммиченный объект
+        enqueue_on_commit(generate_media_variants, instance.id)
         print(
-            f"📤 Задача генерации thumbnail отправлена в Celery "
+            f"📤 Задача генерации вариантов будет отправлена в Celery "
             f"для media_id={instance.id}"
         )
 
 
-@receiver(post_delete, sender=TripMedia)
-def delete_trip_media_file(sender, instance, **kwargs):
-    """Удаление файла изображения из файловой системы при удалении объекта TripMedia."""
-    if instance.image:
-        instance.image.delete(save=False)
+def deleted_with_user(origin):
+    """Удаление начато с пользователя (объекта или QuerySet'а пользователей)."""
+    user_model = get_user_model()
+    return (
+        isinstance(origin, user_model) or getattr(origin, "model", None) is user_model
+    )
 
-    if instance.thumbnail:
-        instance.thumbnail.delete(save=False)
+
+@receiver(pre_delete, sender=get_user_model())
+def release_user_media_files(sender, instance, **kwargs):
+    """
+    Ссылки на файлы фотографий всех поездок удаляемого пользователя
+    убираются одним проходом, а не отдельно по каждой поездке.
+    """
+    MediaBlob.objects.release(
+        TripMedia.objects.filter(trip__user=instance).file_names()
+    )
+
+
+@receiver(pre_delete, sender=Trip)
+def release_trip_media_files(sender, instance, origin=None, **kwargs):
+    """
+    Ссылки на файлы фотографий удаляемой поездки убираются одним проходом:
+    сами фотографии и варианты удаляются без сигналов на каждый объект,
+    файлы - задачей после коммита. При каскаде от пользователя ссылки уже
+    убрал release_user_media_files.
+    """
+    if deleted_with_user(origin):
+        return
+    MediaBlob.objects.release(TripMedia.objects.filter(trip=instance).file_names())
 
 
 @receiver([post_save, post_delete], sender=Resort)
 def clear_resort_cache(sender, **kwargs):
-    """Очистка кэша при сохранении или удалении объекта Resort."""
-    cache.delete(CacheKeys.RESORT_LIST)
+    """Сброс снимка курортов во всех процессах при сохранении или удалении Resort."""
+    resort_catalog.invalidate()
 
 
-@receiver([post_save, post_delete], sender=Trip)
-def clear_trip_cache(sender, instance, **kwargs):
-    """Очистка кэша при сохранении или удалении объекта Trip."""
-    cache.delete(CacheKeys.resort_trips_counts(instance.resort_id))
+@receiver(post_save, sender=Resort)
+def update_resort_search_vector(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    """
+    Обновление полнотекстового индекса курорта и его поездок
+    (название и регион курорта входят в tsvector поездки).
+    Поездки пересчитываются, только если изменились название или регион.
+    """
+    if update_fields is not None and not set(Resort.SEARCH_FIELDS) & set(update_fields):
+        return
+    new_state = tuple(getattr(instance, f) for f in Resort.SEARCH_FIELDS)
+    # Состояние из БД запоминается в Resort.from_db; без него сравнить не с чем
+    old_state = None if created else getattr(instance, "_search_state", None)
+    instance._search_state = new_state
+    if old_state == new_state:
+        return
+
+    Resort.objects.filter(pk=instance.pk).update_search_vector()
+    # У нового курорта поездок нет
+    if not created and (old_state is None or old_state[:2] != new_state[:2]):
+        Trip.objects.filter(resort_id=instance.pk).update_search_vector()
+
+
+@receiver(post_save, sender=Trip)
+def update_trip_search_vector(sender, instance, update_fields=None, **kwargs):
+    """Обновление полнотекстового индекса поездки при сохранении."""
+    # Вектор зависит только от комментария и курорта
+    search_fields = {"comment", "resort", "resort_id"}
+    if update_fields is not None and not search_fields & set(update_fields):
+        return
+    Trip.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(post_save, sender=Trip)
+def update_resort_counters_on_save(sender, instance, created, **kwargs):
+    """
+    Инкрементальное обновление счётчиков поездок курорта при сохранении Trip.
+    Учитывает создание, смену публичности и перенос поездки на другой курорт.
+    """
+    new_state = (instance.resort_id, instance.is_public)
+
+    if created:
+        Resort.update_trip_counters(
+            instance.resort_id, total=1, public=int(instance.is_public)
+        )
+        invalidate_trip_counters()
+    else:
+        # Состояние из БД запоминается в Trip.from_db; без него сравнить не с чем
+        old_state = getattr(instance, "_counter_state", None)
+        if old_state is not None and old_state != new_state:
+            old_resort_id, old_is_public = old_state
+            Resort.update_trip_counters(
+                old_resort_id, total=-1, public=-int(old_is_public)
+            )
+            Resort.update_trip_counters(
+                instance.resort_id, total=1, public=int(instance.is_public)
+            )
+            invalidate_trip_counters()
+
+    instance._counter_state = new_state
+
+
+@receiver(post_delete, sender=Trip)
+def update_resort_counters_on_delete(sender, instance, **kwargs):
+    """Уменьшение счётчиков поездок курорта при удалении Trip."""
+    resort_id, is_public = getattr(
+        instance, "_counter_state", (instance.resort_id, instance.is_public)
+    )
+    Resort.update_trip_counters(resort_id, total=-1, public=-int(is_public))
+    invalidate_trip_counters()
+
+
+@receiver(post_save, sender=get_user_model())
+def clear_auth_user_cache(sender, instance, update_fields=None, **kwargs):
+    """
+    Сброс пользователя в кэше JWT-аутентификации при изменении пароля,
+    активности или флагов is_staff/is_superuser (кэшируемые поля -
+    AUTH_USER_FIELDS). Обновление last_login при входе кэш не трогает.
+
+    Сброс - после коммита: иначе параллельный запрос успеет закэшировать
+    пользователя из ещё не изменённой строки.
+    """
+    if update_fields is not None and not AUTH_USER_FIELDS & set(update_fields):
+        return
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_auth_user(user_id))
+
+
+@receiver(post_delete, sender=get_user_model())
+def clear_auth_user_cache_on_delete(sender, instance, **kwargs):
+    """Удалённый пользователь не должен аутентифицироваться из кэша."""
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_auth_user(user_id))
+
+
+@receiver(pre_migrate)
+def create_postgres_extensions(sender, app_config, using, **kwargs):
+    """
+    Создание расширения pg_trgm до создания таблиц приложения resort.
+
+    В миграциях за это отвечает TrigramExtension, но тестовая БД создаётся
+    с --nomigrations (syncdb), где триграммные индексы иначе не создадутся.
+    """
+    connection = connections[using]
+    if app_config.label != "resort" or connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
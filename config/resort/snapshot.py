@@ -0,0 +1,204 @@
+"""Снимок справочника курортов в памяти процесса.
+
+Курортов несколько десятков, меняются они редко, а читаются на каждой
+странице и в каждой поездке API. Поэтому каждый процесс держит у себя
+неизменяемый снимок: курорты по id и slug и уже сериализованные
+ResortSerializer словари.
+
+Актуальность снимка определяет счётчик версии в Redis
+(CacheKeys.RESORT_SNAPSHOT_VERSION). Его увеличивает только сигнал
+clear_resort_cache - изменение самих курортов. Процесс сверяет версию
+не чаще раза в CacheTimeouts.RESORT_SNAPSHOT_CHECK секунд, так что
+в установившемся режиме чтение курортов не требует ни БД, ни Redis.
+
+Курорты новой версии загружаются через get_or_compute (cache_utils.py):
+из БД их читает один процесс, остальные берут результат из Redis,
+а пока он считается - продолжают работать со своим старым снимком.
+
+Счётчики поездок (trips_count, public_trips_count) меняются с каждой
+поездкой, поэтому в снимок не входят: иначе создание поездки сбрасывало
+бы снимок во всех процессах. Они хранятся в Redis отдельным ключом
+(trip_counters) и добавляются к словарям снимка при ответе
+(with_trip_counters).
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+
+from .cache_keys import CacheKeys, CacheTimeouts
+from .cache_utils import get_or_compute
+from .models import Resort
+
+# Поля ResortSerializer, которые не хранятся в снимке
+TRIP_COUNTER_FIELDS = ("trips_count", "public_trips_count")
+NO_TRIP_COUNTERS = MappingProxyType(dict.fromkeys(TRIP_COUNTER_FIELDS, 0))
+
+
+@dataclass(frozen=True)
+class ResortSnapshot:
+    """
+    Неизменяемый снимок курортов.
+
+    Объекты Resort и словари общие для всех запросов процесса:
+    их можно только читать. Счётчики поездок в словарях отсутствуют,
+    а в объектах Resort устаревают - их берут из trip_counters().
+    """
+
+    version: int
+    expires_at: float  # После этого времени курорты перечитываются
+    resorts: tuple  # Resort, отсортированные по названию
+    by_id: MappingProxyType
+    by_slug: MappingProxyType
+    serialized: tuple  # Словари ResortSerializer в том же порядке
+    serialized_by_id: MappingProxyType
+
+    @classmethod
+    def build(cls, version, resorts, expires_at):
+        """Индексы и сериализация загруженных курортов."""
+        # Ленивый импорт: serializers зависят от моделей, а не наоборот
+        from .api.serializers import ResortSerializer
+
+        serialized = tuple(
+            {
+                field: value
+                for field, value in data.items()
+                if field not in TRIP_COUNTER_FIELDS
+            }
+            for data in ResortSerializer(resorts, many=True).data
+        )
+        return cls(
+            version=version,
+            expires_at=expires_at,
+            resorts=resorts,
+            by_id=MappingProxyType({resort.pk: resort for resort in resorts}),
+            by_slug=MappingProxyType({resort.slug: resort for resort in resorts}),
+            serialized=serialized,
+            serialized_by_id=MappingProxyType(
+                {resort.pk: data for resort, data in zip(resorts, serialized)}
+            ),
+        )
+
+
+def load_resorts():
+    """
+    Все курорты одним запросом в порядке снимка. Читаются из основной БД:
+    снимок с отстающей реплики разошёлся бы по процессам на весь срок жизни.
+    """
+    return tuple(Resort.objects.using(DEFAULT_DB_ALIAS).order_by("name", "id"))
+
+
+def load_trip_counters():
+    """Счётчики поездок всех курортов одним запросом (из основной БД)."""
+    rows = Resort.objects.using(DEFAULT_DB_ALIAS).values_list(
+        "pk", *TRIP_COUNTER_FIELDS
+    )
+    return {pk: dict(zip(TRIP_COUNTER_FIELDS, counters)) for pk, *counters in rows}
+
+
+def trip_counters():
+    """{resort_id: {"trips_count": ..., "public_trips_count": ...}} из Redis."""
+    return get_or_compute(
+        CacheKeys.RESORT_TRIP_COUNTERS,
+        load_trip_counters,
+        CacheTimeouts.RESORT_TRIP_COUNTERS,
+    ).value
+
+
+def invalidate_trip_counters():
+    """Сброс счётчиков поездок после коммита; снимок курортов не трогается."""
+    transaction.on_commit(lambda: cache.delete(CacheKeys.RESORT_TRIP_COUNTERS))
+
+
+def with_trip_counters(data, counters):
+    """Словарь курорта из снимка вместе со счётчиками поездок из counters."""
+    return {**data, **counters.get(data["id"], NO_TRIP_COUNTERS)}
+
+
+class ResortCatalog:
+    """Доступ к снимку курортов текущего процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked_at = 0.0
+        # Снимок собран внутри транзакции и может содержать незакоммиченные данные
+        self._built_in_transaction = False
+
+    def get(self):
+        """Актуальный снимок; версия в Redis сверяется не чаще раза в интервал."""
+        snapshot = self._snapshot
+        if snapshot is not None and not self._is_expired():
+            return snapshot
+
+        with self._lock:
+            # Пока ждали блокировку, снимок мог обновить другой поток
+            if self._snapshot is not None and not self._is_expired():
+                return self._snapshot
+
+            version = cache.get(CacheKeys.RESORT_SNAPSHOT_VERSION, 0)
+            snapshot = self._snapshot
+            if (
+                snapshot is None
+                or snapshot.version != version
+                or snapshot.expires_at <= time.time()
+                or self._built_in_transaction
+            ):
+                self._snapshot = self._load(version) or snapshot
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def _load(self, version):
+        """
+        Новый снимок версии version или None, если его пока считает
+        другой процесс, а у этого есть старый снимок, с которым можно работать.
+        """
+        if connection.in_atomic_block:
+            # Внутри транзакции данные могут быть незакоммиченными:
+            # читаем их сами и в общий кэш не кладём
+            self._built_in_transaction = True
+            expires_at = time.time() + CacheTimeouts.RESORT_SNAPSHOT.ttl
+            return ResortSnapshot.build(version, load_resorts(), expires_at)
+
+        has_stale = self._snapshot is not None and not self._built_in_transaction
+        entry = get_or_compute(
+            CacheKeys.resort_snapshot(version),
+            load_resorts,
+            CacheTimeouts.RESORT_SNAPSHOT,
+            wait=not has_stale,
+        )
+        if entry is None:
+            return None
+        self._built_in_transaction = False
+        return ResortSnapshot.build(version, entry.value, entry.expires_at)
+
+    def invalidate(self):
+        """
+        Сброс снимка: в текущем процессе сразу, в остальных - через новую
+        версию в Redis после коммита транзакции (иначе другой процесс
+        успеет собрать снимок из старых данных под новой версией).
+        """
+        self.clear()
+        transaction.on_commit(self._bump_version)
+
+    def clear(self):
+        """Забыть снимок текущего процесса."""
+        self._snapshot = None
+
+    def _bump_version(self):
+        cache.add(CacheKeys.RESORT_SNAPSHOT_VERSION, 0, timeout=None)
+        cache.incr(CacheKeys.RESORT_SNAPSHOT_VERSION)
+        self.clear()
+
+    def _is_expired(self):
+        if self._built_in_transaction and not connection.in_atomic_block:
+            return True
+        elapsed = time.monotonic() - self._checked_at
+        return elapsed >= CacheTimeouts.RESORT_SNAPSHOT_CHECK
+
+
+resort_catalog = ResortCatalog()
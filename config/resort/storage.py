@@ -0,0 +1,125 @@
+"""Раскладка медиафайлов по хешу содержимого.
+
+Файл сохраняется как <upload_to>/ab/cd/<хеш>.<расширение>, где ab и cd -
+первые символы SHA-256 содержимого. Так в каждом каталоге остаются сотни
+файлов, а не сотни тысяч: поиск файла, листинг, бэкапы и rsync не
+деградируют с ростом числа фотографий. Файлы, загруженные до шардирования,
+переносятся командой relocate_media_files.
+
+Одинаковое содержимое получает один путь и хранится один раз: ссылки на
+файл считаются в MediaBlob. Файл без ссылок попадает в FileTombstone и
+удаляется задачей Celery после коммита.
+Загрузки хешируются обработчиками ниже прямо при приёме, без повторного
+чтения файла.
+"""
+
+import hashlib
+import os
+import re
+
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+from django.db.models.fields.files import ImageField, ImageFieldFile
+
+# Символов SHA-256 в имени файла (128 бит) - коллизии исключены,
+# а путь укладывается в max_length=100 поля
+HASH_LENGTH = 32
+
+
+def content_hash(content):
+    """
+    SHA-256 содержимого файла (django.core.files.File) в hex. Для загрузок
+    берётся хеш, посчитанный при приёме (HashingUploadHandlerMixin).
+    """
+    digest = getattr(content, "sha256", None)
+    if digest is not None:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    content.seek(0)
+    return hasher.hexdigest()
+
+
+def sharded_name(content, filename):
+    """Относительный путь ab/cd/<хеш>.<расширение> для файла content."""
+    digest = content_hash(content)[:HASH_LENGTH]
+    extension = os.path.splitext(filename)[1].lower()
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def sharded_regex(upload_to):
+    """Регулярное выражение для путей, уже разложенных по хешу в upload_to."""
+    return rf"^{re.escape(upload_to)}[0-9a-f]{{2}}/[0-9a-f]{{2}}/"
+
+
+class ShardedImageFieldFile(ImageFieldFile):
+    """
+    Файл поля ShardedImageField: имя при сохранении заменяется хешем,
+    сохранение и удаление добавляют и убирают ссылку в MediaBlob.
+    """
+
+    def save(self, name, content, save=True):
+        from resort.models import MediaBlob
+
+        name = self.field.generate_filename(self.instance, sharded_name(content, name))
+        self.name = MediaBlob.objects.acquire(self.storage, name, content)
+        setattr(self.instance, self.field.attname, self.name)
+        self._committed = True
+        if save:
+            self.instance.save()
+
+    def delete(self, save=True):
+        from resort.models import MediaBlob
+
+        if not self:
+            return
+        if hasattr(self, "_file"):
+            self.close()
+            del self.file
+        # Файл удалится, только если на него больше никто не ссылается
+        MediaBlob.objects.release([self.name])
+        self.name = None
+        setattr(self.instance, self.field.attname, self.name)
+        self._committed = False
+        if save:
+            self.instance.save()
+
+
+class ShardedImageField(ImageField):
+    """ImageField, раскладывающий файлы по хешу содержимого внутри upload_to."""
+
+    attr_class = ShardedImageFieldFile
+
+
+class HashingUploadHandlerMixin:
+    """Считает SHA-256 загружаемого файла по мере приёма чанков."""
+
+    def new_file(self, *args, **kwargs):
+        # До super(): MemoryFileUploadHandler прерывает цепочку исключением
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.hasher.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(
+    HashingUploadHandlerMixin, MemoryFileUploadHandler
+):
+    """Небольшие загрузки: в памяти, с хешем."""
+
+
+class HashingTemporaryFileUploadHandler(
+    HashingUploadHandlerMixin, TemporaryFileUploadHandler
+):
+    """Крупные загрузки: во временный файл на диске, с хешем."""
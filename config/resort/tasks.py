@@ -1,60 +1,99 @@
-import os
 from celery import shared_task
-from PIL import Image
-from django.core.files.base import ContentFile
-from io import BytesIO
 
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
-def generate_thumbnail(self, media_id):
+def generate_media_variants(self, media_id):
     """
-    Генерация миниатюры (thumbnail) для загруженного изображения.
+    Генерация вариантов фотографии (размеры и форматы из настроек,
+    см. resort/images.py).
 
     Args:
         media_id: ID объекта TripMedia
     """
     # Импортируем модель внутри функции, т.к. Celery загружается до Django
+    from resort.events import publish_on_commit
+    from resort.images import ImageTooLarge, generate_variants, variants_version
     from resort.models import TripMedia
 
     try:
-        # Получаем объект медиафайла
         media = TripMedia.objects.get(id=media_id)
+    except TripMedia.DoesNotExist:
+        print(f"❌ TripMedia с id={media_id} не найден")
+        return f"Error: TripMedia {media_id} not found"
+
+    # Если варианты текущей версии уже созданы, пропускаем
+    if media.variants_version == variants_version():
+        print(f"⚠️ Варианты уже существуют для media_id={media_id}")
+        return f"Variants already exist for media_id={media_id}"
+
+    try:
+        variants = generate_variants(media)
+    except ImageTooLarge as exc:
+        # Повтор не поможет: изображение не влезает в бюджет памяти
+        print(f"❌ Изображение media_id={media_id} слишком большое: {exc}")
+        return f"Error: image too large for media_id={media_id}"
+    except Exception as exc:
+        raise self.retry(exc=exc)
 
-        # Если миниатюра уже существует, пропускаем
-        if media.thumbnail:
-            print(f"⚠️ Thumbnail уже существует для media_id={media_id}")
-            return f"Thumbnail already exists for media_id={media_id}"
+    # Страница поездки и клиенты API узнают о вариантах без опроса
+    publish_on_commit([media])
+    print(f"✅ Варианты созданы для media_id={media_id}: {len(variants)}")
+    return f"Variants created: {len(variants)}"
 
-        # Открываем исходное изображение
-        image_path = media.image.path
-        img = Image.open(image_path)
 
-        # Конвертируем в RGB, если изображение в RGBA (PNG с прозрачностью)
-        if img.mode in ("RGBA", "LA", "P"):
-            img = img.convert("RGB")
+@shared_task
+def generate_media_variants_batch(media_ids):
+    """
+    Пачка фотографий для backfill_media_variants --celery и пакетной
+    загрузки (TripMediaQuerySet.bulk_upload): варианты записываются в БД
+    одним bulk_create, одинаковые фотографии пачки рендерятся один раз.
+    Ошибочные фотографии пропускаются и остаются для следующего запуска
+    команды.
+
+    Args:
+        media_ids: список ID объектов TripMedia
+    """
+    from resort.events import publish_on_commit
+    from resort.images import render_media_variants, replace_variants, variants_version
+    from resort.models import TripMedia
 
-        # Создаём миниатюру (максимум 300x300px, с сохранением пропорций)
-        img.thumbnail((300, 300), Image.Resampling.LANCZOS)
+    pending = (
+        TripMedia.objects.filter(id__in=media_ids)
+        .exclude(variants_version=variants_version())
+        .only("id", "trip_id", "image")
+    )
+    variants_by_media, rendered = {}, {}
+    for media in pending:
+        name = media.image.name
+        try:
+            if name not in rendered:
+                rendered[name] = render_media_variants(name)
+            variants_by_media[media] = rendered[name]
+        except Exception as exc:
+            print(f"❌ Варианты для media_id={media.id} не созданы: {exc}")
 
-        # Сохраняем в BytesIO
-        thumb_io = BytesIO()
-        img.save(thumb_io, format="JPEG", quality=85)
-        thumb_io.seek(0)
+    replace_variants(variants_by_media)
+    publish_on_commit(variants_by_media)
+    print(f"✅ Варианты созданы для {len(variants_by_media)} из {len(media_ids)} фото")
+    return f"Variants created for {len(variants_by_media)} media"
 
-        # Генерируем имя файла для миниатюры
-        original_name = os.path.basename(media.image.name)
-        thumb_name = f"thumb_{original_name}"
 
-        # Сохраняем миниатюру в модель
-        media.thumbnail.save(thumb_name, ContentFile(thumb_io.read()), save=True)
+@shared_task
+def purge_file_tombstones(batch_size=500):
+    """
+    Удаление файлов, на которые не осталось ссылок (FileTombstone),
+    пачками по batch_size. Ставится в очередь после коммита удаления.
+    """
+    from django.core.files.storage import default_storage
 
-        print(f"✅ Thumbnail создан для media_id={media_id}: {thumb_name}")
+    from resort.models import FileTombstone
 
-        return f"Thumbnail created: {thumb_name}"
+    deleted = FileTombstone.objects.purge(default_storage, batch_size)
+    print(f"🗑️ Удалено файлов: {deleted}")
+    return f"Files deleted: {deleted}"
 
-    except TripMedia.DoesNotExist:
-        print(f"❌ TripMedia с id={media_id} не найден")
-        return f"Error: TripMedia {media_id} not found"
 
-    except Exception as exc:
-        raise self.retry(exc=exc)
+@shared_task
+def generate_thumbnail(media_id):
+    """Прежнее имя задачи: сообщения, поставленные в очередь до обновления."""
+    generate_media_variants.delay(media_id)
@@ -0,0 +1,108 @@
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+
+from resort.cache_keys import CachePolicy
+from resort.cache_utils import CacheEntry, get_or_compute
+
+POLICY = CachePolicy(ttl=60, stale_ttl=60, lock_timeout=5)
+
+
+def make_key():
+    """Уникальный ключ, чтобы тесты не делили значения в Redis."""
+    return f"test:stampede:{uuid.uuid4().hex}"
+
+
+class CountingCompute:
+    """Функция пересчёта, считающая вызовы."""
+
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return "value"
+
+
+class TestGetOrCompute:
+    """Тесты защиты кэша от стампеда."""
+
+    def test_single_flight_under_burst(self):
+        """Из 20 одновременных запросов пересчитывает только один."""
+        key = make_key()
+        compute = CountingCompute(delay=0.2)
+        barrier = threading.Barrier(20)
+        results = []
+
+        def worker():
+            barrier.wait()
+            results.append(get_or_compute(key, compute, POLICY).value)
+
+        threads = [threading.Thread(target=worker) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert compute.calls == 1
+        assert results == ["value"] * 20
+
+    def test_fresh_value_not_recomputed(self):
+        """Свежее значение отдаётся из кэша."""
+        key = make_key()
+        compute = CountingCompute()
+
+        get_or_compute(key, compute, POLICY)
+        get_or_compute(key, compute, POLICY)
+
+        assert compute.calls == 1
+
+    def test_stale_served_while_revalidating(self):
+        """Пока другой процесс пересчитывает, отдаётся устаревшее значение."""
+        key = make_key()
+        cache.set(key, CacheEntry("old", expires_at=time.time() - 1, delta=0.1), 60)
+        cache.add(f"{key}:lock", "other-process", 5)
+        compute = CountingCompute()
+
+        entry = get_or_compute(key, compute, POLICY)
+
+        assert entry.value == "old"
+        assert compute.calls == 0
+
+    def test_stale_recomputed_by_lock_owner(self):
+        """Устаревшее значение пересчитывается, если блокировка свободна."""
+        key = make_key()
+        cache.set(key, CacheEntry("old", expires_at=time.time() - 1, delta=0.1), 60)
+
+        entry = get_or_compute(key, CountingCompute(), POLICY)
+
+        assert entry.value == "value"
+        assert entry.expires_at > time.time()
+
+    def test_probabilistic_early_refresh(self):
+        """Долгий расчёт перед самым истечением срока запускает обновление заранее."""
+        key = make_key()
+        cache.set(key, CacheEntry("old", expires_at=time.time() + 1, delta=1e6), 60)
+
+        assert get_or_compute(key, CountingCompute(), POLICY).value == "value"
+
+    def test_early_refresh_disabled_with_zero_beta(self):
+        """beta=0 выключает раннее обновление."""
+        key = make_key()
+        cache.set(key, CacheEntry("old", expires_at=time.time() + 1, delta=1e6), 60)
+        policy = CachePolicy(ttl=60, stale_ttl=60, beta=0)
+
+        assert get_or_compute(key, CountingCompute(), policy).value == "old"
+
+    def test_no_wait_returns_none(self):
+        """wait=False: без значения и при чужой блокировке - None вместо ожидания."""
+        key = make_key()
+        cache.add(f"{key}:lock", "other-process", 5)
+
+        assert get_or_compute(key, CountingCompute(), POLICY, wait=False) is None
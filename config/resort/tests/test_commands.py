@@ -0,0 +1,105 @@
+import uuid
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+from resort.api.tokens import RedisTokenBlacklist
+from resort.management.bench import percentile
+from resort.models import Resort
+
+
+def run_command(*args):
+    """Запускает management-команду и возвращает её вывод."""
+    out = StringIO()
+    call_command(*args, stdout=out)
+    return out.getvalue()
+
+
+# Тесты команды reconcile_trip_counters
+@pytest.mark.django_db
+def test_reconcile_trip_counters_fixes_drift(
+    resort, trip, public_trip_another_user_resort
+):
+    """Команда исправляет счётчики, изменённые в обход сигналов."""
+    Resort.objects.filter(pk=resort.pk).update(trips_count=10, public_trips_count=7)
+
+    output = run_command("reconcile_trip_counters")
+
+    resort.refresh_from_db()
+    assert (resort.trips_count, resort.public_trips_count) == (2, 1)
+    assert "Исправлено курортов: 1" in output
+
+
+@pytest.mark.django_db
+def test_reconcile_trip_counters_dry_run(resort, trip):
+    """С --dry-run расхождения только выводятся."""
+    Resort.objects.filter(pk=resort.pk).update(trips_count=5)
+
+    output = run_command("reconcile_trip_counters", "--dry-run")
+
+    resort.refresh_from_db()
+    assert resort.trips_count == 5
+    assert "trips_count 5 -> 1" in output
+
+
+@pytest.mark.django_db
+def test_reconcile_trip_counters_resort_without_trips(resort):
+    """Курорт без поездок получает нулевые счётчики, а не NULL."""
+    Resort.objects.filter(pk=resort.pk).update(trips_count=3, public_trips_count=3)
+
+    run_command("reconcile_trip_counters")
+
+    resort.refresh_from_db()
+    assert (resort.trips_count, resort.public_trips_count) == (0, 0)
+
+
+# Тесты команды migrate_token_blacklist
+def blacklist_in_db(user, jti, expires_at):
+    """Отозванный токен в таблицах token_blacklist."""
+    token = OutstandingToken.objects.create(
+        user=user, jti=jti, token="token", expires_at=expires_at
+    )
+    BlacklistedToken.objects.create(token=token)
+
+
+@pytest.mark.django_db
+def test_migrate_token_blacklist(user):
+    """Живые отозванные токены переносятся в Redis, истёкшие - нет."""
+    live_jti, expired_jti = uuid.uuid4().hex, uuid.uuid4().hex
+    blacklist_in_db(user, live_jti, timezone.now() + timedelta(days=1))
+    blacklist_in_db(user, expired_jti, timezone.now() - timedelta(days=1))
+
+    output = run_command("migrate_token_blacklist")
+
+    assert "Перенесено отозванных токенов: 1" in output
+    assert RedisTokenBlacklist().contains(live_jti)
+    assert not RedisTokenBlacklist().contains(expired_jti)
+    assert BlacklistedToken.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_migrate_token_blacklist_purge(user):
+    """С --purge таблицы token_blacklist очищаются."""
+    blacklist_in_db(user, uuid.uuid4().hex, timezone.now() + timedelta(days=1))
+
+    run_command("migrate_token_blacklist", "--purge")
+
+    assert OutstandingToken.objects.count() == 0
+    assert BlacklistedToken.objects.count() == 0
+
+
+# Тесты общих замеров bench_*
+@pytest.mark.parametrize(
+    "size, expected",
+    [(1, 1), (50, 50), (100, 99), (150, 149), (1000, 990)],
+)
+def test_percentile_nearest_rank(size, expected):
+    """p99 — значение ранга ceil(0.99 * n), а не соседнее с ним."""
+    assert percentile(list(range(1, size + 1)), 99) == expected
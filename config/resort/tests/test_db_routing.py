@@ -0,0 +1,226 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from resort.cache_keys import CacheKeys
+from resort.db_routing import (
+    PIN_COOKIE,
+    PrimaryReplicaRouter,
+    ReplicaRoutingMiddleware,
+    _current_request,
+)
+from resort.models import Resort, Trip
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.DATABASE_REPLICAS = ["replica"]
+
+
+@pytest.fixture
+def pinned_user(user):
+    """Пользователь, закреплённый за default; ключ удаляется после теста."""
+    cache.set(CacheKeys.primary_pin(user.pk), 1, 5)
+    yield user
+    cache.delete(CacheKeys.primary_pin(user.pk))
+
+
+@pytest.fixture
+def router():
+    return PrimaryReplicaRouter()
+
+
+@pytest.fixture
+def current_request():
+    """Делает запрос текущим, как ReplicaRoutingMiddleware."""
+    tokens = []
+
+    def activate(request):
+        tokens.append(_current_request.set(request))
+        return request
+
+    yield activate
+    for token in reversed(tokens):
+        _current_request.reset(token)
+
+
+def table_queries(queries, table):
+    return [q["sql"] for q in queries.captured_queries if f'"{table}"' in q["sql"]]
+
+
+@pytest.mark.usefixtures("replicas")
+class TestPrimaryReplicaRouter:
+    """Тесты выбора БД роутером."""
+
+    def test_safe_request_reads_from_replica(self, router, current_request):
+        current_request(RequestFactory().get("/"))
+
+        assert router.db_for_read(Resort) == "replica"
+
+    def test_unsafe_request_reads_from_primary(self, router, current_request):
+        current_request(RequestFactory().post("/"))
+
+        assert router.db_for_read(Resort) == "default"
+
+    def test_reads_after_write_go_to_primary(self, router, current_request):
+        """Запрос, записавший данные, дальше читает их из default."""
+        current_request(RequestFactory().get("/"))
+
+        assert router.db_for_write(Resort) == "default"
+        assert router.db_for_read(Resort) == "default"
+
+    def test_pin_cookie_reads_from_primary(self, router, current_request):
+        request = RequestFactory().get("/")
+        request.COOKIES[PIN_COOKIE] = "1"
+        current_request(request)
+
+        assert router.db_for_read(Resort) == "default"
+
+    def test_pinned_user_reads_from_primary(self, router, current_request, pinned_user):
+        """Пользователь API закреплён ключом в Redis после своей записи."""
+        request = current_request(RequestFactory().get("/"))
+        request.user = pinned_user
+
+        assert router.db_for_read(Resort) == "default"
+
+    def test_not_pinned_user_reads_from_replica(self, router, current_request, user):
+        request = current_request(RequestFactory().get("/"))
+        request.user = user
+
+        assert router.db_for_read(Resort) == "replica"
+
+    def test_lazy_session_user_not_evaluated(self, router, current_request):
+        """Ленивый пользователь сессии не вычисляется ради выбора БД."""
+        request = current_request(RequestFactory().get("/"))
+        request.user = SimpleLazyObject(lambda: pytest.fail("user evaluated"))
+
+        assert router.db_for_read(Resort) == "replica"
+
+    def test_outside_request_reads_from_primary(self, router):
+        """Celery и команды читают из default."""
+        assert router.db_for_read(Resort) == "default"
+
+    def test_no_replicas(self, router, current_request, settings):
+        settings.DATABASE_REPLICAS = []
+        current_request(RequestFactory().get("/"))
+
+        assert router.db_for_read(Resort) == "default"
+
+    def test_no_migrations_on_replica(self, router):
+        assert router.allow_migrate("replica", "resort") is False
+        assert router.allow_migrate("default", "resort") is None
+
+
+@pytest.mark.usefixtures("replicas")
+class TestReplicaRoutingMiddleware:
+    """Тесты закрепления клиента за основной БД после записи."""
+
+    def test_pins_after_write(self, router, user):
+        def view(request):
+            router.db_for_write(Trip)
+            return HttpResponse()
+
+        request = RequestFactory().post("/")
+        request.user = user
+        response = ReplicaRoutingMiddleware(view)(request)
+
+        assert response.cookies[PIN_COOKIE]["max-age"] == 5
+        assert cache.get(CacheKeys.primary_pin(user.pk)) == 1
+        cache.delete(CacheKeys.primary_pin(user.pk))
+
+    def test_no_pin_without_write(self):
+        request = RequestFactory().post("/")
+        request.user = AnonymousUser()
+        response = ReplicaRoutingMiddleware(lambda request: HttpResponse())(request)
+
+        assert PIN_COOKIE not in response.cookies
+
+    def test_request_context_reset(self):
+        ReplicaRoutingMiddleware(lambda request: HttpResponse())(
+            RequestFactory().get("/")
+        )
+
+        assert _current_request.get() is None
+
+
+@pytest.mark.usefixtures("replicas")
+@pytest.mark.django_db(transaction=True, databases=["default", "replica"])
+class TestReadYourWrites:
+    """
+    Запросы через весь стек. replica - зеркало тестовой БД (settings_test.py),
+    по запросам на каждом соединении видно, куда ушло чтение.
+    """
+
+    def capture(self, client, method, url, **kwargs):
+        with CaptureQueriesContext(connections["default"]) as primary:
+            with CaptureQueriesContext(connections["replica"]) as replica:
+                response = getattr(client, method)(url, **kwargs)
+        return response, primary, replica
+
+    def test_api_reads_from_replica(self, trip):
+        response, primary, replica = self.capture(
+            APIClient(), "get", reverse("trip-list")
+        )
+
+        assert response.status_code == 200
+        assert table_queries(replica, "resort_trip")
+        assert not table_queries(primary, "resort_trip")
+
+    def test_api_write_then_read_from_primary(self, user, resort):
+        """После POST клиент читает свою поездку из default - с cookie и без."""
+        access = RefreshToken.for_user(user).access_token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+        response, primary, replica = self.capture(
+            client,
+            "post",
+            reverse("trip-list"),
+            data={
+                "resort": resort.id,
+                "start_date": "2024-01-01",
+                "end_date": "2024-01-05",
+            },
+            format="json",
+        )
+        assert response.status_code == 201
+        assert not replica.captured_queries
+        assert PIN_COOKIE in response.cookies
+
+        # Клиент с cookie
+        _, primary, replica = self.capture(client, "get", reverse("trip-list"))
+        assert table_queries(primary, "resort_trip")
+        assert not table_queries(replica, "resort_trip")
+
+        # Клиент API без cookie: закреплён по пользователю
+        client.cookies.clear()
+        _, primary, replica = self.capture(client, "get", reverse("trip-list"))
+        assert table_queries(primary, "resort_trip")
+        assert not table_queries(replica, "resort_trip")
+
+    def test_form_write_pins_browser(self, client, user, resort):
+        client.force_login(user)
+
+        response = client.post(
+            reverse("trip_create"),
+            data={
+                "resort": resort.id,
+                "start_date": "2024-01-01",
+                "end_date": "2024-01-05",
+                "is_public": True,
+            },
+        )
+
+        assert response.status_code == 302
+        assert PIN_COOKIE in response.cookies
+        _, primary, replica = self.capture(client, "get", reverse("trip_list"))
+        assert table_queries(primary, "resort_trip")
+        assert not replica.captured_queries
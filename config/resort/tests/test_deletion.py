@@ -0,0 +1,162 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.db.models.signals import post_delete
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from resort.images import generate_variants
+from resort.models import FileTombstone, MediaBlob, Trip, TripMedia, TripMediaVariant
+
+
+pytestmark = pytest.mark.usefixtures("single_variant")
+
+
+def add_photos(trip, count):
+    """Фотографии с разным содержимым (разные файлы)."""
+    photos = []
+    for index in range(count):
+        buffer = BytesIO()
+        Image.new("RGB", (40, 30), color=(index * 40, 0, 0)).save(buffer, format="PNG")
+        upload = SimpleUploadedFile(f"photo{index}.png", buffer.getvalue())
+        photos.append(TripMedia.objects.create(trip=trip, image=upload))
+    return photos
+
+
+def stored(names):
+    return [name for name in names if default_storage.exists(name)]
+
+
+@pytest.mark.django_db
+class TestDeferredDeletion:
+    """Тесты удаления файлов через надгробия после коммита."""
+
+    def test_trip_delete_deferred(self, trip, django_capture_on_commit_callbacks):
+        names = [photo.image.name for photo in add_photos(trip, 3)]
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            trip.delete()
+
+        # До коммита файлы на месте, пути записаны в надгробия
+        assert len(stored(names)) == 3
+        assert set(FileTombstone.objects.values_list("name", flat=True)) == set(names)
+
+        for callback in callbacks:
+            callback()
+        assert stored(names) == []
+        assert not FileTombstone.objects.exists()
+        assert not MediaBlob.objects.filter(name__in=names).exists()
+
+    def test_user_cascade(self, user, trip, django_capture_on_commit_callbacks):
+        photo = add_photos(trip, 1)[0]
+        variant_names = [v.file.name for v in generate_variants(photo)]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.delete()
+
+        assert stored([photo.image.name, *variant_names]) == []
+
+    def test_user_cascade_single_release(self, trip, django_user_model):
+        """При каскаде от пользователя ссылки на файлы убираются один раз."""
+
+        def count_blob_queries(trips):
+            user = django_user_model.objects.create_user(f"cascade{trips}")
+            for _ in range(trips):
+                new_trip = Trip.objects.create(
+                    user=user,
+                    resort=trip.resort,
+                    start_date=trip.start_date,
+                    end_date=trip.end_date,
+                )
+                add_photos(new_trip, 1)
+            with CaptureQueriesContext(connection) as queries:
+                user.delete()
+            table = MediaBlob._meta.db_table
+            return sum(table in query["sql"] for query in queries)
+
+        assert count_blob_queries(1) == count_blob_queries(4)
+
+    def test_rollback_keeps_files(self, trip):
+        names = [photo.image.name for photo in add_photos(trip, 2)]
+
+        with transaction.atomic():
+            trip.delete()
+            transaction.set_rollback(True)
+
+        assert len(stored(names)) == 2
+        assert not FileTombstone.objects.exists()
+
+    def test_shared_file_kept(
+        self, trip, image_file, django_capture_on_commit_callbacks
+    ):
+        """Файл, на который ссылается другая поездка, не удаляется."""
+        other = Trip.objects.create(
+            user=trip.user,
+            resort=trip.resort,
+            start_date=trip.start_date,
+            end_date=trip.end_date,
+        )
+        kept = TripMedia.objects.create(trip=other, image=image_file)
+        TripMedia.objects.create(trip=trip, image=image_file)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            trip.delete()
+
+        assert stored([kept.image.name]) == [kept.image.name]
+        assert MediaBlob.objects.get(name=kept.image.name).ref_count == 1
+
+    def test_queryset_delete(self, trip, django_capture_on_commit_callbacks):
+        names = [photo.image.name for photo in add_photos(trip, 2)]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            TripMedia.objects.filter(trip=trip).delete()
+
+        assert stored(names) == []
+
+    def test_no_per_instance_signals(self, trip):
+        """Фотографии и варианты удаляются без сигналов на каждый объект."""
+        assert not post_delete.has_listeners(TripMedia)
+        assert not post_delete.has_listeners(TripMediaVariant)
+
+        def count_queries(photos):
+            new_trip = Trip.objects.create(
+                user=trip.user,
+                resort=trip.resort,
+                start_date=trip.start_date,
+                end_date=trip.end_date,
+            )
+            for photo in add_photos(new_trip, photos):
+                generate_variants(photo)
+            with CaptureQueriesContext(connection) as queries:
+                new_trip.delete()
+            return len(queries)
+
+        assert count_queries(1) == count_queries(5)
+
+
+@pytest.mark.django_db
+class TestPurge:
+    """Тесты задачи удаления файлов по надгробиям."""
+
+    def test_batches(self, trip):
+        names = [photo.image.name for photo in add_photos(trip, 5)]
+        trip.delete()  # Без коммита: задача не запускалась
+
+        deleted = FileTombstone.objects.purge(default_storage, batch_size=2)
+
+        assert deleted == 5
+        assert stored(names) == []
+
+    def test_reacquired_file_kept(self, trip, image_file):
+        """Ту же фотографию загрузили снова до очистки - файл остаётся."""
+        photo = TripMedia.objects.create(trip=trip, image=image_file)
+        photo.delete()
+        again = TripMedia.objects.create(trip=trip, image=image_file)
+
+        FileTombstone.objects.purge(default_storage)
+
+        assert stored([again.image.name]) == [again.image.name]
+        assert not FileTombstone.objects.exists()
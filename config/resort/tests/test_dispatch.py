@@ -0,0 +1,81 @@
+import pytest
+from celery import shared_task
+from django.core.cache import cache
+from django.db import transaction
+
+from resort.cache_keys import CacheKeys
+from resort.dispatch import QueuedTask, enqueue_on_commit
+from resort.models import TripMedia
+
+# Аргументы вызовов record_call (задачи выполняются синхронно, см. settings_test)
+calls = []
+
+
+@shared_task
+def record_call(value):
+    calls.append(value)
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+    yield
+    cache.delete(CacheKeys.queued_task(record_call.name, (1,)))
+
+
+@pytest.mark.django_db
+class TestEnqueueOnCommit:
+    """Тесты отправки задач после коммита."""
+
+    def test_sent_after_commit(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            enqueue_on_commit(record_call, 1)
+            assert calls == []  # До коммита задача не отправлена
+
+        assert calls == [1]
+
+    def test_not_sent_on_rollback(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                enqueue_on_commit(record_call, 1)
+                transaction.set_rollback(True)
+
+        assert callbacks == []
+        assert calls == []
+
+    def test_duplicates_in_transaction(self, django_capture_on_commit_callbacks):
+        """Повторные постановки в одной транзакции схлопываются."""
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            enqueue_on_commit(record_call, 1)
+            enqueue_on_commit(record_call, 1)
+            enqueue_on_commit(record_call, 2)
+
+        assert len(callbacks) == 2
+        assert calls == [1, 2]
+
+    def test_duplicate_while_queued(self):
+        """Пока задача в очереди, повторная отправка пропускается."""
+        cache.add(CacheKeys.queued_task(record_call.name, (1,)), 1)
+
+        QueuedTask(record_call, (1,))()
+
+        assert calls == []
+
+    def test_queued_key_released_on_start(self):
+        """Стартовавшую задачу снова можно поставить в очередь."""
+        QueuedTask(record_call, (1,))()
+        QueuedTask(record_call, (1,))()
+
+        assert calls == [1, 1]
+
+
+@pytest.mark.django_db
+def test_variants_generated_after_commit(
+    trip, image_file, django_capture_on_commit_callbacks
+):
+    """Варианты создаются задачей, отправленной после коммита загрузки."""
+    with django_capture_on_commit_callbacks(execute=True):
+        media = TripMedia.objects.create(trip=trip, image=image_file)
+        assert not media.variants.exists()
+
+    assert media.variants.exists()
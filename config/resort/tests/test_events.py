@@ -0,0 +1,168 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import AsyncClient
+from django_redis import get_redis_connection
+
+from resort.events import event_stream, publish_media_ready, trip_channel
+from resort.images import generate_variants
+from resort.models import TripMedia
+from resort.tasks import generate_media_variants
+
+
+pytestmark = pytest.mark.usefixtures("single_variant")
+
+
+@pytest.fixture(autouse=True)
+def short_keepalive(settings):
+    settings.TRIP_MEDIA_EVENTS_KEEPALIVE = 1
+
+
+@pytest.fixture
+def photo(trip, image_file):
+    return TripMedia.objects.create(trip=trip, image=image_file)
+
+
+@pytest.fixture
+def subscriber(trip):
+    """Подписчик канала поездки (как открытый поток SSE)."""
+    pubsub = get_redis_connection("default").pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(trip_channel(trip.id))
+    pubsub.get_message(timeout=1)  # Подтверждение подписки
+    yield pubsub
+    pubsub.close()
+
+
+def received(pubsub):
+    message = pubsub.get_message(timeout=1)
+    return json.loads(message["data"]) if message else None
+
+
+def read(stream, count):
+    """Первые count сообщений потока SSE; поток закрывается."""
+
+    async def collect():
+        chunks = [await anext(stream) for _ in range(count)]
+        await stream.aclose()
+        return chunks
+
+    return async_to_sync(collect)()
+
+
+@pytest.mark.django_db
+class TestPublish:
+    """Тесты публикации media_ready в Redis."""
+
+    def test_payload(self, trip, photo, subscriber):
+        generate_variants(photo)
+
+        publish_media_ready({trip.id: [photo.id]})
+
+        payload = received(subscriber)
+        assert payload["id"] == photo.id
+        assert payload["trip"] == trip.id
+        assert payload["variants"]["jpeg"]["300"]["url"].startswith("/media/")
+
+    def test_no_subscribers_no_queries(self, trip, photo, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            publish_media_ready({trip.id: [photo.id]})
+
+    def test_task_publishes_after_commit(
+        self, trip, photo, subscriber, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks() as callbacks:
+            generate_media_variants(photo.id)
+            assert received(subscriber) is None
+
+        for callback in callbacks:
+            callback()
+        assert received(subscriber)["id"] == photo.id
+
+
+@pytest.mark.django_db
+class TestEventStream:
+    """Тесты потока SSE."""
+
+    def test_media_ready_event(self, trip, photo):
+        generate_variants(photo)
+        stream = event_stream(trip.id, [])
+
+        async def scenario():
+            retry = await anext(stream)  # Подписка уже активна
+            await sync_to_async(publish_media_ready)({trip.id: [photo.id]})
+            event = await anext(stream)
+            await stream.aclose()
+            return retry, event
+
+        retry, event = async_to_sync(scenario)()
+
+        assert retry == "retry: 3000\n\n"
+        kind, data = event.strip().split("\n")
+        assert kind == "event: media_ready"
+        assert json.loads(data.removeprefix("data: "))["id"] == photo.id
+
+    def test_pending_already_ready(self, trip, photo):
+        """Варианты готовы до подписки - событие приходит сразу."""
+        other = TripMedia.objects.create(trip=trip, image=photo.image.name)
+        generate_variants(photo)
+
+        chunks = read(event_stream(trip.id, [photo.id, other.id]), 2)
+
+        assert chunks[1].startswith("event: media_ready")
+        assert f'"id": {photo.id}' in chunks[1]
+
+    def test_keepalive(self, settings, trip):
+        settings.TRIP_MEDIA_EVENTS_KEEPALIVE = 0.05
+
+        chunks = read(event_stream(trip.id, []), 2)
+
+        assert chunks[1] == ": keepalive\n\n"
+
+
+@pytest.mark.django_db
+class TestEventsEndpoint:
+    """Тесты GET /api/trips/{id}/media/events/"""
+
+    def get(self, user, trip, method="get"):
+        async def request():
+            client = AsyncClient()
+            if user is not None:
+                await sync_to_async(client.force_login)(user)
+            send = getattr(client, method)
+            return await send(f"/api/trips/{trip.id}/media/events/")
+
+        return async_to_sync(request)()
+
+    def test_owner_stream(self, user, trip):
+        response = self.get(user, trip)
+
+        assert response.status_code == 200
+        assert response["Content-Type"] == "text/event-stream"
+        assert response["Cache-Control"] == "no-cache"
+        assert response["X-Accel-Buffering"] == "no"
+
+    def test_private_trip_hidden(self, another_user, trip):
+        assert self.get(another_user, trip).status_code == 404
+
+    def test_anonymous_private_trip(self, trip):
+        assert self.get(None, trip).status_code == 404
+
+    @pytest.mark.parametrize("method", ["post", "put", "delete"])
+    def test_only_get(self, user, trip, method):
+        assert self.get(user, trip, method).status_code == 405
+
+    def test_wsgi_rejected(self, auth_client, trip):
+        """Под WSGI (сервис web) поток не открывается."""
+        response = auth_client.get(f"/api/trips/{trip.id}/media/events/")
+
+        assert response.status_code == 503
+
+
+@pytest.mark.django_db
+def test_trip_detail_subscribes_pending(auth_client, trip, photo):
+    """Страница поездки подписывается на поток для фото без вариантов."""
+    response = auth_client.get(trip.get_absolute_url())
+
+    assert f'data-pending-media="{photo.id}"' in response.content.decode()
+    assert f"/api/trips/{trip.id}/media/events/" in response.content.decode()
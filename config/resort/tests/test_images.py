@@ -0,0 +1,306 @@
+import re
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from PIL import Image
+
+from resort import images
+from resort.images import (
+    ImageTooLarge,
+    decode,
+    generate_variants,
+    render_variants,
+    variant_sizes,
+    variants_version,
+)
+from resort.models import TripMedia, TripMediaVariant
+from resort.tasks import generate_media_variants
+
+
+@pytest.fixture(autouse=True)
+def variant_settings(settings):
+    """Полный набор вариантов: тесты проверяют размеры и форматы."""
+    settings.TRIP_MEDIA_VARIANT_SIZES = [300, 1024, 2048]
+    settings.TRIP_MEDIA_VARIANT_FORMATS = {"jpeg": 85, "webp": 80}
+
+
+def make_image(width, height, mode="RGB", fmt="JPEG", orientation=None):
+    image = Image.new(mode, (width, height))
+    buffer = BytesIO()
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[0x0112] = orientation
+    image.save(buffer, format=fmt, exif=exif.tobytes())
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture
+def large_media(db, public_trip_another_user):
+    """Фотография 3000x2000 в публичной поездке."""
+    return TripMedia.objects.create(
+        trip=public_trip_another_user,
+        image=SimpleUploadedFile("large.jpg", make_image(3000, 2000).read()),
+    )
+
+
+class TestRenderVariants:
+    """Тесты построения вариантов изображения."""
+
+    @pytest.mark.parametrize(
+        "source_size, expected",
+        [
+            ((3000, 2000), [300, 1024, 2048]),
+            ((800, 600), [300, 1024]),  # 1024 - в натуральную величину
+            ((200, 100), [300]),
+            ((1024, 768), [300, 1024]),
+        ],
+    )
+    def test_variant_sizes(self, source_size, expected):
+        assert variant_sizes(source_size, [2048, 300, 1024]) == expected
+
+    def test_all_sizes_and_formats(self):
+        renditions = render_variants(make_image(3000, 2000))
+
+        assert {(r.size, r.format) for r in renditions} == {
+            (size, fmt) for size in (300, 1024, 2048) for fmt in ("jpeg", "webp")
+        }
+        dimensions = {r.size: (r.width, r.height) for r in renditions}
+        assert dimensions == {300: (300, 200), 1024: (1024, 683), 2048: (2048, 1365)}
+
+    def test_encoded_formats(self):
+        renditions = render_variants(make_image(400, 400), sizes=[300])
+
+        decoded = {r.format: Image.open(BytesIO(r.content)) for r in renditions}
+        assert decoded["jpeg"].format == "JPEG"
+        assert decoded["webp"].format == "WEBP"
+        assert decoded["webp"].size == (300, 300)
+
+    def test_no_upscale(self):
+        renditions = render_variants(make_image(800, 600), formats={"jpeg": 85})
+
+        assert [(r.size, r.width) for r in renditions] == [(1024, 800), (300, 300)]
+
+    def test_source_decoded_once(self, monkeypatch):
+        """Все варианты строятся из одного открытия оригинала."""
+        opened = []
+        original_open = Image.open
+        monkeypatch.setattr(
+            images.Image,
+            "open",
+            lambda *args, **kwargs: opened.append(args) or original_open(*args),
+        )
+
+        render_variants(make_image(3000, 2000))
+
+        assert len(opened) == 1
+
+    def test_transparent_png(self):
+        """PNG с прозрачностью и палитрой кодируется в JPEG."""
+        renditions = render_variants(make_image(500, 500, "RGBA", "PNG"), sizes=[300])
+
+        assert {r.format for r in renditions} == {"jpeg", "webp"}
+
+
+class TestDecode:
+    """Тесты декодирования с уменьшением и бюджетом пикселей."""
+
+    def test_jpeg_draft(self):
+        """JPEG декодируется сразу уменьшенным, но не меньше нужного размера."""
+        with Image.open(make_image(6000, 4000)) as image:
+            decoded = decode(image, 1024)
+
+        assert decoded.size == (1500, 1000)  # DCT-масштаб 1/4
+
+    def test_png_reduce(self):
+        with Image.open(make_image(6000, 4000, fmt="PNG")) as image:
+            decoded = decode(image, 1000)
+
+        assert decoded.size == (2000, 1334)  # reduce(3): запас x2 для LANCZOS
+
+    def test_small_image_not_reduced(self):
+        with Image.open(make_image(800, 600)) as image:
+            assert decode(image, 1024).size == (800, 600)
+
+    @pytest.mark.parametrize("fmt", ["JPEG", "PNG"])
+    def test_exif_orientation(self, fmt):
+        """Снимок, повёрнутый камерой на 90°, становится вертикальным."""
+        renditions = render_variants(
+            make_image(4000, 3000, fmt=fmt, orientation=6),
+            sizes=[300],
+            formats={"jpeg": 85},
+        )
+
+        assert (renditions[0].width, renditions[0].height) == (225, 300)
+
+    def test_pixel_budget(self, settings):
+        """PNG декодируется целиком и не укладывается в бюджет."""
+        settings.TRIP_MEDIA_MAX_DECODE_PIXELS = 1_000_000
+
+        with pytest.raises(ImageTooLarge):
+            render_variants(make_image(2000, 1000, fmt="PNG"), sizes=[300])
+
+    def test_pixel_budget_after_draft(self, settings):
+        """Бюджет считается после draft: большой JPEG в него укладывается."""
+        settings.TRIP_MEDIA_MAX_DECODE_PIXELS = 1_000_000
+
+        renditions = render_variants(make_image(4000, 3000), sizes=[300])
+
+        assert renditions
+
+
+@pytest.mark.django_db
+class TestGenerateVariants:
+    """Тесты сохранения вариантов фотографии."""
+
+    def test_saves_variants(self, large_media, media_root):
+        generate_variants(large_media)
+
+        variants = TripMediaVariant.objects.filter(media=large_media)
+        assert variants.count() == 6
+        for variant in variants:
+            assert (media_root / variant.file.name).exists()
+            assert re.match(
+                r"trip_photos/variants/\w\w/\w\w/\w{32}\.", variant.file.name
+            )
+
+    def test_regenerate_replaces_files(
+        self, large_media, media_root, settings, django_capture_on_commit_callbacks
+    ):
+        """Совпавшие варианты остаются теми же файлами, лишние удаляются."""
+        old_files = {
+            (v.size, v.format): v.file.name for v in generate_variants(large_media)
+        }
+        settings.TRIP_MEDIA_VARIANT_FORMATS = {"jpeg": 85}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            generate_variants(large_media)
+
+        assert {
+            (v.size, v.format): v.file.name for v in large_media.variants.all()
+        } == {key: name for key, name in old_files.items() if key[1] == "jpeg"}
+        assert not any(
+            (media_root / name).exists()
+            for (_, fmt), name in old_files.items()
+            if fmt == "webp"
+        )
+
+    def test_variant_files_deleted_with_media(
+        self, large_media, media_root, django_capture_on_commit_callbacks
+    ):
+        files = [v.file.name for v in generate_variants(large_media)]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            large_media.delete()
+
+        assert not any((media_root / name).exists() for name in files)
+
+    def test_task_skips_existing(self, large_media):
+        generate_variants(large_media)
+
+        result = generate_media_variants(large_media.id)
+
+        assert result.startswith("Variants already exist")
+
+    def test_task_too_large_not_retried(self, large_media, settings):
+        settings.TRIP_MEDIA_MAX_DECODE_PIXELS = 100_000
+
+        result = generate_media_variants(large_media.id)
+
+        assert result.startswith("Error: image too large")
+        assert not large_media.variants.exists()
+
+    def test_srcsets(self, large_media):
+        generate_variants(large_media)
+        media = TripMedia.objects.prefetch_related("variants").get(pk=large_media.pk)
+
+        webp = media.srcsets["webp"].split(", ")
+        assert [candidate.split()[1] for candidate in webp] == [
+            "300w",
+            "1024w",
+            "2048w",
+        ]
+        preview = media.variants.get(size=300, format="jpeg")
+        assert media.preview_url == preview.file.url
+
+    def test_preview_url_without_variants(self, large_media):
+        assert large_media.srcsets == {}
+        assert large_media.preview_url == large_media.image.url
+
+
+@pytest.mark.django_db
+def test_api_variants(client, large_media):
+    """API отдаёт карту вариантов по формату и размеру."""
+    generate_variants(large_media)
+
+    response = client.get(reverse("tripmedia-detail", kwargs={"pk": large_media.pk}))
+
+    variants = response.json()["variants"]
+    assert set(variants) == {"jpeg", "webp"}
+    assert set(variants["webp"]) == {"300", "1024", "2048"}
+    assert variants["jpeg"]["300"]["width"] == 300
+    assert variants["jpeg"]["300"]["url"].startswith("http://testserver/media/")
+
+
+@pytest.mark.django_db
+def test_trip_detail_srcset(auth_client, large_media):
+    """Страница поездки показывает фото через srcset вариантов."""
+    generate_variants(large_media)
+
+    response = auth_client.get(large_media.trip.get_absolute_url())
+
+    content = response.content.decode()
+    assert 'type="image/webp"' in content
+    assert ".webp 2048w" in content
+
+
+def run_backfill(*args):
+    out, err = StringIO(), StringIO()
+    call_command("backfill_media_variants", *args, stdout=out, stderr=err)
+    return out.getvalue(), err.getvalue()
+
+
+class TestBackfillMediaVariants:
+    """Тесты команды backfill_media_variants."""
+
+    def test_version_depends_on_settings(self, settings):
+        version = variants_version()
+        settings.TRIP_MEDIA_VARIANT_SIZES = [300]
+
+        assert variants_version() != version
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rebuilds_outdated(self, large_media, settings):
+        """После смены размеров варианты перестраиваются пулом процессов."""
+        settings.TRIP_MEDIA_VARIANT_SIZES = [300]
+        broken = TripMedia.objects.create(
+            trip=large_media.trip,
+            image=SimpleUploadedFile("broken.jpg", b"not an image"),
+        )
+
+        out, err = run_backfill("--workers", "2", "--batch-size", "1")
+
+        large_media.refresh_from_db()
+        assert large_media.variants_version == variants_version()
+        assert sorted(large_media.variants.values_list("size", flat=True)) == [
+            300,
+            300,
+        ]
+        assert f"media_id={broken.pk}" in err
+        assert "Готово: 1 фотографий" in out and "ошибок: 1" in out
+
+        # Повторный запуск продолжает с необработанных: осталась только ошибочная
+        broken.delete()
+        assert run_backfill()[0].startswith("Все варианты актуальны")
+
+    @pytest.mark.django_db
+    def test_celery(self, large_media):
+        out, _ = run_backfill("--celery")
+
+        large_media.refresh_from_db()
+        assert large_media.variants_version == variants_version()
+        assert large_media.variants.count() == 6
+        assert "1 фотографий, 1 задач" in out
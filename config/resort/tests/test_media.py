@@ -0,0 +1,160 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from resort.images import generate_variants
+from resort.models import TripMedia
+
+
+@pytest.fixture(autouse=True)
+def without_sendfile(settings):
+    """Файлы отдаёт сам Django; тесты прокси включают MEDIA_SENDFILE."""
+    settings.MEDIA_SENDFILE = ""
+
+
+def photo_upload():
+    buffer = BytesIO()
+    Image.new("RGB", (64, 64), color="blue").save(buffer, format="JPEG")
+    return SimpleUploadedFile("photo.jpg", buffer.getvalue())
+
+
+@pytest.fixture
+def private_media(trip):
+    """Фотография приватной поездки пользователя user."""
+    return TripMedia.objects.create(trip=trip, image=photo_upload())
+
+
+@pytest.fixture
+def public_media(public_trip_another_user):
+    return TripMedia.objects.create(trip=public_trip_another_user, image=photo_upload())
+
+
+def body(response):
+    return b"".join(response.streaming_content)
+
+
+@pytest.mark.django_db
+class TestServeMedia:
+    """Тесты отдачи медиафайлов с проверкой доступа."""
+
+    def test_public_photo(self, client, public_media):
+        response = client.get(public_media.image.url)
+
+        assert response.status_code == 200
+        assert body(response) == public_media.image.read()
+        assert response["Content-Type"] == "image/jpeg"
+        digest = public_media.image.name.rsplit("/", 1)[1].split(".")[0]
+        assert response["ETag"] == f'"{digest}"'
+        cache_control = set(response["Cache-Control"].split(", "))
+        # Общие кэши не хранят: поездку могут сделать приватной
+        assert {"private", "immutable", "max-age=31536000"} <= cache_control
+        assert "public" not in cache_control
+
+    def test_private_photo_hidden(self, client, another_user, private_media):
+        client.force_login(another_user)
+
+        assert client.get(private_media.image.url).status_code == 404
+
+    def test_private_photo_owner(self, auth_client, private_media):
+        response = auth_client.get(private_media.image.url)
+
+        assert response.status_code == 200
+        assert "private" in response["Cache-Control"]
+
+    def test_private_photo_jwt(self, client, user, private_media):
+        token = RefreshToken.for_user(user).access_token
+
+        response = client.get(
+            private_media.image.url, HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+
+        assert response.status_code == 200
+
+    def test_variant_follows_photo_visibility(self, client, private_media):
+        variant = generate_variants(private_media)[0]
+        assert client.get(variant.file.url).status_code == 404
+
+        private_media.trip.is_public = True
+        private_media.trip.save()
+
+        assert client.get(variant.file.url).status_code == 200
+
+    def test_unknown_file(self, client, media_root):
+        (media_root / "secret.txt").write_text("secret")
+
+        assert client.get("/media/secret.txt").status_code == 404
+        assert client.get("/media/../manage.py").status_code == 404
+
+    def test_not_modified(self, client, public_media):
+        etag = client.get(public_media.image.url)["ETag"]
+
+        response = client.get(public_media.image.url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+        assert "immutable" in response["Cache-Control"]
+
+
+@pytest.mark.django_db
+class TestRange:
+    """Тесты Range без прокси."""
+
+    @pytest.mark.parametrize(
+        "header, start, end",
+        [("bytes=0-9", 0, 9), ("bytes=10-", 10, None), ("bytes=-5", -5, None)],
+    )
+    def test_partial(self, client, public_media, header, start, end):
+        content = public_media.image.read()
+        size = len(content)
+
+        response = client.get(public_media.image.url, HTTP_RANGE=header)
+
+        expected = content[start : None if end is None else end + 1]
+        first = start % size
+        assert response.status_code == 206
+        assert body(response) == expected
+        assert response["Content-Range"] == (
+            f"bytes {first}-{first + len(expected) - 1}/{size}"
+        )
+        assert int(response["Content-Length"]) == len(expected)
+
+    def test_unsatisfiable(self, client, public_media):
+        response = client.get(public_media.image.url, HTTP_RANGE="bytes=999999-")
+
+        assert response.status_code == 416
+        assert response["Content-Range"] == f"bytes */{public_media.image.size}"
+
+    def test_if_range_mismatch(self, client, public_media):
+        """Файл изменился (другой ETag) - отдаётся целиком."""
+        response = client.get(
+            public_media.image.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"'
+        )
+
+        assert response.status_code == 200
+
+
+@pytest.mark.django_db
+class TestAcceleratedTransfer:
+    """Тесты передачи файла прокси."""
+
+    def test_nginx(self, client, settings, public_media):
+        settings.MEDIA_SENDFILE = "nginx"
+        settings.MEDIA_ACCEL_PREFIX = "/protected-media/"
+
+        response = client.get(public_media.image.url)
+
+        assert response.status_code == 200
+        assert response.content == b""
+        assert response["X-Accel-Redirect"] == (
+            f"/protected-media/{public_media.image.name}"
+        )
+        assert response["Content-Type"] == "image/jpeg"
+
+    def test_sendfile(self, client, settings, media_root, public_media):
+        settings.MEDIA_SENDFILE = "sendfile"
+
+        response = client.get(public_media.image.url)
+
+        assert response["X-Sendfile"] == str(media_root / public_media.image.name)
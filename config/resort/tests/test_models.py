@@ -2,6 +2,8 @@ import pytest
 from django.core.exceptions import ValidationError
 from slugify import slugify as py_slugify
 
+from resort.models import Trip
+
 
 # Тесты для модели Resort
 @pytest.mark.django_db
@@ -65,3 +67,57 @@ def test_tripmedia_get_absolute_url(trip_media):
     """get_absolute_url должен возвращать корректный URL для медиа поездки."""
     url = trip_media.get_absolute_url()
     assert str(trip_media.trip.id) in url
+
+
+# Тесты денормализованных счётчиков поездок Resort
+def refresh_counters(resort):
+    """Перечитывает счётчики курорта из БД."""
+    resort.refresh_from_db(fields=["trips_count", "public_trips_count"])
+    return resort.trips_count, resort.public_trips_count
+
+
+@pytest.mark.django_db
+def test_resort_counters_on_trip_create(
+    resort, trip, public_trip_another_user_resort, private_trip_another_user_resort
+):
+    """Создание поездки увеличивает счётчики курорта."""
+    assert refresh_counters(resort) == (3, 1)
+
+
+@pytest.mark.django_db
+def test_resort_counters_on_is_public_change(resort, trip):
+    """Смена публичности поездки меняет только счётчик публичных."""
+    trip = Trip.objects.get(pk=trip.pk)
+    trip.is_public = True
+    trip.save()
+    assert refresh_counters(resort) == (1, 1)
+
+    # Повторное сохранение без изменений не трогает счётчики
+    trip.save()
+    assert refresh_counters(resort) == (1, 1)
+
+    trip.is_public = False
+    trip.save()
+    assert refresh_counters(resort) == (1, 0)
+
+
+@pytest.mark.django_db
+def test_resort_counters_on_resort_change(resort, another_resort, trip):
+    """Перенос поездки на другой курорт переносит её в счётчиках."""
+    trip = Trip.objects.get(pk=trip.pk)
+    trip.resort = another_resort
+    trip.is_public = True
+    trip.save()
+
+    assert refresh_counters(resort) == (0, 0)
+    assert refresh_counters(another_resort) == (1, 1)
+
+
+@pytest.mark.django_db
+def test_resort_counters_on_trip_delete(resort, trip, public_trip_another_user_resort):
+    """Удаление поездки (в т.ч. каскадом от пользователя) уменьшает счётчики."""
+    Trip.objects.get(pk=trip.pk).delete()
+    assert refresh_counters(resort) == (1, 1)
+
+    public_trip_another_user_resort.user.delete()
+    assert refresh_counters(resort) == (0, 0)
@@ -0,0 +1,180 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from resort.cache_keys import CacheKeys, CacheTimeouts
+from resort.models import Resort, Trip
+from resort.snapshot import ResortCatalog, resort_catalog, trip_counters
+
+
+@pytest.mark.django_db
+class TestResortSnapshot:
+    """Тесты снимка справочника курортов в памяти процесса."""
+
+    def test_snapshot_maps(self, resort, another_resort):
+        """Курорты отсортированы по названию и доступны по id и slug."""
+        snapshot = resort_catalog.get()
+
+        assert [r.name for r in snapshot.resorts] == ["Another Resort", "Test Resort"]
+        assert snapshot.by_slug[resort.slug].pk == resort.pk
+        assert snapshot.serialized_by_id[resort.pk]["name"] == "Test Resort"
+
+    def test_steady_state_without_db_and_redis(
+        self, resort, monkeypatch, django_assert_num_queries
+    ):
+        """Повторное чтение снимка не обращается ни к БД, ни к Redis."""
+        resort_catalog.get()
+
+        def fail(*args, **kwargs):
+            raise AssertionError("обращение к Redis")
+
+        monkeypatch.setattr("resort.snapshot.cache.get", fail)
+        with django_assert_num_queries(0):
+            assert resort_catalog.get().by_id[resort.pk] == resort
+
+    def test_resort_save_visible_immediately(self, resort):
+        """Сохранение курорта сбрасывает снимок текущего процесса."""
+        resort_catalog.get()
+
+        resort.name = "Renamed Resort"
+        resort.save()
+
+        assert resort_catalog.get().by_id[resort.pk].name == "Renamed Resort"
+
+    def test_trip_changes_keep_snapshot(
+        self, resort, user, django_capture_on_commit_callbacks
+    ):
+        """
+        Создание и удаление Trip обновляют счётчики поездок, а снимок
+        курортов (версия в Redis) остаётся прежним.
+        """
+        snapshot = resort_catalog.get()
+        assert "trips_count" not in snapshot.serialized_by_id[resort.pk]
+        assert trip_counters()[resort.pk]["trips_count"] == 0
+        version = cache.get(CacheKeys.RESORT_SNAPSHOT_VERSION)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            trip = Trip.objects.create(
+                user=user,
+                resort=resort,
+                start_date="2024-01-01",
+                end_date="2024-01-05",
+                is_public=True,
+            )
+        assert trip_counters()[resort.pk] == {
+            "trips_count": 1,
+            "public_trips_count": 1,
+        }
+
+        with django_capture_on_commit_callbacks(execute=True):
+            trip.delete()
+        assert trip_counters()[resort.pk]["trips_count"] == 0
+
+        assert resort_catalog.get() is snapshot
+        assert cache.get(CacheKeys.RESORT_SNAPSHOT_VERSION) == version
+
+    def test_resort_pages_served_from_snapshot(
+        self, client, resort, django_assert_num_queries
+    ):
+        """HTML-страницы списка и курорта (гость) не делают запросов к БД."""
+        resort_catalog.get()
+        trip_counters()
+
+        with django_assert_num_queries(0):
+            assert client.get(reverse("resort_list")).status_code == 200
+            assert client.get(resort.get_absolute_url()).status_code == 200
+
+    def test_unknown_slug_returns_404(self, client, resort):
+        """Несуществующий slug - 404, как и раньше."""
+        response = client.get(reverse("resort_detail", args=["no-such-resort"]))
+
+        assert response.status_code == 404
+
+    def test_trip_api_without_resort_join(self, client, public_trip_another_user):
+        """Вложенный курорт поездки берётся из снимка, без JOIN resort_resort."""
+        resort_catalog.get()
+        trip_counters()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse("trip-list"))
+
+        resort = response.json()["results"][0]["resort"]
+        assert resort["slug"] == public_trip_another_user.resort.slug
+        assert not any("resort_resort" in q["sql"] for q in queries.captured_queries)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestResortSnapshotAcrossProcesses:
+    """
+    Снимки нескольких процессов (отдельные ResortCatalog) вне транзакции:
+    версия и данные снимка общие, в Redis.
+    """
+
+    @pytest.fixture(autouse=True)
+    def new_version(self, monkeypatch):
+        """Новая версия: данные снимка прошлых тестов в Redis не используются."""
+        monkeypatch.setattr(CacheTimeouts, "RESORT_SNAPSHOT_CHECK", 0)
+        resort_catalog.invalidate()
+
+    def test_version_invalidates_other_processes(self, resort):
+        """Другой процесс узнаёт об изменении по версии в Redis после коммита."""
+        other_process = ResortCatalog()
+        assert other_process.get().by_id[resort.pk].name == "Test Resort"
+
+        Resort.objects.filter(pk=resort.pk).update(name="Updated Resort")
+        # Без новой версии снимок другого процесса остаётся прежним
+        assert other_process.get().by_id[resort.pk].name == "Test Resort"
+
+        resort.name = "Updated Resort"
+        resort.save()
+
+        assert other_process.get().by_id[resort.pk].name == "Updated Resort"
+
+    def test_burst_after_invalidation_queries_db_once(self, resort):
+        """После смены версии 20 процессов разом загружают курорты одним запросом."""
+        processes = [ResortCatalog() for _ in range(20)]
+        barrier = threading.Barrier(len(processes))
+        queries = []
+        names = []
+
+        def slow_query(execute, sql, params, many, context):
+            if "resort_resort" in sql:
+                queries.append(sql)
+                time.sleep(0.2)  # Чтобы запросы процессов гарантированно пересеклись
+            return execute(sql, params, many, context)
+
+        def worker(catalog):
+            try:
+                with connection.execute_wrapper(slow_query):
+                    barrier.wait()
+                    names.append(catalog.get().by_id[resort.pk].name)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(p,)) for p in processes]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(queries) == 1
+        assert names == ["Test Resort"] * len(processes)
+
+    def test_old_snapshot_served_while_other_process_loads(self, resort):
+        """Пока новую версию загружает другой процесс, отдаётся старый снимок."""
+        process = ResortCatalog()
+        process.get()
+        Resort.objects.filter(pk=resort.pk).update(name="Updated Resort")
+        resort_catalog.invalidate()
+        version = cache.get(CacheKeys.RESORT_SNAPSHOT_VERSION)
+        cache.add(f"{CacheKeys.resort_snapshot(version)}:lock", "other-process", 5)
+
+        assert process.get().by_id[resort.pk].name == "Test Resort"
+
+        cache.delete(f"{CacheKeys.resort_snapshot(version)}:lock")
+        assert process.get().by_id[resort.pk].name == "Updated Resort"
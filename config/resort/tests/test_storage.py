@@ -0,0 +1,196 @@
+import hashlib
+from datetime import date
+from io import StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.urls import reverse
+
+from resort.management.commands.relocate_media_files import Command
+from resort import images
+from resort.images import generate_variants
+from resort.models import MediaBlob, Trip, TripMedia
+from resort.storage import HashingTemporaryFileUploadHandler
+
+
+@pytest.fixture
+def second_trip(user, another_resort):
+    return Trip.objects.create(
+        user=user,
+        resort=another_resort,
+        start_date=date(2024, 1, 5),
+        end_date=date(2024, 1, 12),
+    )
+
+
+@pytest.fixture
+def legacy_media(trip, image_file, media_root):
+    """Фотография с миниатюрой по старым плоским путям."""
+    content = image_file.read()
+    (media_root / "trip_photos/thumbnails").mkdir(parents=True)
+    (media_root / "trip_photos/legacy.jpg").write_bytes(content)
+    (media_root / "trip_photos/thumbnails/legacy_thumb.jpg").write_bytes(b"thumb")
+    media = TripMedia.objects.create(
+        trip=trip,
+        image="trip_photos/legacy.jpg",
+        thumbnail="trip_photos/thumbnails/legacy_thumb.jpg",
+    )
+    media.content = content
+    return media
+
+
+def run_relocate(*args):
+    out, err = StringIO(), StringIO()
+    call_command("relocate_media_files", *args, stdout=out, stderr=err)
+    return out.getvalue(), err.getvalue()
+
+
+@pytest.mark.django_db
+def test_upload_sharded_by_content_hash(trip, image_file, media_root):
+    """Загруженный файл лежит в trip_photos/ab/cd/<хеш>.jpg."""
+    digest = hashlib.sha256(image_file.read()).hexdigest()[:32]
+
+    media = TripMedia.objects.create(trip=trip, image=image_file)
+
+    assert media.image.name == f"trip_photos/{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+    assert (media_root / media.image.name).exists()
+
+
+@pytest.mark.django_db
+class TestRelocateMediaFiles:
+    """Тесты команды relocate_media_files."""
+
+    def test_relocates_files(
+        self, legacy_media, media_root, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            out, _ = run_relocate()
+
+        legacy_media.refresh_from_db()
+        digest = hashlib.sha256(legacy_media.content).hexdigest()[:32]
+        assert legacy_media.image.name == (
+            f"trip_photos/{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+        )
+        assert legacy_media.thumbnail.name.startswith("trip_photos/thumbnails/")
+        assert legacy_media.thumbnail.read() == b"thumb"
+        assert not (media_root / "trip_photos/legacy.jpg").exists()
+        assert "TripMedia: перенесено файлов: 2" in out
+
+        # Повторный запуск ничего не переносит
+        assert "TripMedia: перенесено файлов: 0" in run_relocate()[0]
+
+    def test_keep_old(
+        self, legacy_media, media_root, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            run_relocate("--keep-old")
+
+        assert (media_root / "trip_photos/legacy.jpg").exists()
+
+    def test_missing_file_reported(self, legacy_media, media_root):
+        (media_root / "trip_photos/legacy.jpg").unlink()
+
+        out, err = run_relocate()
+
+        legacy_media.refresh_from_db()
+        assert legacy_media.image.name == "trip_photos/legacy.jpg"
+        assert "нет trip_photos/legacy.jpg" in err
+        assert "TripMedia: перенесено файлов: 1" in out
+
+    def test_file_replaced_during_copy(self, legacy_media, media_root):
+        """Если файл заменили во время копирования, новый путь не пишется."""
+        command = Command()
+        batch = [TripMedia.objects.get(pk=legacy_media.pk)]
+        fields = ["image", "thumbnail"]
+        moves = command.copy_files(TripMedia, fields, batch)
+        legacy_media.image.save("new.jpg", ContentFile(b"new"))
+
+        stale, discarded = command.apply_moves(TripMedia, fields, batch, moves)
+
+        replaced = legacy_media.image.name
+        legacy_media.refresh_from_db()
+        assert legacy_media.image.name == replaced
+        assert discarded == [moves[legacy_media.pk]["image"][1]]
+        assert stale == ["trip_photos/thumbnails/legacy_thumb.jpg"]
+
+
+@pytest.mark.django_db
+class TestDeduplication:
+    """Тесты хранения одинаковых фотографий одним файлом."""
+
+    def upload(self, client, trip, content):
+        url = reverse("trip_media_add", kwargs={"trip_id": trip.id})
+        client.post(url, {"image": ContentFile(content, name="photo.jpg")})
+        return trip.media.get()
+
+    def test_same_photo_stored_once(
+        self, auth_client, trip, second_trip, image_file, media_root
+    ):
+        content = image_file.read()
+
+        first = self.upload(auth_client, trip, content)
+        second = self.upload(auth_client, second_trip, content)
+
+        assert first.image.name == second.image.name
+        assert len(list((media_root / "trip_photos").glob("*/*/*.jpg"))) == 1
+        assert MediaBlob.objects.get(name=first.image.name).ref_count == 2
+
+    def test_file_deleted_with_last_reference(
+        self,
+        trip,
+        second_trip,
+        image_file,
+        media_root,
+        django_capture_on_commit_callbacks,
+    ):
+        first = TripMedia.objects.create(trip=trip, image=image_file)
+        second = TripMedia.objects.create(trip=second_trip, image=image_file)
+        path = media_root / first.image.name
+
+        with django_capture_on_commit_callbacks(execute=True):
+            first.delete()
+        assert path.exists()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            second.delete()
+        assert not path.exists()
+        assert not MediaBlob.objects.filter(name=second.image.name).exists()
+
+    def test_variants_shared(self, trip, second_trip, image_file, monkeypatch):
+        """Варианты повторной загрузки берутся у первой, без декодирования."""
+        first = TripMedia.objects.create(trip=trip, image=image_file)
+        generate_variants(first)
+        monkeypatch.setattr(images, "render_media_variants", None)
+
+        second = TripMedia.objects.create(trip=second_trip, image=image_file)
+        generate_variants(second)
+
+        shared = {v.file.name for v in first.variants.all()}
+        assert {v.file.name for v in second.variants.all()} == shared
+        assert set(
+            MediaBlob.objects.filter(name__in=shared).values_list(
+                "ref_count", flat=True
+            )
+        ) == {2}
+
+    def test_missing_blob_restored(self, trip, image_file, media_root):
+        """Файл без ссылок, удалённый сборщиком, записывается заново."""
+        media = TripMedia.objects.create(trip=trip, image=image_file)
+        (media_root / media.image.name).unlink()
+
+        again = TripMedia.objects.create(trip=trip, image=image_file)
+
+        assert (media_root / again.image.name).exists()
+
+
+def test_upload_hashed_while_streaming(settings):
+    """Хеш загрузки считается по чанкам при приёме."""
+    handler = HashingTemporaryFileUploadHandler()
+    handler.new_file("image", "photo.jpg", "image/jpeg", None)
+    for start, chunk in enumerate([b"first ", b"second"]):
+        handler.receive_data_chunk(chunk, start)
+
+    uploaded = handler.file_complete(12)
+
+    assert uploaded.sha256 == hashlib.sha256(b"first second").hexdigest()
@@ -0,0 +1,101 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+
+from resort.models import Trip, TripMedia
+
+
+# Тесты семантики правил видимости поездок
+@pytest.mark.django_db
+def test_visible_to_guest_only_public(
+    trip, public_trip_another_user, private_trip_another_user
+):
+    """Гость видит только публичные поездки."""
+    visible = set(Trip.objects.visible_to(AnonymousUser()))
+    assert visible == {public_trip_another_user}
+
+
+@pytest.mark.django_db
+def test_visible_to_user_public_and_own(
+    user, trip, public_trip_another_user, private_trip_another_user
+):
+    """Пользователь видит свои (в т.ч. приватные) и публичные чужие поездки."""
+    visible = list(Trip.objects.visible_to(user))
+    assert set(visible) == {trip, public_trip_another_user}
+    # Своя публичная поездка попадает в обе ветки UNION, но не дублируется
+    assert len(visible) == len(set(visible))
+
+
+@pytest.mark.django_db
+def test_visible_to_keeps_default_ordering(
+    user, trip, public_trip_another_user, public_trip_another_user_resort
+):
+    """Сортировка по -start_date сохраняется."""
+    visible = list(Trip.objects.visible_to(user))
+    assert visible == sorted(visible, key=lambda t: t.start_date, reverse=True)
+
+
+@pytest.mark.django_db
+def test_visible_to_via_related_manager(
+    user,
+    resort,
+    trip,
+    public_trip_another_user,
+    public_trip_another_user_resort,
+    private_trip_another_user_resort,
+):
+    """Через resort.trips видимость ограничивается поездками курорта."""
+    visible = set(resort.trips.visible_to(user))
+    assert visible == {trip, public_trip_another_user_resort}
+
+
+@pytest.mark.django_db
+def test_trip_media_visible_to(trip_media, another_user, user):
+    """Медиа приватной поездки видит только её владелец."""
+    assert list(TripMedia.objects.visible_to(user)) == [trip_media]
+    assert not TripMedia.objects.visible_to(another_user).exists()
+    assert not TripMedia.objects.visible_to(AnonymousUser()).exists()
+
+
+# Тест плана запроса на большом наборе данных
+@pytest.fixture
+def large_trip_table(user, another_user, resort):
+    """
+    200 000 поездок 1 000 пользователей, публичная - каждая тысячная.
+    Генерируется одним INSERT ... SELECT generate_series для скорости.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO auth_user (password, is_superuser, username, first_name,
+                                   last_name, email, is_staff, is_active,
+                                   date_joined)
+            SELECT '', false, 'bulk_' || g, '', '', '', false, true, now()
+            FROM generate_series(1, 1000) AS g
+            """
+        )
+        cursor.execute(
+            """
+            INSERT INTO resort_trip (user_id, resort_id, start_date, end_date,
+                                     comment, is_public, created_at)
+            SELECT u.id, %s, DATE '2020-01-01' + (g %% 1500),
+                   DATE '2025-01-01', '', g %% 1000 = 0, now()
+            FROM generate_series(1, 200000) AS g
+            JOIN auth_user u ON u.username = 'bulk_' || (g %% 1000 + 1)
+            """,
+            [resort.id],
+        )
+        cursor.execute("ANALYZE resort_trip")
+        cursor.execute("ANALYZE auth_user")
+
+
+@pytest.mark.django_db
+def test_visible_to_uses_index_scans(user, large_trip_table):
+    """Планировщик использует индексы для обеих веток, а не Seq Scan."""
+    plan = Trip.objects.visible_to(user).explain()
+
+    assert "Seq Scan on resort_trip" not in plan
+    # Ветка публичных поездок - по индексу is_public
+    assert "resort_trip_is_public" in plan
+    # Ветка своих поездок - по индексу (user, is_public)
+    assert "resort_trip_user_id" in plan
@@ -0,0 +1,225 @@
+"""Возобновляемая загрузка фотографий частями.
+
+Протокол по мотивам tus (https://tus.io): клиент создаёт загрузку
+(MediaUpload) с размером файла и отправляет байты PATCH-запросами с
+заголовком Upload-Offset - сколько уже принято. Каждая часть дописывается
+в конец временного файла, без буферизации в памяти и без FILE_UPLOAD_*
+файлов. Если соединение оборвалось, принятые байты остаются: клиент
+узнаёт смещение (HEAD) и продолжает с него, а не начинает сначала.
+Запрос с неверным смещением отклоняется до чтения тела.
+
+Части одной загрузки принимаются по очереди под flock на временном файле,
+а не под блокировкой строки: тело по медленной мобильной связи читается
+вне транзакции и не держит соединение из пула БД. Новое смещение
+сохраняется условным UPDATE (только если в БД всё ещё прежнее).
+
+Заголовок Upload-Checksum ("sha256 <base64>") защищает часть: при
+несовпадении или обрыве она отбрасывается целиком, файл обрезается до
+прежнего смещения.
+
+Собранный файл перемещается в хранилище (ShardedImageField), а не
+копируется. При завершении файл целиком читается ровно один раз - для
+SHA-256 в имени: состояние hashlib между запросами (и воркерами) не
+сохранить, а пересчёт по частям потребовал бы того же чтения. Это
+осознанное отступление от "ни одного лишнего прохода по файлу". Формат
+проверяется только по заголовку (Image.open без verify): файл с верным
+заголовком и битыми данными станет фотографией без вариантов - задача
+generate_media_variants_batch его пропустит.
+"""
+
+import base64
+import binascii
+import fcntl
+import hashlib
+import os
+import uuid
+from contextlib import contextmanager, suppress
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, UnidentifiedImageError
+
+from resort.models import FileTombstone, TripMedia
+from resort.storage import sharded_name
+
+# Каталог незавершённых загрузок в хранилище медиа (та же файловая
+# система - собранный файл перемещается без копирования)
+PARTIAL_DIR = "uploads"
+
+# Размер блока при чтении тела запроса и хешировании файла
+BLOCK_SIZE = 64 * 1024
+
+# Ответ на часть с неверной контрольной суммой, как в tus
+HTTP_460_CHECKSUM_MISMATCH = 460
+
+
+class UploadError(Exception):
+    """Часть загрузки не принята."""
+
+
+class ChecksumMismatch(UploadError):
+    """Контрольная сумма части не совпала (или часть пришла не целиком)."""
+
+
+class UploadBusy(UploadError):
+    """Другая часть этой загрузки ещё принимается."""
+
+
+class InvalidImage(UploadError):
+    """Собранный файл - не изображение."""
+
+
+class AssembledFile(File):
+    """
+    Собранный файл загрузки: FileSystemStorage перемещает его по
+    temporary_file_path, а sha256 избавляет от повторного хеширования
+    (resort.storage.content_hash).
+    """
+
+    def __init__(self, file, name, path, sha256):
+        super().__init__(file, name)
+        self.path = path
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def partial_path(upload):
+    """Путь временного файла загрузки на диске."""
+    return default_storage.path(f"{PARTIAL_DIR}/{upload.pk}.part")
+
+
+def parse_checksum(header):
+    """
+    Дайджест SHA-256 из заголовка Upload-Checksum ("sha256 <base64>"),
+    None без заголовка. Другие алгоритмы и битый base64 - ValueError.
+    """
+    if not header:
+        return None
+    algorithm, _, value = header.strip().partition(" ")
+    if algorithm.lower() != "sha256":
+        raise ValueError(f"Неподдерживаемый алгоритм: {algorithm}")
+    try:
+        return base64.b64decode(value, validate=True)
+    except binascii.Error:
+        raise ValueError("Контрольная сумма не в base64") from None
+
+
+def create_partial(upload):
+    """Пустой временный файл новой загрузки."""
+    path = partial_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+
+
+def discard_partial(upload):
+    """Удаляет временный файл загрузки, если он есть."""
+    with suppress(FileNotFoundError):
+        os.remove(partial_path(upload))
+
+
+@contextmanager
+def locked_partial(upload):
+    """
+    Временный файл загрузки, открытый на запись под эксклюзивным flock.
+    Если файл занят другим запросом - UploadBusy, без ожидания.
+    """
+    with open(partial_path(upload), "r+b") as file:
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadBusy("Предыдущая часть ещё принимается") from None
+        yield file  # Блокировка снимается при закрытии файла
+
+
+def append_chunk(file, offset, stream, length, checksum=None):
+    """
+    Дописывает в файл загрузки (locked_partial) до length байт из stream
+    со смещения offset. Возвращает новое смещение. Без checksum байты,
+    принятые до обрыва соединения, сохраняются; с checksum часть
+    принимается только целиком и с совпавшим SHA-256.
+    """
+    hasher = hashlib.sha256()
+    received = 0
+    # Остаток прерванной записи за смещением не считается принятым
+    file.truncate(offset)
+    file.seek(offset)
+    try:
+        while received < length:
+            block = stream.read(min(BLOCK_SIZE, length - received))
+            if not block:
+                break
+            file.write(block)
+            hasher.update(block)
+            received += len(block)
+    except OSError:
+        # Клиент оборвал соединение (UnreadablePostError)
+        if checksum is not None:
+            file.truncate(offset)
+            raise ChecksumMismatch("Часть получена не полностью") from None
+        return offset + received
+    if checksum is not None and (received != length or hasher.digest() != checksum):
+        file.truncate(offset)
+        raise ChecksumMismatch("Контрольная сумма части не совпала")
+    file.flush()
+    return offset + received
+
+
+def file_sha256(path):
+    """SHA-256 файла в hex, одним последовательным чтением."""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as file:
+        while block := file.read(BLOCK_SIZE):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def complete_upload(upload):
+    """
+    Превращает полностью принятую загрузку в TripMedia поездки (upload.media).
+    Временный файл перемещается в хранилище (или удаляется, если такая
+    фотография уже хранится). Не изображение - InvalidImage.
+
+    Вызывается вне транзакции: фотография сохраняется своей, и при её
+    откате записанный в хранилище файл получает надгробие (FileTombstone).
+    """
+    path = partial_path(upload)
+    try:
+        # Только заголовок: verify() прочитал бы весь файл ещё раз
+        Image.open(path).close()
+    except (UnidentifiedImageError, OSError) as exc:
+        raise InvalidImage("Файл не является изображением") from exc
+
+    # Хранилище забирает жёсткую ссылку, а не сам .part: если транзакция
+    # откатится, принятые байты останутся и завершение можно повторить
+    link = f"{path}.{uuid.uuid4().hex}"
+    os.link(path, link)
+    try:
+        with open(link, "rb") as file:
+            assembled = AssembledFile(file, upload.filename, link, file_sha256(path))
+            name = stored_name(upload, assembled)
+            try:
+                with transaction.atomic():
+                    upload.media = TripMedia.objects.bulk_upload(
+                        upload.trip, [assembled]
+                    )[0]
+                    upload.save(update_fields=["media", "updated_at"])
+                    transaction.on_commit(lambda: discard_partial(upload))
+            except Exception:
+                # Файл уже мог попасть в хранилище, а MediaBlob - откатиться
+                FileTombstone.objects.bury([name])
+                raise
+    finally:
+        with suppress(FileNotFoundError):
+            os.remove(link)  # Остаётся, если такая фотография уже хранится
+    return upload.media
+
+
+def stored_name(upload, content):
+    """Имя, под которым bulk_upload сохранит файл загрузки в хранилище."""
+    field = TripMedia._meta.get_field("image")
+    return field.generate_filename(
+        TripMedia(trip=upload.trip), sharded_name(content, upload.filename)
+    )
@@ -1,7 +1,6 @@
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q, Count
-from django.http import HttpResponseNotFound
+from django.http import Http404, HttpResponseNotFound
 from django.shortcuts import render, get_object_or_404
 from django.urls import reverse_lazy
 from django.views.generic import (
@@ -11,12 +10,11 @@ from django.views.generic import (
     UpdateView,
     DeleteView,
 )
-from django.core.cache import cache
 
-from .cache_keys import CacheKeys, CacheTimeouts
 from .forms import TripForm, TripMediaForm
 from .mixins import OwnerQuerySetMixin
 from .models import Resort, Trip, TripMedia
+from .snapshot import NO_TRIP_COUNTERS, resort_catalog, trip_counters
 
 
 def index(request):
@@ -39,6 +37,14 @@ class ResortDetailView(DetailView):
     slug_field = "slug"
     slug_url_kwarg = "resort_slug"
 
+    def get_object(self, queryset=None):
+        """Курорт из снимка справочника, без запроса к БД."""
+        slug = self.kwargs[self.slug_url_kwarg]
+        resort = resort_catalog.get().by_slug.get(slug)
+        if resort is None:
+            raise Http404("Курорт не найден")
+        return resort
+
     def get_context_data(self, **kwargs):
         """
         Добавляем в контекст заголовок страницы и фильтрацию поездки
@@ -49,22 +55,12 @@ class ResortDetailView(DetailView):
         user = self.request.user  # Получаем текущего пользователя
         trips_qs = self.object.trips.all()  # Все поездки, связанные с курортом
 
-        # Кешируем счетчики поездок
-        counts_cache_key = CacheKeys.resort_trips_counts(
-            self.object.id
-        )  # ключ кэша для количества поездок
-        counts = cache.get(counts_cache_key)
-
-        if counts is None:
-            # словарь counts с общим количеством поездок и количеством публичных поездок
-            counts = trips_qs.aggregate(
-                total=Count("id"), public=Count("id", filter=Q(is_public=True))
-            )
-            cache.set(counts_cache_key, counts, CacheTimeouts.RESORT_TRIPS_COUNTS)
-
-        # Количество поездок к курорту (видят все)
-        context["total_trips_count"] = counts["total"]
-        context["public_trips_count"] = counts["public"]
+        # Количество поездок к курорту (видят все).
+        # Счётчики хранятся в самой модели Resort и обновляются сигналами Trip;
+        # в снимке курортов они устаревают - берём их из кэша счётчиков
+        counters = trip_counters().get(self.object.pk, NO_TRIP_COUNTERS)
+        context["total_trips_count"] = counters["trips_count"]
+        context["public_trips_count"] = counters["public_trips_count"]
 
         # Гость - НЕ видит список поездок
         if not user.is_authenticated:
@@ -74,9 +70,7 @@ class ResortDetailView(DetailView):
         # Авторизованный пользователь:
         # - видит свои поездки
         # - и публичные поездки других пользователей
-        context["trips"] = trips_qs.filter(
-            Q(is_public=True) | Q(user=user)
-        ).select_related(
+        context["trips"] = trips_qs.visible_to(user).select_related(
             "user"
         )  # Оптимизация: сразу подтягиваем связанные объекты User
         return context
@@ -92,18 +86,10 @@ class ResortListView(ListView):
 
     def get_queryset(self):
         """
-        Попытка получить список курортов из кэша,
-        если отсутствует - получить из базы и записать в кэш
+        Список курортов из снимка справочника в памяти процесса
+        (см. resort/snapshot.py), отсортированный по названию
         """
-        resorts = cache.get(CacheKeys.RESORT_LIST)
-
-        if resorts is None:
-            resorts = list(
-                Resort.objects.all()
-            )  # list() для кэширования QuerySet как списка
-            cache.set(CacheKeys.RESORT_LIST, resorts, CacheTimeouts.RESORT_LIST)
-
-        return resorts
+        return resort_catalog.get().resorts
 
 
 class TripDetailView(LoginRequiredMixin, DetailView):
@@ -125,11 +111,9 @@ class TripDetailView(LoginRequiredMixin, DetailView):
         """Фильтрация поездок по текущему пользователю и публичности"""
         user = self.request.user
         return (
-            Trip.objects.filter(Q(is_public=True) | Q(user=user))
-            .select_related("user", "resort")
-            .prefetch_related(
-                "media"
-            )  # Оптимизация: сразу подтягиваем связанные объекты User, Resort и media
+            Trip.objects.visible_to(user).select_related("user", "resort")
+            # Оптимизация: сразу подтягиваем User, Resort, media и их варианты
+            .prefetch_related("media__variants")
         )
 
 
@@ -253,7 +237,9 @@ class TripMediaAddView(LoginRequiredMixin, CreateView):
 class TripMediaDeleteView(LoginRequiredMixin, OwnerQuerySetMixin, DeleteView):
     """
     Класс-представление для удаления медиафайлов из поездки
-    Файл удаляется автоматически через сигнал post_delete в модели
+    Ссылки на файлы фотографии и её вариантов убирает TripMedia.delete
+    (счётчики MediaBlob); файлы без ссылок удаляет задача после коммита
+    по надгробиям FileTombstone
     Доступ к удалению ограничен владельцем медиафайлов через миксин OwnerQuerySetMixin
     """
 
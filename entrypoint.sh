@@ -14,8 +14,10 @@ while ! nc -z db 5432; do
 done
 echo -e "${GREEN}✓ PostgreSQL started${NC}"
 
-# Всё что ниже — только для web-сервера, не для Celery Worker
-if [ "$1" != "celery" ]; then
+# Всё что ниже — только для web-сервера, не для Celery Worker.
+# SKIP_SETUP=1 - второй сервер на том же коде (events): миграции, фикстуры
+# и статику выполняет только web, иначе контейнеры делают это наперегонки
+if [ "$1" != "celery" ] && [ "$SKIP_SETUP" != "1" ]; then
 
   # Применяем миграции без запроса подтверждения
   echo -e "${YELLOW}Applying database migrations...${NC}"
@@ -48,6 +50,11 @@ if [ "$1" != "celery" ]; then
     fi
   fi
 
+  # Генерируем OpenAPI-схему один раз, чтобы не строить её на каждый запрос
+  echo -e "${YELLOW}Generating OpenAPI schema...${NC}"
+  python config/manage.py spectacular --format openapi-json --file config/openapi-schema.json
+  echo -e "${GREEN}✓ OpenAPI schema generated${NC}"
+
   # Собираем статику (для продакшена)
    echo -e "${YELLOW}Collecting static files...${NC}"
    python config/manage.py collectstatic --noinput